@@ -1,11 +1,15 @@
 # Deepgram Multilingual Agent for Spanish and English
 # Using Deepgram Aura-2 voices for high-quality speech synthesis
 
+import asyncio
+import functools
+import json
 import logging
 import os
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import NamedTuple, Optional, Tuple
 
+import aiohttp
 from dotenv import load_dotenv
 
 from livekit import api
@@ -20,24 +24,24 @@ from livekit.agents import (
     RunContext,
     WorkerOptions,
     cli,
-    metrics,
 )
 from livekit.agents.job import get_current_job_context
 from livekit.agents.llm import function_tool
-from livekit.agents.voice import MetricsCollectedEvent
-from livekit.plugins import google
+from livekit.plugins import deepgram, google
 
-# Import Deepgram plugin
+from app.utils.metrics import MetricsBatcher
+
+# orjson parses job metadata faster when installed; stdlib json otherwise
 try:
-    from livekit.plugins import deepgram
-    DEEPGRAM_AVAILABLE = True
-except ImportError as e:
-    DEEPGRAM_AVAILABLE = False
-    print(f"Warning: Deepgram plugin not available. Error: {e}")
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
 
 # Logger & Environment Setup
 logger = logging.getLogger("deepgram-multilingual-agent")
 load_dotenv()
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
 # Common instructions for all agents
 common_instructions = (
@@ -47,8 +51,34 @@ common_instructions = (
     "You can seamlessly switch between languages and provide accurate translations when needed."
 )
 
+# Static instructions for each agent, concatenated once at import; the
+# language agents only append the per-user name/location context
+_WELCOME_INSTRUCTIONS = (
+    f"{common_instructions} "
+    "Your goal is to welcome users and help them choose their preferred language (English or Spanish) and voice. "
+    "Ask them to choose their preferred language or start speaking in their language. "
+    "Also ask about their voice preference (masculine/feminine, accent, and characteristics). "
+    "Be warm and inviting. Start with a bilingual greeting in both English and Spanish."
+)
+
+_EN_INSTRUCTIONS = (
+    f"{common_instructions} "
+    "You are now in English mode. Provide helpful assistance in clear, professional English. "
+    "Handle general questions, provide information, help with tasks, offer translations to Spanish, "
+    "and engage in natural conversation. Use American English conventions and be friendly yet professional. "
+    "You can seamlessly switch to Spanish when needed."
+)
+
+_ES_INSTRUCTIONS = (
+    f"{common_instructions} "
+    "Ahora estás en modo español. Proporciona asistencia útil en español claro y profesional. "
+    "Maneja preguntas generales, proporciona información, ayuda con tareas, ofrece traducciones al inglés, "
+    "y participa en conversaciones naturales. Usa convenciones del español y sé amigable pero profesional. "
+    "Puedes cambiar sin problemas al inglés cuando sea necesario."
+)
+
 # Voice configuration dataclass
-@dataclass
+@dataclass(slots=True, frozen=True)
 class DeepgramVoiceConfig:
     model: str
     name: str
@@ -58,121 +88,128 @@ class DeepgramVoiceConfig:
     accent: str
     characteristics: str
     use_cases: str
+    # Title-cased name used in user-facing messages, computed once per voice
+    display_name: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "display_name", self.name.title())
 
-# Available Deepgram Aura-2 voices by language
-DEEPGRAM_VOICES = {
-    "english": [
+# Available Deepgram Aura-2 voices by language, kept as raw field tuples in
+# DeepgramVoiceConfig order. Config objects are only built when a language's
+# voices are first requested (see get_voices).
+_VOICE_SPECS = {
+    "english": (
         # Featured English Voices
-        DeepgramVoiceConfig("aura-2-thalia-en", "thalia", "feminine", "Adult", "en-us", "American", 
-                           "Clear, Confident, Energetic, Enthusiastic", "Casual chat, customer service, IVR"),
-        DeepgramVoiceConfig("aura-2-andromeda-en", "andromeda", "feminine", "Adult", "en-us", "American", 
-                           "Casual, Expressive, Comfortable", "Customer service, IVR"),
-        DeepgramVoiceConfig("aura-2-helena-en", "helena", "feminine", "Adult", "en-us", "American", 
-                           "Caring, Natural, Positive, Friendly, Raspy", "IVR, casual chat"),
-        DeepgramVoiceConfig("aura-2-apollo-en", "apollo", "masculine", "Adult", "en-us", "American", 
-                           "Confident, Comfortable, Casual", "Casual chat"),
-        DeepgramVoiceConfig("aura-2-arcas-en", "arcas", "masculine", "Adult", "en-us", "American", 
-                           "Natural, Smooth, Clear, Comfortable", "Customer service, casual chat"),
-        DeepgramVoiceConfig("aura-2-aries-en", "aries", "masculine", "Adult", "en-us", "American", 
-                           "Warm, Energetic, Caring", "Casual chat"),
+        ("aura-2-thalia-en", "thalia", "feminine", "Adult", "en-us", "American", 
+         "Clear, Confident, Energetic, Enthusiastic", "Casual chat, customer service, IVR"),
+        ("aura-2-andromeda-en", "andromeda", "feminine", "Adult", "en-us", "American", 
+         "Casual, Expressive, Comfortable", "Customer service, IVR"),
+        ("aura-2-helena-en", "helena", "feminine", "Adult", "en-us", "American", 
+         "Caring, Natural, Positive, Friendly, Raspy", "IVR, casual chat"),
+        ("aura-2-apollo-en", "apollo", "masculine", "Adult", "en-us", "American", 
+         "Confident, Comfortable, Casual", "Casual chat"),
+        ("aura-2-arcas-en", "arcas", "masculine", "Adult", "en-us", "American", 
+         "Natural, Smooth, Clear, Comfortable", "Customer service, casual chat"),
+        ("aura-2-aries-en", "aries", "masculine", "Adult", "en-us", "American", 
+         "Warm, Energetic, Caring", "Casual chat"),
         
         # Additional English Voices
-        DeepgramVoiceConfig("aura-2-asteria-en", "asteria", "feminine", "Adult", "en-us", "American", 
-                           "Clear, Confident, Knowledgeable, Energetic", "Advertising"),
-        DeepgramVoiceConfig("aura-2-athena-en", "athena", "feminine", "Mature", "en-us", "American", 
-                           "Calm, Smooth, Professional", "Storytelling"),
-        DeepgramVoiceConfig("aura-2-atlas-en", "atlas", "masculine", "Mature", "en-us", "American", 
-                           "Enthusiastic, Confident, Approachable, Friendly", "Advertising"),
-        DeepgramVoiceConfig("aura-2-aurora-en", "aurora", "feminine", "Adult", "en-us", "American", 
-                           "Cheerful, Expressive, Energetic", "Interview"),
-        DeepgramVoiceConfig("aura-2-callista-en", "callista", "feminine", "Adult", "en-us", "American", 
-                           "Clear, Energetic, Professional, Smooth", "IVR"),
-        DeepgramVoiceConfig("aura-2-cora-en", "cora", "feminine", "Adult", "en-us", "American", 
-                           "Smooth, Melodic, Caring", "Storytelling"),
-        DeepgramVoiceConfig("aura-2-delia-en", "delia", "feminine", "Young Adult", "en-us", "American", 
-                           "Casual, Friendly, Cheerful, Breathy", "Interview"),
-        DeepgramVoiceConfig("aura-2-draco-en", "draco", "masculine", "Adult", "en-gb", "British", 
-                           "Warm, Approachable, Trustworthy, Baritone", "Storytelling"),
-        DeepgramVoiceConfig("aura-2-electra-en", "electra", "feminine", "Adult", "en-us", "American", 
-                           "Professional, Engaging, Knowledgeable", "IVR, advertising, customer service"),
-        DeepgramVoiceConfig("aura-2-harmonia-en", "harmonia", "feminine", "Adult", "en-us", "American", 
-                           "Empathetic, Clear, Calm, Confident", "Customer service"),
-        DeepgramVoiceConfig("aura-2-hera-en", "hera", "feminine", "Adult", "en-us", "American", 
-                           "Smooth, Warm, Professional", "Informative"),
-        DeepgramVoiceConfig("aura-2-hermes-en", "hermes", "masculine", "Adult", "en-us", "American", 
-                           "Expressive, Engaging, Professional", "Informative"),
-        DeepgramVoiceConfig("aura-2-hyperion-en", "hyperion", "masculine", "Adult", "en-au", "Australian", 
-                           "Caring, Warm, Empathetic", "Interview"),
-        DeepgramVoiceConfig("aura-2-iris-en", "iris", "feminine", "Young Adult", "en-us", "American", 
-                           "Cheerful, Positive, Approachable", "IVR, advertising, customer service"),
-        DeepgramVoiceConfig("aura-2-janus-en", "janus", "feminine", "Adult", "en-us", "American", 
-                           "Southern, Smooth, Trustworthy", "Storytelling"),
-        DeepgramVoiceConfig("aura-2-juno-en", "juno", "feminine", "Adult", "en-us", "American", 
-                           "Natural, Engaging, Melodic, Breathy", "Interview"),
-        DeepgramVoiceConfig("aura-2-jupiter-en", "jupiter", "masculine", "Adult", "en-us", "American", 
-                           "Expressive, Knowledgeable, Baritone", "Informative"),
-        DeepgramVoiceConfig("aura-2-luna-en", "luna", "feminine", "Young Adult", "en-us", "American", 
-                           "Friendly, Natural, Engaging", "IVR"),
-        DeepgramVoiceConfig("aura-2-mars-en", "mars", "masculine", "Adult", "en-us", "American", 
-                           "Smooth, Patient, Trustworthy, Baritone", "Customer service"),
-        DeepgramVoiceConfig("aura-2-minerva-en", "minerva", "feminine", "Adult", "en-us", "American", 
-                           "Positive, Friendly, Natural", "Storytelling"),
-        DeepgramVoiceConfig("aura-2-neptune-en", "neptune", "masculine", "Adult", "en-us", "American", 
-                           "Professional, Patient, Polite", "Customer service"),
-        DeepgramVoiceConfig("aura-2-odysseus-en", "odysseus", "masculine", "Adult", "en-us", "American", 
-                           "Calm, Smooth, Comfortable, Professional", "Advertising"),
-        DeepgramVoiceConfig("aura-2-ophelia-en", "ophelia", "feminine", "Adult", "en-us", "American", 
-                           "Expressive, Enthusiastic, Cheerful", "Interview"),
-        DeepgramVoiceConfig("aura-2-orion-en", "orion", "masculine", "Adult", "en-us", "American", 
-                           "Approachable, Comfortable, Calm, Polite", "Informative"),
-        DeepgramVoiceConfig("aura-2-orpheus-en", "orpheus", "masculine", "Adult", "en-us", "American", 
-                           "Professional, Clear, Confident, Trustworthy", "Customer service, storytelling"),
-        DeepgramVoiceConfig("aura-2-pandora-en", "pandora", "feminine", "Adult", "en-gb", "British", 
-                           "Smooth, Calm, Melodic, Breathy", "IVR, informative"),
-        DeepgramVoiceConfig("aura-2-phoebe-en", "phoebe", "feminine", "Adult", "en-us", "American", 
-                           "Energetic, Warm, Casual", "Customer service"),
-        DeepgramVoiceConfig("aura-2-pluto-en", "pluto", "masculine", "Adult", "en-us", "American", 
-                           "Smooth, Calm, Empathetic, Baritone", "Interview, storytelling"),
-        DeepgramVoiceConfig("aura-2-saturn-en", "saturn", "masculine", "Adult", "en-us", "American", 
-                           "Knowledgeable, Confident, Baritone", "Customer service"),
-        DeepgramVoiceConfig("aura-2-selene-en", "selene", "feminine", "Adult", "en-us", "American", 
-                           "Expressive, Engaging, Energetic", "Informative"),
-        DeepgramVoiceConfig("aura-2-theia-en", "theia", "feminine", "Adult", "en-au", "American", 
-                           "Expressive, Polite, Sincere", "Informative"),
-        DeepgramVoiceConfig("aura-2-vesta-en", "vesta", "feminine", "Adult", "en-us", "American", 
-                           "Natural, Expressive, Patient, Empathetic", "Customer service, interview, storytelling"),
-        DeepgramVoiceConfig("aura-2-zeus-en", "zeus", "masculine", "Adult", "en-us", "American", 
-                           "Deep, Trustworthy, Smooth", "IVR"),
-    ],
-    "spanish": [
+        ("aura-2-asteria-en", "asteria", "feminine", "Adult", "en-us", "American", 
+         "Clear, Confident, Knowledgeable, Energetic", "Advertising"),
+        ("aura-2-athena-en", "athena", "feminine", "Mature", "en-us", "American", 
+         "Calm, Smooth, Professional", "Storytelling"),
+        ("aura-2-atlas-en", "atlas", "masculine", "Mature", "en-us", "American", 
+         "Enthusiastic, Confident, Approachable, Friendly", "Advertising"),
+        ("aura-2-aurora-en", "aurora", "feminine", "Adult", "en-us", "American", 
+         "Cheerful, Expressive, Energetic", "Interview"),
+        ("aura-2-callista-en", "callista", "feminine", "Adult", "en-us", "American", 
+         "Clear, Energetic, Professional, Smooth", "IVR"),
+        ("aura-2-cora-en", "cora", "feminine", "Adult", "en-us", "American", 
+         "Smooth, Melodic, Caring", "Storytelling"),
+        ("aura-2-delia-en", "delia", "feminine", "Young Adult", "en-us", "American", 
+         "Casual, Friendly, Cheerful, Breathy", "Interview"),
+        ("aura-2-draco-en", "draco", "masculine", "Adult", "en-gb", "British", 
+         "Warm, Approachable, Trustworthy, Baritone", "Storytelling"),
+        ("aura-2-electra-en", "electra", "feminine", "Adult", "en-us", "American", 
+         "Professional, Engaging, Knowledgeable", "IVR, advertising, customer service"),
+        ("aura-2-harmonia-en", "harmonia", "feminine", "Adult", "en-us", "American", 
+         "Empathetic, Clear, Calm, Confident", "Customer service"),
+        ("aura-2-hera-en", "hera", "feminine", "Adult", "en-us", "American", 
+         "Smooth, Warm, Professional", "Informative"),
+        ("aura-2-hermes-en", "hermes", "masculine", "Adult", "en-us", "American", 
+         "Expressive, Engaging, Professional", "Informative"),
+        ("aura-2-hyperion-en", "hyperion", "masculine", "Adult", "en-au", "Australian", 
+         "Caring, Warm, Empathetic", "Interview"),
+        ("aura-2-iris-en", "iris", "feminine", "Young Adult", "en-us", "American", 
+         "Cheerful, Positive, Approachable", "IVR, advertising, customer service"),
+        ("aura-2-janus-en", "janus", "feminine", "Adult", "en-us", "American", 
+         "Southern, Smooth, Trustworthy", "Storytelling"),
+        ("aura-2-juno-en", "juno", "feminine", "Adult", "en-us", "American", 
+         "Natural, Engaging, Melodic, Breathy", "Interview"),
+        ("aura-2-jupiter-en", "jupiter", "masculine", "Adult", "en-us", "American", 
+         "Expressive, Knowledgeable, Baritone", "Informative"),
+        ("aura-2-luna-en", "luna", "feminine", "Young Adult", "en-us", "American", 
+         "Friendly, Natural, Engaging", "IVR"),
+        ("aura-2-mars-en", "mars", "masculine", "Adult", "en-us", "American", 
+         "Smooth, Patient, Trustworthy, Baritone", "Customer service"),
+        ("aura-2-minerva-en", "minerva", "feminine", "Adult", "en-us", "American", 
+         "Positive, Friendly, Natural", "Storytelling"),
+        ("aura-2-neptune-en", "neptune", "masculine", "Adult", "en-us", "American", 
+         "Professional, Patient, Polite", "Customer service"),
+        ("aura-2-odysseus-en", "odysseus", "masculine", "Adult", "en-us", "American", 
+         "Calm, Smooth, Comfortable, Professional", "Advertising"),
+        ("aura-2-ophelia-en", "ophelia", "feminine", "Adult", "en-us", "American", 
+         "Expressive, Enthusiastic, Cheerful", "Interview"),
+        ("aura-2-orion-en", "orion", "masculine", "Adult", "en-us", "American", 
+         "Approachable, Comfortable, Calm, Polite", "Informative"),
+        ("aura-2-orpheus-en", "orpheus", "masculine", "Adult", "en-us", "American", 
+         "Professional, Clear, Confident, Trustworthy", "Customer service, storytelling"),
+        ("aura-2-pandora-en", "pandora", "feminine", "Adult", "en-gb", "British", 
+         "Smooth, Calm, Melodic, Breathy", "IVR, informative"),
+        ("aura-2-phoebe-en", "phoebe", "feminine", "Adult", "en-us", "American", 
+         "Energetic, Warm, Casual", "Customer service"),
+        ("aura-2-pluto-en", "pluto", "masculine", "Adult", "en-us", "American", 
+         "Smooth, Calm, Empathetic, Baritone", "Interview, storytelling"),
+        ("aura-2-saturn-en", "saturn", "masculine", "Adult", "en-us", "American", 
+         "Knowledgeable, Confident, Baritone", "Customer service"),
+        ("aura-2-selene-en", "selene", "feminine", "Adult", "en-us", "American", 
+         "Expressive, Engaging, Energetic", "Informative"),
+        ("aura-2-theia-en", "theia", "feminine", "Adult", "en-au", "American", 
+         "Expressive, Polite, Sincere", "Informative"),
+        ("aura-2-vesta-en", "vesta", "feminine", "Adult", "en-us", "American", 
+         "Natural, Expressive, Patient, Empathetic", "Customer service, interview, storytelling"),
+        ("aura-2-zeus-en", "zeus", "masculine", "Adult", "en-us", "American", 
+         "Deep, Trustworthy, Smooth", "IVR"),
+    ),
+    "spanish": (
         # Featured Spanish Voices
-        DeepgramVoiceConfig("aura-2-celeste-es", "celeste", "feminine", "Young Adult", "es-co", "Colombian", 
-                           "Clear, Energetic, Positive, Friendly, Enthusiastic", "Casual Chat, Advertising, IVR"),
-        DeepgramVoiceConfig("aura-2-estrella-es", "estrella", "feminine", "Mature", "es-mx", "Mexican", 
-                           "Approachable, Natural, Calm, Comfortable, Expressive", "Casual Chat, Interview"),
-        DeepgramVoiceConfig("aura-2-nestor-es", "nestor", "masculine", "Adult", "es-es", "Peninsular", 
-                           "Calm, Professional, Approachable, Clear, Confident", "Casual Chat, Customer Service"),
+        ("aura-2-celeste-es", "celeste", "feminine", "Young Adult", "es-co", "Colombian", 
+         "Clear, Energetic, Positive, Friendly, Enthusiastic", "Casual Chat, Advertising, IVR"),
+        ("aura-2-estrella-es", "estrella", "feminine", "Mature", "es-mx", "Mexican", 
+         "Approachable, Natural, Calm, Comfortable, Expressive", "Casual Chat, Interview"),
+        ("aura-2-nestor-es", "nestor", "masculine", "Adult", "es-es", "Peninsular", 
+         "Calm, Professional, Approachable, Clear, Confident", "Casual Chat, Customer Service"),
         
         # Additional Spanish Voices
-        DeepgramVoiceConfig("aura-2-sirio-es", "sirio", "masculine", "Adult", "es-mx", "Mexican", 
-                           "Calm, Professional, Comfortable, Empathetic, Baritone", "Casual Chat, Interview"),
-        DeepgramVoiceConfig("aura-2-carina-es", "carina", "feminine", "Adult", "es-es", "Peninsular", 
-                           "Professional, Raspy, Energetic, Breathy, Confident", "Interview, Customer Service, IVR"),
-        DeepgramVoiceConfig("aura-2-alvaro-es", "alvaro", "masculine", "Adult", "es-es", "Peninsular", 
-                           "Calm, Professional, Clear, Knowledgeable, Approachable", "Interview, Customer Service"),
-        DeepgramVoiceConfig("aura-2-diana-es", "diana", "feminine", "Adult", "es-es", "Peninsular", 
-                           "Professional, Confident, Expressive, Polite, Knowledgeable", "Storytelling, Advertising"),
-        DeepgramVoiceConfig("aura-2-aquila-es", "aquila", "masculine", "Adult", "es-419", "Latin American", 
-                           "Expressive, Enthusiastic, Confident, Casual, Comfortable", "Casual Chat, Informative"),
-        DeepgramVoiceConfig("aura-2-selena-es", "selena", "feminine", "Young Adult", "es-419", "Latin American", 
-                           "Approachable, Casual, Friendly, Calm, Positive", "Customer Service, Informative"),
-        DeepgramVoiceConfig("aura-2-javier-es", "javier", "masculine", "Adult", "es-mx", "Latin American", 
-                           "Approachable, Professional, Friendly, Comfortable, Calm", "Casual Chat, IVR, Storytelling"),
-    ]
+        ("aura-2-sirio-es", "sirio", "masculine", "Adult", "es-mx", "Mexican", 
+         "Calm, Professional, Comfortable, Empathetic, Baritone", "Casual Chat, Interview"),
+        ("aura-2-carina-es", "carina", "feminine", "Adult", "es-es", "Peninsular", 
+         "Professional, Raspy, Energetic, Breathy, Confident", "Interview, Customer Service, IVR"),
+        ("aura-2-alvaro-es", "alvaro", "masculine", "Adult", "es-es", "Peninsular", 
+         "Calm, Professional, Clear, Knowledgeable, Approachable", "Interview, Customer Service"),
+        ("aura-2-diana-es", "diana", "feminine", "Adult", "es-es", "Peninsular", 
+         "Professional, Confident, Expressive, Polite, Knowledgeable", "Storytelling, Advertising"),
+        ("aura-2-aquila-es", "aquila", "masculine", "Adult", "es-419", "Latin American", 
+         "Expressive, Enthusiastic, Confident, Casual, Comfortable", "Casual Chat, Informative"),
+        ("aura-2-selena-es", "selena", "feminine", "Young Adult", "es-419", "Latin American", 
+         "Approachable, Casual, Friendly, Calm, Positive", "Customer Service, Informative"),
+        ("aura-2-javier-es", "javier", "masculine", "Adult", "es-mx", "Latin American", 
+         "Approachable, Professional, Friendly, Comfortable, Calm", "Casual Chat, IVR, Storytelling"),
+    ),
 }
 
 # Shared state dataclass
-@dataclass
+@dataclass(slots=True)
 class DeepgramMultilingualData:
     current_language: Optional[str] = None
     user_name: Optional[str] = None
@@ -184,72 +221,114 @@ class DeepgramMultilingualData:
     selected_voice: Optional[str] = None  # Specific voice name
     preferred_accent: Optional[str] = None  # "American", "British", "Mexican", "Colombian", etc.
 
-def get_voice_for_language(language: str, userdata: DeepgramMultilingualData) -> DeepgramVoiceConfig:
-    """Get the appropriate voice for a language based on user preferences."""
-    language_key = language.lower()
-    
-    if language_key not in DEEPGRAM_VOICES:
+@functools.lru_cache(maxsize=None)
+def get_voices(language_key: str) -> Tuple[DeepgramVoiceConfig, ...]:
+    """Get the voice configs for a language, built on first use."""
+    return tuple(DeepgramVoiceConfig(*spec) for spec in _VOICE_SPECS[language_key])
+
+def __getattr__(name: str):
+    # DEEPGRAM_VOICES is materialized on demand for callers that still use it
+    if name == "DEEPGRAM_VOICES":
+        return {language_key: get_voices(language_key) for language_key in _VOICE_SPECS}
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Column-oriented (struct-of-arrays) view of a language's voices, built from
+# the raw specs on first use. Matching fields are pre-lowercased so voice
+# resolution is a single pass over flat tuples of strings.
+class _VoiceTable(NamedTuple):
+    names: Tuple[str, ...]
+    genders: Tuple[str, ...]
+    accents: Tuple[str, ...]
+    characteristics: Tuple[str, ...]
+    models: Tuple[str, ...]
+
+@functools.lru_cache(maxsize=None)
+def _voice_table(language_key: str) -> _VoiceTable:
+    specs = _VOICE_SPECS[language_key]
+    return _VoiceTable(
+        names=tuple(spec[1].lower() for spec in specs),
+        genders=tuple(spec[2] for spec in specs),
+        accents=tuple(spec[5].lower() for spec in specs),
+        characteristics=tuple(spec[6].lower() for spec in specs),
+        models=tuple(spec[0] for spec in specs),
+    )
+
+# Preference weights used to score voices. Gender outranks accent, which
+# outranks characteristic, so no combination of lower-priority matches can
+# beat a higher-priority one.
+_GENDER_WEIGHT, _ACCENT_WEIGHT, _CHARACTERISTIC_WEIGHT = 4, 2, 1
+
+@functools.lru_cache(maxsize=256)
+def _resolve_voice(
+    language_key: str,
+    selected_voice: Optional[str],
+    gender: Optional[str],
+    accent: Optional[str],
+    characteristic: Optional[str],
+) -> DeepgramVoiceConfig:
+    if language_key not in _VOICE_SPECS:
         # Default fallback
         if language_key == "english":
-            return DEEPGRAM_VOICES["english"][0]  # thalia
+            return get_voices("english")[0]  # thalia
         else:
-            return DEEPGRAM_VOICES["spanish"][0]  # celeste
-    
-    available_voices = DEEPGRAM_VOICES[language_key]
-    
-    # If user has a specific voice selected, use it
-    if userdata.selected_voice:
-        for voice in available_voices:
-            if voice.name.lower() == userdata.selected_voice.lower():
-                return voice
-    
-    # Filter by gender preference
-    if userdata.preferred_voice_gender:
-        gender_voices = [v for v in available_voices if v.gender == userdata.preferred_voice_gender]
-        if gender_voices:
-            available_voices = gender_voices
-    
-    # Filter by accent preference
-    if userdata.preferred_accent:
-        accent_voices = [v for v in available_voices if userdata.preferred_accent.lower() in v.accent.lower()]
-        if accent_voices:
-            available_voices = accent_voices
-    
-    # Filter by characteristic preference
-    if userdata.preferred_voice_characteristic:
-        char_voices = []
-        for voice in available_voices:
-            if userdata.preferred_voice_characteristic.lower() in voice.characteristics.lower():
-                char_voices.append(voice)
-        if char_voices:
-            available_voices = char_voices
-    
-    # Return the first available voice (or default)
-    return available_voices[0] if available_voices else DEEPGRAM_VOICES["english"][0]
+            return get_voices("spanish")[0]  # celeste
+
+    table = _voice_table(language_key)
+    selected_voice = selected_voice.lower() if selected_voice else None
+    accent = accent.lower() if accent else None
+    characteristic = characteristic.lower() if characteristic else None
+
+    # Single pass: return a specifically selected voice straight away, and
+    # otherwise keep the first voice with the best preference score
+    best_i, best_score = 0, -1
+    for i, name in enumerate(table.names):
+        if name == selected_voice:
+            return get_voices(language_key)[i]
+        score = 0
+        if gender and table.genders[i] == gender:
+            score += _GENDER_WEIGHT
+        if accent and accent in table.accents[i]:
+            score += _ACCENT_WEIGHT
+        if characteristic and characteristic in table.characteristics[i]:
+            score += _CHARACTERISTIC_WEIGHT
+        if score > best_score:
+            best_i, best_score = i, score
+
+    return get_voices(language_key)[best_i]
+
+def get_voice_for_language(language: str, userdata: DeepgramMultilingualData) -> DeepgramVoiceConfig:
+    """Get the appropriate voice for a language based on user preferences."""
+    return _resolve_voice(
+        language.lower(),
+        userdata.selected_voice,
+        userdata.preferred_voice_gender,
+        userdata.preferred_accent,
+        userdata.preferred_voice_characteristic,
+    )
 
+@functools.lru_cache(maxsize=None)
 def get_voice_options_text(language: str) -> str:
     """Get a formatted text of available voices for a language."""
     language_key = language.lower()
-    if language_key not in DEEPGRAM_VOICES:
+    if language_key not in _VOICE_SPECS:
         return "Default voice available"
     
-    voices = DEEPGRAM_VOICES[language_key]
-    voice_list = []
-    
-    for voice in voices:
-        voice_list.append(f"- {voice.name.title()} ({voice.gender}, {voice.accent}): {voice.characteristics}")
-    
-    return "\n".join(voice_list)
+    # Formatted straight from the raw specs; the menu is fixed per language
+    return "\n".join(
+        f"- {name.title()} ({gender}, {accent}): {characteristics}"
+        for _, name, gender, _, _, accent, characteristics, _ in _VOICE_SPECS[language_key]
+    )
+
+# Language agent instructions with the voice menu rendered in once; the menu
+# depends only on the static catalog, so agents never re-render it
+_EN_INSTRUCTIONS_WITH_VOICES = f"{_EN_INSTRUCTIONS} Available voices:\n{get_voice_options_text('english')}\n"
+_ES_INSTRUCTIONS_WITH_VOICES = f"{_ES_INSTRUCTIONS} Voces disponibles:\n{get_voice_options_text('spanish')}\n"
 
 # Welcome Agent - Initial language selection
 class DeepgramWelcomeAgent(Agent):
     def __init__(self) -> None:
         super().__init__(
-            instructions=f"{common_instructions} "
-            "Your goal is to welcome users and help them choose their preferred language (English or Spanish) and voice. "
-            "Ask them to choose their preferred language or start speaking in their language. "
-            "Also ask about their voice preference (masculine/feminine, accent, and characteristics). "
-            "Be warm and inviting. Start with a bilingual greeting in both English and Spanish."
+            instructions=_WELCOME_INSTRUCTIONS
         )
 
     async def on_enter(self):
@@ -293,42 +372,109 @@ class DeepgramWelcomeAgent(Agent):
         if specific_voice:
             context.userdata.selected_voice = specific_voice
 
-        # Create appropriate language-specific agent
-        if language.lower() in ["english", "en"]:
-            agent = DeepgramEnglishAgent(context.userdata.user_name, context.userdata.user_location, userdata=context.userdata)
-        elif language.lower() in ["spanish", "es", "español"]:
-            agent = DeepgramSpanishAgent(context.userdata.user_name, context.userdata.user_location, userdata=context.userdata)
-        else:
-            # Default to English if language not recognized
-            agent = DeepgramEnglishAgent(context.userdata.user_name, context.userdata.user_location, userdata=context.userdata)
+        # Create appropriate language-specific agent, defaulting to English
+        lang_key = language.strip().lower()
+        agent_cls = _LANG_TO_AGENT.get(lang_key, DeepgramEnglishAgent)
+        agent = agent_cls(context.userdata.user_name, context.userdata.user_location, userdata=context.userdata)
 
-        # Get the selected voice for the language
-        selected_voice = get_voice_for_language(language, context.userdata)
-        voice_info = f" with {selected_voice.name.title()} voice ({selected_voice.accent} accent)"
+        # Get the selected voice for the agent's (already normalized) language
+        selected_voice = get_voice_for_language(agent_cls.language_key, context.userdata)
+        voice_info = f" with {selected_voice.display_name} voice ({selected_voice.accent} accent)"
         
         return agent, f"Switching to {language} mode{voice_info}. How can I help you today?"
 
+# Deepgram clients are reused across agent handoffs and voice changes so a
+# swap does not pay for a fresh client (and its connection setup) each time
+_STT_CACHE: dict = {}
+_TTS_CACHE: dict = {}
+
+# One keep-alive HTTP connection pool shared by every Deepgram client, so
+# requests after the first skip the TCP/TLS handshake
+_http_session: Optional[aiohttp.ClientSession] = None
+
+def _get_http_session() -> aiohttp.ClientSession:
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        _http_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=100, keepalive_timeout=300, ttl_dns_cache=300)
+        )
+    return _http_session
+
+async def _close_http_session():
+    """Close the shared HTTP session and drop the clients bound to it."""
+    global _http_session
+    _STT_CACHE.clear()
+    _TTS_CACHE.clear()
+    if _http_session is not None:
+        await _http_session.close()
+        _http_session = None
+
+# Jobs in this process using the shared session and clients; they are closed
+# only when the last one shuts down, never under a job that is still running
+_http_session_users = 0
+
+def _retain_http_session(ctx: JobContext):
+    global _http_session_users
+    _http_session_users += 1
+    ctx.add_shutdown_callback(_release_http_session)
+
+async def _release_http_session():
+    global _http_session_users
+    _http_session_users -= 1
+    if _http_session_users == 0:
+        await _close_http_session()
+
+# Streaming STT settings tuned for conversational turn-taking: 16kHz mono
+# PCM from the room, interim results, and a short endpointing window so
+# Deepgram finalizes soon after the user stops talking
+_STT_OPTIONS = dict(
+    sample_rate=16000,
+    interim_results=True,
+    smart_format=True,
+    punctuate=True,
+    no_delay=True,
+    endpointing_ms=150,
+)
+
+def _get_stt(language: str, model: str = "nova-3"):
+    """Return a shared Deepgram STT client for the given model and language."""
+    key = (model, language)
+    stt = _STT_CACHE.get(key)
+    if stt is None:
+        stt = _STT_CACHE[key] = deepgram.STT(
+            model=model, language=language, http_session=_get_http_session(), **_STT_OPTIONS
+        )
+    return stt
+
+def _get_tts(model: str):
+    """Return a shared Deepgram TTS client for the given voice model."""
+    tts = _TTS_CACHE.get(model)
+    if tts is None:
+        tts = _TTS_CACHE[model] = deepgram.TTS(model=model, http_session=_get_http_session())
+        # The plugin streams over Deepgram's /v1/speak websocket; open the
+        # pooled connection now so the first utterance does not pay for it
+        tts.prewarm()
+    return tts
+
 # English Language Agent with Deepgram
 class DeepgramEnglishAgent(Agent):
+    language_key = "english"
+
     def __init__(self, user_name: Optional[str] = None, user_location: Optional[str] = None, *, chat_ctx: Optional[ChatContext] = None, userdata: Optional[DeepgramMultilingualData] = None) -> None:
         name_context = f" The user's name is {user_name}." if user_name else ""
         location_context = f" They are from {user_location}." if user_location else ""
         
         # Get the appropriate voice for English
-        selected_voice = get_voice_for_language("english", userdata) if userdata else DEEPGRAM_VOICES["english"][0]
+        selected_voice = get_voice_for_language(self.language_key, userdata) if userdata else get_voices(self.language_key)[0]
         
         super().__init__(
-            instructions=f"{common_instructions} "
-            "You are now in English mode. Provide helpful assistance in clear, professional English. "
-            "Handle general questions, provide information, help with tasks, offer translations to Spanish, "
-            "and engage in natural conversation. Use American English conventions and be friendly yet professional. "
-            "You can seamlessly switch to Spanish when needed."
-            f"{name_context}{location_context}",
+            instructions=_EN_INSTRUCTIONS_WITH_VOICES + name_context + location_context,
             # Use Deepgram STT and TTS for English
-            stt=deepgram.STT(model="nova-3", language="en") if DEEPGRAM_AVAILABLE else None,
-            tts=deepgram.TTS(model=selected_voice.model) if DEEPGRAM_AVAILABLE else None,
+            stt=_get_stt("en"),
+            tts=_get_tts(selected_voice.model),
             chat_ctx=chat_ctx,
         )
+        self._current_tts_model = selected_voice.model
 
     async def on_enter(self):
         self.session.generate_reply()
@@ -346,10 +492,9 @@ class DeepgramEnglishAgent(Agent):
         """
         context.userdata.current_language = new_language
         
-        if new_language.lower() in ["spanish", "es", "español"]:
-            agent = DeepgramSpanishAgent(context.userdata.user_name, context.userdata.user_location, chat_ctx=context.chat_ctx, userdata=context.userdata)
-        else:
-            agent = DeepgramEnglishAgent(context.userdata.user_name, context.userdata.user_location, chat_ctx=context.chat_ctx, userdata=context.userdata)
+        # Unrecognized languages stay with this agent's language
+        agent_cls = _LANG_TO_AGENT.get(new_language.strip().lower(), type(self))
+        agent = agent_cls(context.userdata.user_name, context.userdata.user_location, chat_ctx=context.chat_ctx, userdata=context.userdata)
         
         return agent, f"Switching to {new_language} mode."
 
@@ -379,16 +524,16 @@ class DeepgramEnglishAgent(Agent):
         if specific_voice:
             context.userdata.selected_voice = specific_voice
         
-        # Get the new voice for current language
-        new_voice = get_voice_for_language(context.userdata.current_language or "english", context.userdata)
+        # Get the new voice for this agent's language
+        new_voice = get_voice_for_language(self.language_key, context.userdata)
+        if new_voice.model == self._current_tts_model:
+            return f"{new_voice.display_name} is already the active voice."
         
-        # Create new agent with updated voice
-        if context.userdata.current_language and context.userdata.current_language.lower() in ["english", "en"]:
-            agent = DeepgramEnglishAgent(context.userdata.user_name, context.userdata.user_location, chat_ctx=context.chat_ctx, userdata=context.userdata)
-        else:
-            agent = DeepgramSpanishAgent(context.userdata.user_name, context.userdata.user_location, chat_ctx=context.chat_ctx, userdata=context.userdata)
+        # Hand off to a fresh agent with the new voice; its STT and TTS come
+        # from the shared client caches, so no new connections are opened
+        agent = DeepgramEnglishAgent(context.userdata.user_name, context.userdata.user_location, chat_ctx=context.chat_ctx, userdata=context.userdata)
         
-        return agent, f"Voice updated to {new_voice.name.title()} ({new_voice.accent} accent)!"
+        return agent, f"Voice updated to {new_voice.display_name} ({new_voice.accent} accent)!"
 
     @function_tool
     async def translate_to_spanish(
@@ -426,25 +571,23 @@ class DeepgramEnglishAgent(Agent):
 
 # Spanish Language Agent with Deepgram
 class DeepgramSpanishAgent(Agent):
+    language_key = "spanish"
+
     def __init__(self, user_name: Optional[str] = None, user_location: Optional[str] = None, *, chat_ctx: Optional[ChatContext] = None, userdata: Optional[DeepgramMultilingualData] = None) -> None:
         name_context = f" El nombre del usuario es {user_name}." if user_name else ""
         location_context = f" Son de {user_location}." if user_location else ""
         
         # Get the appropriate voice for Spanish
-        selected_voice = get_voice_for_language("spanish", userdata) if userdata else DEEPGRAM_VOICES["spanish"][0]
+        selected_voice = get_voice_for_language(self.language_key, userdata) if userdata else get_voices(self.language_key)[0]
         
         super().__init__(
-            instructions=f"{common_instructions} "
-            "Ahora estás en modo español. Proporciona asistencia útil en español claro y profesional. "
-            "Maneja preguntas generales, proporciona información, ayuda con tareas, ofrece traducciones al inglés, "
-            "y participa en conversaciones naturales. Usa convenciones del español y sé amigable pero profesional. "
-            "Puedes cambiar sin problemas al inglés cuando sea necesario."
-            f"{name_context}{location_context}",
+            instructions=_ES_INSTRUCTIONS_WITH_VOICES + name_context + location_context,
             # Use Deepgram STT and TTS for Spanish
-            stt=deepgram.STT(model="nova-3", language="es") if DEEPGRAM_AVAILABLE else None,
-            tts=deepgram.TTS(model=selected_voice.model) if DEEPGRAM_AVAILABLE else None,
+            stt=_get_stt("es"),
+            tts=_get_tts(selected_voice.model),
             chat_ctx=chat_ctx,
         )
+        self._current_tts_model = selected_voice.model
 
     async def on_enter(self):
         self.session.generate_reply()
@@ -462,10 +605,9 @@ class DeepgramSpanishAgent(Agent):
         """
         context.userdata.current_language = new_language
         
-        if new_language.lower() in ["english", "en", "inglés"]:
-            agent = DeepgramEnglishAgent(context.userdata.user_name, context.userdata.user_location, chat_ctx=context.chat_ctx, userdata=context.userdata)
-        else:
-            agent = DeepgramSpanishAgent(context.userdata.user_name, context.userdata.user_location, chat_ctx=context.chat_ctx, userdata=context.userdata)
+        # Unrecognized languages stay with this agent's language
+        agent_cls = _LANG_TO_AGENT.get(new_language.strip().lower(), type(self))
+        agent = agent_cls(context.userdata.user_name, context.userdata.user_location, chat_ctx=context.chat_ctx, userdata=context.userdata)
         
         return agent, f"Cambiando al modo {new_language}."
 
@@ -495,16 +637,16 @@ class DeepgramSpanishAgent(Agent):
         if specific_voice:
             context.userdata.selected_voice = specific_voice
         
-        # Get the new voice for current language
-        new_voice = get_voice_for_language(context.userdata.current_language or "spanish", context.userdata)
+        # Get the new voice for this agent's language
+        new_voice = get_voice_for_language(self.language_key, context.userdata)
+        if new_voice.model == self._current_tts_model:
+            return f"{new_voice.display_name} ya es la voz activa."
         
-        # Create new agent with updated voice
-        if context.userdata.current_language and context.userdata.current_language.lower() in ["english", "en", "inglés"]:
-            agent = DeepgramEnglishAgent(context.userdata.user_name, context.userdata.user_location, chat_ctx=context.chat_ctx, userdata=context.userdata)
-        else:
-            agent = DeepgramSpanishAgent(context.userdata.user_name, context.userdata.user_location, chat_ctx=context.chat_ctx, userdata=context.userdata)
+        # Hand off to a fresh agent with the new voice; its STT and TTS come
+        # from the shared client caches, so no new connections are opened
+        agent = DeepgramSpanishAgent(context.userdata.user_name, context.userdata.user_location, chat_ctx=context.chat_ctx, userdata=context.userdata)
         
-        return agent, f"¡Voz actualizada a {new_voice.name.title()} (acento {new_voice.accent})!"
+        return agent, f"¡Voz actualizada a {new_voice.display_name} (acento {new_voice.accent})!"
 
     @function_tool
     async def translate_to_english(
@@ -539,23 +681,29 @@ class DeepgramSpanishAgent(Agent):
         lkapi = job_ctx.api
         await lkapi.room.delete_room(api.DeleteRoomRequest(room=job_ctx.room.name))
 
+# Language name/code -> agent class, used for all language routing
+_LANG_TO_AGENT = {
+    "english": DeepgramEnglishAgent,
+    "en": DeepgramEnglishAgent,
+    "inglés": DeepgramEnglishAgent,
+    "spanish": DeepgramSpanishAgent,
+    "es": DeepgramSpanishAgent,
+    "español": DeepgramSpanishAgent,
+}
+
 # Main entrypoint
 async def entrypoint(ctx: JobContext):
-    if not DEEPGRAM_AVAILABLE:
-        logger.error("Deepgram plugin not available. Please install it to use this agent.")
-        return
-    
     await ctx.connect()
+    _retain_http_session(ctx)
 
     # Parse metadata from token to get user configuration
     metadata = {}
     if ctx.job.metadata:
         try:
-            import json
-            metadata = json.loads(ctx.job.metadata)
-            logger.info(f"Received metadata: {metadata}")
+            metadata = _json_loads(ctx.job.metadata)
+            logger.info("Received metadata: %s", metadata)
         except Exception as e:
-            logger.warning(f"Failed to parse metadata: {e}")
+            logger.warning("Failed to parse metadata: %s", e)
 
     # Extract configuration from metadata
     user_preferences = metadata.get("user_preferences", {})
@@ -574,42 +722,34 @@ async def entrypoint(ctx: JobContext):
 
     # Get the appropriate voice configuration
     selected_voice_config = get_voice_for_language(language, userdata)
-    logger.info(f"Selected voice: {selected_voice_config.name} ({selected_voice_config.model}) for language: {language}")
+    logger.info("Selected voice: %s (%s) for language: %s", selected_voice_config.name, selected_voice_config.model, language)
 
     session = AgentSession[DeepgramMultilingualData](
         # Configure default models - agents can override these
-        llm=google.LLM(model="gemini-2.0-flash-001", api_key=os.getenv("GEMINI_API_KEY")),
-        stt=deepgram.STT(model="nova-3", language=language),  # Use configured language
-        tts=deepgram.TTS(model=selected_voice_config.model),  # Use configured voice
+        llm=google.LLM(model="gemini-2.0-flash-001", api_key=GEMINI_API_KEY),
+        stt=_get_stt(language),  # Use configured language
+        tts=_get_tts(selected_voice_config.model),  # Use configured voice
         userdata=userdata,
     )
 
-    # Set up metrics collection
-    usage_collector = metrics.UsageCollector()
-
-    @session.on("metrics_collected")
-    def _on_metrics_collected(ev: MetricsCollectedEvent):
-        metrics.log_metrics(ev.metrics)
-        usage_collector.collect(ev.metrics)
+    # Set up metrics collection, logged and aggregated in batches
+    metrics_batcher = MetricsBatcher()
+    metrics_batcher.attach(session)
 
     async def log_usage():
-        summary = usage_collector.get_summary()
-        logger.info(f"Usage: {summary}")
+        summary = await metrics_batcher.close()
+        logger.info("Usage: %s", summary)
 
     ctx.add_shutdown_callback(log_usage)
 
     # Start with appropriate agent based on configuration
     if metadata.get("user_preferences") and language:
-        # If we have configuration, start directly with the language-specific agent
-        if language.lower() in ["english", "en"]:
-            initial_agent = DeepgramEnglishAgent(userdata=userdata)
-        elif language.lower() in ["spanish", "es", "español"]:
-            initial_agent = DeepgramSpanishAgent(userdata=userdata)
-        else:
-            # Default to English if language not recognized
-            initial_agent = DeepgramEnglishAgent(userdata=userdata)
+        # If we have configuration, start directly with the language-specific
+        # agent, defaulting to English if language not recognized
+        agent_cls = _LANG_TO_AGENT.get(language.strip().lower(), DeepgramEnglishAgent)
+        initial_agent = agent_cls(userdata=userdata)
         
-        logger.info(f"Starting with pre-configured {language} agent")
+        logger.info("Starting with pre-configured %s agent", language)
     else:
         # No configuration provided, start with welcome agent
         initial_agent = DeepgramWelcomeAgent()
@@ -1,10 +1,11 @@
 # Deepgram Voice Configuration Helper
 # This file provides easy access to voice configurations and utilities
 
-from typing import Dict, List, Optional
+from collections import defaultdict
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Tuple
 from dataclasses import dataclass
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class VoiceInfo:
     """Voice information for easy access"""
     model: str
@@ -153,36 +154,82 @@ ALL_SPANISH_VOICES = [
 ]
 
 # Codeswitching Voices (can switch between English and Spanish)
-CODESWITCHING_VOICES = [
+CODESWITCHING_VOICES = frozenset({
     "aquila", "carina", "diana", "javier", "selena"
-]
+})
+
+# Lookup tables built once at import. Names map straight to voices; gender
+# keys map to catalog positions so results keep catalog order.
+_VOICES_BY_LANGUAGE = {"english": ALL_ENGLISH_VOICES, "spanish": ALL_SPANISH_VOICES}
+
+def _build_index(voices: List[VoiceInfo], keys_for) -> Dict[str, FrozenSet[int]]:
+    index = defaultdict(set)
+    for position, voice in enumerate(voices):
+        for key in keys_for(voice):
+            index[key].add(position)
+    return {key: frozenset(positions) for key, positions in index.items()}
+
+class _SubstringIndex(NamedTuple):
+    """Lowercased field text per voice, plus precomputed answers for its common queries.
+
+    Queries match when they are a substring of a voice's text. Every single
+    accent or characteristic (the usual query) is answered by one dict lookup;
+    anything else, such as a multi-word phrase, falls back to a scan.
+    """
+    texts: Tuple[str, ...]
+    positions: Dict[str, Tuple[int, ...]]
+
+def _build_substring_index(voices: List[VoiceInfo], field) -> _SubstringIndex:
+    texts = tuple(field(voice).lower() for voice in voices)
+    keys = {part for text in texts for part in text.split(", ")}
+    positions = {key: tuple(i for i, text in enumerate(texts) if key in text) for key in keys}
+    return _SubstringIndex(texts, positions)
+
+_VOICES_BY_NAME = {
+    lang: {voice.name.lower(): voice for voice in voices} for lang, voices in _VOICES_BY_LANGUAGE.items()
+}
+_BY_GENDER = {
+    lang: _build_index(voices, lambda v: (v.gender.lower(),)) for lang, voices in _VOICES_BY_LANGUAGE.items()
+}
+_BY_ACCENT = {
+    lang: _build_substring_index(voices, lambda v: v.accent) for lang, voices in _VOICES_BY_LANGUAGE.items()
+}
+_BY_CHARACTERISTIC = {
+    lang: _build_substring_index(voices, lambda v: v.characteristics)
+    for lang, voices in _VOICES_BY_LANGUAGE.items()
+}
+
+def _language_key(language: str) -> str:
+    return "english" if language.lower() == "english" else "spanish"
+
+def _voices_matching(index: _SubstringIndex, query: str, language: str) -> List[VoiceInfo]:
+    """Voices whose field text contains the query, in catalog order."""
+    query = query.lower()
+    positions = index.positions.get(query)
+    if positions is None:
+        positions = [i for i, text in enumerate(index.texts) if query in text]
+    voices = _VOICES_BY_LANGUAGE[language]
+    return [voices[i] for i in positions]
 
 def get_voice_by_name(name: str, language: str = "english") -> Optional[VoiceInfo]:
     """Get voice information by name and language."""
-    voices = ALL_ENGLISH_VOICES if language.lower() == "english" else ALL_SPANISH_VOICES
-    
-    for voice in voices:
-        if voice.name.lower() == name.lower():
-            return voice
-    return None
+    return _VOICES_BY_NAME[_language_key(language)].get(name.lower())
 
 def get_voices_by_gender(gender: str, language: str = "english") -> List[VoiceInfo]:
     """Get all voices of a specific gender for a language."""
-    voices = ALL_ENGLISH_VOICES if language.lower() == "english" else ALL_SPANISH_VOICES
-    
-    return [voice for voice in voices if voice.gender.lower() == gender.lower()]
+    lang = _language_key(language)
+    voices = _VOICES_BY_LANGUAGE[lang]
+    return [voices[i] for i in sorted(_BY_GENDER[lang].get(gender.lower(), ()))]
 
 def get_voices_by_accent(accent: str, language: str = "english") -> List[VoiceInfo]:
     """Get all voices with a specific accent for a language."""
-    voices = ALL_ENGLISH_VOICES if language.lower() == "english" else ALL_SPANISH_VOICES
-    
-    return [voice for voice in voices if accent.lower() in voice.accent.lower()]
+    lang = _language_key(language)
+    return _voices_matching(_BY_ACCENT[lang], accent, lang)
 
 def get_voices_by_characteristic(characteristic: str, language: str = "english") -> List[VoiceInfo]:
     """Get all voices with a specific characteristic for a language."""
-    voices = ALL_ENGLISH_VOICES if language.lower() == "english" else ALL_SPANISH_VOICES
-    
-    return [voice for voice in voices if characteristic.lower() in voice.characteristics.lower()]
+    lang = _language_key(language)
+    return _voices_matching(_BY_CHARACTERISTIC[lang], characteristic, lang)
 
 def get_featured_voices(language: str = "english") -> List[VoiceInfo]:
     """Get featured voices for a language."""
@@ -202,6 +249,6 @@ def get_voice_summary(language: str = "english") -> str:
         summary += f"- {voice.name.title()} ({voice.gender}, {voice.accent}): {voice.characteristics}\n"
     
     summary += f"\nTotal {language.title()} voices available: {len(all_voices)}\n"
-    summary += f"Codeswitching voices: {', '.join(CODESWITCHING_VOICES)}"
+    summary += f"Codeswitching voices: {', '.join(sorted(CODESWITCHING_VOICES))}"
     
     return summary
@@ -1,27 +1,77 @@
 import os
+import queue
+import atexit
 import ast
 import json
 import logging
+import logging.handlers
 import asyncio
+import importlib.util
+import uuid
 from datetime import datetime, timedelta
-from typing import Tuple, Dict, Any
+from typing import Tuple, Dict, Any, Optional, AsyncIterator
 
+import aiohttp
 import dotenv
-from livekit.agents import JobContext, AgentSession, WorkerOptions, WorkerType, cli
-from livekit.plugins import silero, openai, deepgram, cartesia, groq
-from livekit.plugins import spitch
+from livekit.agents import JobContext, JobProcess, AgentSession, WorkerOptions, WorkerType, cli
 
 from .dispatcher.dispatcher_agent import dispatcher
 from .provider.config import provider_config_manager
 
-from app.core.livekit_import import (
-    SILERO_AVAILABLE, PLUGINS_AVAILABLE, GROQ_AVAILABLE, elevenlabs
-)
+from app.utils.event_loop import install_uvloop
+from app.utils.text import sentence_chunks
+
+# orjson is noticeably faster for metadata parsing; fall back to stdlib json
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
 
 # --- Load env & logging ---
-dotenv.load_dotenv()
+# Parse .env once per process tree: child worker processes inherit the
+# loaded environment, and deployments that inject env directly can skip it
+# with SKIP_DOTENV=1
+if not os.environ.get("_DOTENV_LOADED") and not os.environ.get("SKIP_DOTENV"):
+    dotenv.load_dotenv()
+    os.environ["_DOTENV_LOADED"] = "1"
+LIVEKIT_URL = os.getenv("LIVEKIT_URL")
+LIVEKIT_API_KEY = os.getenv("LIVEKIT_API_KEY")
+LIVEKIT_API_SECRET = os.getenv("LIVEKIT_API_SECRET")
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
+_log_listener: Optional[logging.handlers.QueueListener] = None
+
+def start_log_listener():
+    """Moves the root handlers behind a queue, once per process.
+
+    Records are queued by the caller and written out by a background listener
+    thread, so logging never blocks the event loop on stream I/O.
+    """
+    global _log_listener
+    if _log_listener is not None:
+        return
+    root = logging.getLogger()
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+    _log_listener = logging.handlers.QueueListener(log_queue, *root.handlers, respect_handler_level=True)
+    root.handlers = [logging.handlers.QueueHandler(log_queue)]
+    _log_listener.start()
+    atexit.register(_log_listener.stop)
+
+def _plugin_available(name: str) -> bool:
+    """Whether a LiveKit plugin is installed, checked without importing it."""
+    try:
+        return importlib.util.find_spec(f"livekit.plugins.{name}") is not None
+    except ImportError:
+        return False
+
+# Plugins are imported where they are used; only their presence is checked here
+SILERO_AVAILABLE = _plugin_available("silero")
+GROQ_AVAILABLE = _plugin_available("groq")
+
+# Silero VAD is loaded once per worker process and shared by every session
+_vad_singleton: Optional["silero.VAD"] = None
+_vad_lock = asyncio.Lock()
 
 
 # -------------------------------------------------------------------
@@ -39,18 +89,28 @@ def parse_metadata(ctx: JobContext) -> dict:
         return {}
 
     if not isinstance(metadata, str):
-        logging.warning(f"Metadata is not a string: {type(metadata)}")
+        logging.warning("Metadata is not a string: %s", type(metadata))
         return {}
 
+    parsed = _parse_metadata_string(metadata)
+    return parsed if isinstance(parsed, dict) else {}
+
+def _parse_metadata_string(metadata: str) -> dict:
+    """Parses a metadata string as JSON, falling back to a Python dict literal."""
     try:
         # Try JSON first
-        return json.loads(metadata)
-    except json.JSONDecodeError:
+        return _json_loads(metadata)
+    except ValueError:
+        # Only Python dict strings (single-quoted keys) are worth the cost
+        # of compiling an AST; anything else is just malformed
+        if "'" not in metadata or "{" not in metadata:
+            logging.warning("Failed to parse metadata: not valid JSON")
+            return {}
         try:
             # Fallback: safely evaluate Python dict string
             return ast.literal_eval(metadata)
         except Exception as e:
-            logging.warning(f"Failed to parse metadata: {e}")
+            logging.warning("Failed to parse metadata: %s", e)
             return {}
 
 def identify_call_and_tenant(metadata: Dict[str, Any]) -> Tuple[str, bool]:
@@ -58,7 +118,7 @@ def identify_call_and_tenant(metadata: Dict[str, Any]) -> Tuple[str, bool]:
     is_phone_call = "sip_from" in metadata or "sip_to" in metadata
     if is_phone_call:
         caller, called_number = metadata.get("sip_from"), metadata.get("sip_to")
-        logger.info(f"📞 Phone call: from={caller} to={called_number}")
+        logger.info("📞 Phone call: from=%s to=%s", caller, called_number)
         tenant_id = dispatcher.resolve_tenant_from_number(called_number)
     else:
         logger.info("🌐 WebRTC session detected")
@@ -87,7 +147,12 @@ async def load_agent_and_llm(ctx: JobContext, metadata: Dict, tenant_id: str, ag
     agent = await dispatcher.loader.get_agent_instance(
         metadata.get("agent_type"), tenant_id, agent_name, ctx, agent_definition
     )
-    llm_client = groq.LLM() if GROQ_AVAILABLE else openai.LLM(model="gpt-4", temperature=0.7)
+    if GROQ_AVAILABLE:
+        from livekit.plugins import groq
+        llm_client = groq.LLM()
+    else:
+        from livekit.plugins import openai
+        llm_client = openai.LLM(model="gpt-4", temperature=0.7)
 
     await agent.initialize_components(
         llm_client,
@@ -98,31 +163,135 @@ async def load_agent_and_llm(ctx: JobContext, metadata: Dict, tenant_id: str, ag
     )
     return agent, llm_client
 
+# Keep-alive HTTP connection pool shared by provider clients that accept one
+_http_session: Optional[aiohttp.ClientSession] = None
+
+def get_http_session() -> aiohttp.ClientSession:
+    """Returns the worker's shared HTTP session, creating it on first use."""
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        _http_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=100, keepalive_timeout=300, ttl_dns_cache=300)
+        )
+    return _http_session
+
+async def close_http_session():
+    """Closes the shared HTTP session and the client bound to it."""
+    global _http_session, _default_stt
+    # The cached client is bound to this session
+    _default_stt = None
+    if _http_session is not None:
+        await _http_session.close()
+        _http_session = None
+
+# Jobs in this process using the shared session; it is closed only when the
+# last one shuts down, never under a job that is still running
+_http_session_users = 0
+
+def retain_http_session(ctx: JobContext):
+    """Marks the job as a session user until its shutdown."""
+    global _http_session_users
+    _http_session_users += 1
+    ctx.add_shutdown_callback(release_http_session)
+
+async def release_http_session():
+    global _http_session_users
+    _http_session_users -= 1
+    if _http_session_users == 0:
+        await close_http_session()
+
+# Fallback Deepgram STT, built once and reused by every session so each
+# session only opens its own stream rather than a whole new client
+_default_stt: Optional["deepgram.STT"] = None
+
+def get_default_stt() -> "deepgram.STT":
+    """Returns the shared fallback Deepgram STT client."""
+    global _default_stt
+    if _default_stt is None:
+        from livekit.plugins import deepgram
+        _default_stt = deepgram.STT(
+            model="nova-3",
+            sample_rate=16000,
+            interim_results=True,
+            smart_format=True,
+            punctuate=True,
+            no_delay=True,
+            endpointing_ms=150,
+            http_session=get_http_session(),
+        )
+    return _default_stt
+
+async def get_vad():
+    """Returns the worker's shared Silero VAD, loading it on first use."""
+    global _vad_singleton
+    # Fast path once loaded: no lock round-trip for later sessions
+    if _vad_singleton is not None:
+        return _vad_singleton
+    async with _vad_lock:
+        if _vad_singleton is None:
+            from livekit.plugins import silero
+            _vad_singleton = await asyncio.to_thread(silero.VAD.load)
+    return _vad_singleton
+
 async def setup_agent_session(llm_client) -> AgentSession:
     """Configures and returns the main AgentSession."""
-    vad_component = await asyncio.to_thread(silero.VAD.load) if SILERO_AVAILABLE else None
-    stt_client = provider_config_manager.get_stt_client() or deepgram.STT()
+    from livekit.plugins import spitch
+
+    # Start the VAD load first so it runs in its thread while the STT/TTS
+    # clients are built on the loop
+    vad_task = asyncio.create_task(get_vad()) if SILERO_AVAILABLE else None
+    # Yield once so the task reaches its to_thread call before the blocking
+    # client construction below; otherwise the load only starts at the await
+    await asyncio.sleep(0)
+    stt_client = provider_config_manager.get_stt_client() or get_default_stt()
     # tts_client = provider_config_manager.get_tts_client() or deepgram.TTS()
     # tts_client = elevenlabs.TTS(voice_id="9Dbo4hEvXQ5l7MXGZFQA", model="eleven_multilingual_v2")
     tts_client = spitch.TTS(language="en", voice="kani")
+    vad_component = await vad_task if vad_task else None
 
     return AgentSession(stt=stt_client, llm=llm_client, tts=tts_client, vad=vad_component, preemptive_generation=True)
 
+async def guard_stream(chunks: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Passes a streamed reply through; errors raised mid-stream are logged
+    and end the reply instead of escaping into the TTS pipeline."""
+    spoke = False
+    try:
+        async for chunk in chunks:
+            spoke = True
+            yield chunk
+    except Exception as e:
+        logger.error("Streamed reply failed: %s", e)
+        if not spoke:
+            yield "I’m having trouble processing that right now."
+
 def register_event_handlers(session: AgentSession, agent, llm_client):
     """Defines and attaches event handlers to the agent session."""
+    # Keep references to in-flight turn tasks so they can't be garbage
+    # collected before they finish
+    pending_tasks: set = set()
+
     @session.on("user_speech_committed")
     def on_user_speech(ev):
-        logger.info(f"User said: {ev.user_transcript}")
+        logger.info("User said: %s", ev.user_transcript)
         async def process():
             try:
-                response = await agent.process_workflow_message(ev.user_transcript, llm_client)
-                if response:
-                    await session.say(response)
-                    logger.info(f"Agent responded: {response[:100]}...")
+                response, _ = await agent.process_workflow_message(ev.user_transcript, llm_client)
+                if isinstance(response, str):
+                    if response:
+                        await session.say(response)
+                        logger.info("Agent responded: %.100s...", response)
+                elif response is not None:
+                    # Streamed replies get sentence-by-sentence TTS, so audio
+                    # starts before the whole response is generated. A single
+                    # say() keeps playback ordered and interruptible.
+                    await session.say(sentence_chunks(guard_stream(response)), allow_interruptions=True)
+                    logger.info("Agent streamed response")
             except Exception as e:
-                logger.error(f"Speech processing error: {e}")
+                logger.error("Speech processing error: %s", e)
                 await session.say("I’m having trouble processing that right now.")
-        asyncio.create_task(process())
+        task = asyncio.create_task(process())
+        pending_tasks.add(task)
+        task.add_done_callback(pending_tasks.discard)
 
     @session.on("agent_state_changed")
     def on_agent_state_changed(ev):
@@ -139,32 +308,32 @@ async def start_session_and_greet(session: AgentSession, agent, ctx: JobContext)
         initial_message = await agent.get_initial_message()
         if initial_message:
             await session.say(initial_message)
-            logger.info(f"🌐 Initial message: {initial_message}")
+            logger.info("🌐 Initial message: %s", initial_message)
     except Exception as e:
-        logger.error(f"Failed to send initial message: {e}")
+        logger.error("Failed to send initial message: %s", e)
 
 async def handle_session_end(session: AgentSession, session_id: str, account_id: str, orchestrator, analytics_service):
     """Waits for the session to end and performs cleanup and reporting tasks."""
     try:
         await session.wait_for_session_end()
     except Exception as e:
-        logger.error(f"Session ended with error: {e}")
+        logger.error("Session ended with error: %s", e)
     finally:
         await metrics_collector.stop_collection(session_id)
 
         # Log summaries
-        logger.info(f"Payment summary: {metrics_collector.get_usage_summary(session_id)}")
+        logger.info("Payment summary: %s", metrics_collector.get_usage_summary(session_id))
         final_balance = orchestrator.get_account_status(account_id).get('credit_status', {}).get('balance', 0)
-        logger.info(f"Final balance: ${final_balance}")
+        logger.info("Final balance: $%s", final_balance)
 
         # Generate analytics
         try:
             end_date = datetime.utcnow()
             start_date = end_date - timedelta(hours=1)
             session_analytics = await analytics_service.generate_payg_analytics(account_id, "custom", start_date, end_date)
-            logger.info(f"Analytics: {len(session_analytics.optimization_recommendations)} recommendations")
+            logger.info("Analytics: %d recommendations", len(session_analytics.optimization_recommendations))
         except Exception as e:
-            logger.error(f"Analytics generation failed: {e}")
+            logger.error("Analytics generation failed: %s", e)
 
 
 # -------------------------------------------------------------------
@@ -174,6 +343,7 @@ async def entrypoint(ctx: JobContext):
     """Main entry point for LiveKit agent runtime"""
     logger.info("🚀 Starting Qualification Agent")
     await ctx.connect()
+    retain_http_session(ctx)
 
     # --- Setup and Initialization ---
     metadata = parse_metadata(ctx)
@@ -183,7 +353,7 @@ async def entrypoint(ctx: JobContext):
     agent, llm_client = await load_agent_and_llm(ctx, metadata, tenant_id)
     
     # --- Build session context ---
-    session_id = f"{tenant_id}_{ctx.job.agent_name}_{int(asyncio.get_event_loop().time())}"
+    session_id = f"{tenant_id}_{ctx.job.agent_name}_{uuid.uuid4().hex[:12]}"
     # account_id = sample_account.account_id
     user_id = f"user_{tenant_id}"
 
@@ -206,20 +376,27 @@ async def entrypoint(ctx: JobContext):
 # -------------------------------------------------------------------
 # Worker options & main
 # -------------------------------------------------------------------
+def prewarm(proc: JobProcess):
+    """Per-process setup for job processes, run before they take a job."""
+    start_log_listener()
+
 def create_worker_options() -> WorkerOptions:
     """Creates worker options from environment variables."""
     return WorkerOptions(
         entrypoint_fnc=entrypoint,
-        ws_url=os.getenv("LIVEKIT_URL"),
-        api_key=os.getenv("LIVEKIT_API_KEY"),
-        api_secret=os.getenv("LIVEKIT_API_SECRET"),
+        prewarm_fnc=prewarm,
+        ws_url=LIVEKIT_URL,
+        api_key=LIVEKIT_API_KEY,
+        api_secret=LIVEKIT_API_SECRET,
         agent_name="boboyii-dispatcher",
         worker_type=WorkerType.PUBLISHER,
     )
 
 def main():
     """Main function to run the agent worker."""
+    start_log_listener()
     logger.info("Starting Boboyii Dispatcher Agent...")
+    install_uvloop()
     cli.run_app(create_worker_options())
 
 
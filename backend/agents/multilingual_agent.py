@@ -1,10 +1,14 @@
 # Modern Multilingual Agent using LiveKit Agents SDK
 # Based on the multi-agent pattern from the LiveKit blog
 
+import asyncio
+import functools
 import logging
 import os
-from dataclasses import dataclass
-from typing import Optional
+import sys
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Optional, Tuple
 
 from dotenv import load_dotenv
 
@@ -20,17 +24,15 @@ from livekit.agents import (
     RunContext,
     WorkerOptions,
     cli,
-    metrics,
 )
 from livekit.agents.job import get_current_job_context
 from livekit.agents.llm import function_tool
-from livekit.agents.voice import MetricsCollectedEvent
-from livekit.plugins import google
+
+from app.utils.metrics import MetricsBatcher
 # from app.core.livekit_import import deepgram, openai, silero, spitch
 # Import plugins with fallbacks for problematic dependencies
 try:
-    from livekit.plugins import openai, silero
-    from livekit.plugins import spitch
+    from livekit.plugins import silero, spitch
     PLUGINS_AVAILABLE = True
 except ImportError as e:
     PLUGINS_AVAILABLE = False
@@ -48,46 +50,104 @@ common_instructions = (
     "Be friendly, respectful, and culturally sensitive in all interactions."
 )
 
-# Voice configuration dataclass
-@dataclass
+# Per-agent instructions, fixed at import so the system prompt prefix is
+# byte-identical across agent swaps and users (provider prompt caching)
+_WELCOME_INSTR = (
+    f"{common_instructions} "
+    "Your goal is to welcome users and help them choose their preferred language and voice. "
+    "Ask them to choose their preferred language or start speaking in their language. "
+    "Also ask about their voice preference (masculine/feminine and characteristics like 'breezy', 'calm', 'loud', 'soft'). "
+    "Be warm and inviting. Start with a multilingual greeting."
+)
+_ENGLISH_BASE_INSTR = (
+    f"{common_instructions} "
+    "You are now in English mode. Provide helpful assistance in clear, professional English. "
+    "Handle general questions, provide information, help with tasks, offer translations to other languages, "
+    "and engage in natural conversation. Use American English conventions and be friendly yet professional."
+)
+_YORUBA_BASE_INSTR = (
+    f"{common_instructions} "
+    "O ti wa ni ipo Yoruba bayi. Pese iranwo ni ede Yoruba ti o ye kooro. "
+    "Lo awon oro ti o tọ bi 'ẹ jọwọ' (please), 'ẹ ṣe' (thank you), 'bawo ni' (how are you). "
+    "Ran awon eniyan lowo pelu awon ibeere, fun ni alaye, ṣe atumọ si awon ede miiran, "
+    "ati ṢIS oro tabi gbogbo iru iṣe ti won ba beere. Jẹ ki ibaraenisepo rẹ jẹ atunṣe ati ki o ni itọju."
+)
+_HAUSA_BASE_INSTR = (
+    f"{common_instructions} "
+    "Yanzu kuna cikin yanayin Hausa. Bayar da taimako a cikin Hausa mai kyau. "
+    "Yi amfani da kalmomi masu dacewa kamar 'don Allah' (please), 'na gode' (thank you), 'sannu da zuwa' (welcome). "
+    "Taimaka wa mutane da tambayoyi, bayar da bayanai, yi fassara zuwa wasu harsuna, "
+    "da yin hira akan duk wani batu da suke so. Kasance mai son zuciya kuma mai kulawa."
+)
+_IGBO_BASE_INSTR = (
+    f"{common_instructions} "
+    "Ị nọ ugbu a n'ọnọdụ Igbo. Nye enyemaka n'asụsụ Igbo dị mma. "
+    "Jiri okwu kwesịrị ekwesị dị ka 'biko' (please), 'daalụ' (thank you), 'ndewo' (hello). "
+    "Nyere ndị mmadụ aka na ajụjụ ha, nye ozi, tụgharịa asụsụ n'asụsụ ndị ọzọ, "
+    "ma kwurịta okwu gbasara ihe ọ bụla ha chọrọ. Bụrụ onye obiọma ma na-elekọta."
+)
+
+# Stable id so re-handoffs replace, rather than stack, the per-user context
+_USER_CONTEXT_ID = "user_context"
+
+def _with_user_context(chat_ctx: Optional[ChatContext], user_context: str) -> Optional[ChatContext]:
+    """Carry per-user details as a system message instead of in the instructions."""
+    if not user_context:
+        return chat_ctx
+    chat_ctx = chat_ctx.copy() if chat_ctx is not None else ChatContext()
+    index = chat_ctx.index_by_id(_USER_CONTEXT_ID)
+    if index is not None:
+        chat_ctx.items.pop(index)
+    chat_ctx.add_message(role="system", content=user_context.strip(), id=_USER_CONTEXT_ID)
+    return chat_ctx
+
+# Voice configuration dataclass (slotted and immutable: the catalog is static)
+@dataclass(slots=True, frozen=True)
 class VoiceConfig:
     language: str
     voice_name: str
     gender: str
     description: str
+    # Lowercased forms used for matching, computed once per voice
+    name_lower: str = field(init=False, repr=False, compare=False)
+    description_lower: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "name_lower", self.voice_name.lower())
+        object.__setattr__(self, "description_lower", self.description.lower())
 
 # Available voices by language
-AVAILABLE_VOICES = {
-    "yoruba": [
+AVAILABLE_VOICES = MappingProxyType({
+    "yoruba": (
         VoiceConfig("yoruba", "sade", "feminine", "Energetic, but breezy"),
         VoiceConfig("yoruba", "funmi", "feminine", "Calm, can sometimes be fun"),
         VoiceConfig("yoruba", "segun", "masculine", "Vibrant, yet cool"),
         VoiceConfig("yoruba", "femi", "masculine", "Really fun guy to interact with"),
-    ],
-    "hausa": [
+    ),
+    "hausa": (
         VoiceConfig("hausa", "hasan", "masculine", "Loud and clear voice"),
         VoiceConfig("hausa", "amina", "feminine", "A bit quiet and soft"),
         VoiceConfig("hausa", "zainab", "feminine", "Clear, loud voice"),
         VoiceConfig("hausa", "aliyu", "masculine", "Soft voice, cool tone"),
-    ],
-    "igbo": [
+    ),
+    "igbo": (
         VoiceConfig("igbo", "obinna", "masculine", "Loud and clear voice"),
         VoiceConfig("igbo", "ngozi", "feminine", "A bit quiet and soft"),
         VoiceConfig("igbo", "amara", "feminine", "Clear, loud voice"),
         VoiceConfig("igbo", "ebuka", "masculine", "Soft voice, cool tone"),
-    ],
-    "english": [
+    ),
+    "english": (
         VoiceConfig("english", "john", "masculine", "Loud and clear voice"),
         VoiceConfig("english", "lucy", "feminine", "Very clear voice"),
         VoiceConfig("english", "lina", "feminine", "Clear, loud voice"),
         VoiceConfig("english", "jude", "masculine", "Deep voice, smooth"),
         VoiceConfig("english", "henry", "masculine", "Soft voice, cool tone"),
         VoiceConfig("english", "kani", "feminine", "Soft voice, cool tone"),
-    ]
-}
+    ),
+})
 
-# Shared state dataclass
-@dataclass
+# Shared state dataclass (slotted: read on every tool call)
+@dataclass(slots=True)
 class MultilingualData:
     current_language: Optional[str] = None
     user_name: Optional[str] = None
@@ -98,33 +158,58 @@ class MultilingualData:
     preferred_voice_characteristic: Optional[str] = None  # "breezy", "calm", "loud", "soft", etc.
     selected_voice: Optional[str] = None  # Specific voice name
 
+    def __setattr__(self, name, value):
+        # Store the language normalized (stripped, lowercased, interned) so
+        # every later lookup sees one canonical string
+        if name == "current_language" and value:
+            value = sys.intern(value.strip().lower())
+        object.__setattr__(self, name, value)
+
+# Lookup tables built once at import: per-language name -> voice and
+# gender -> voices (in AVAILABLE_VOICES order)
+_VOICES_BY_NAME = {
+    lang: {voice.name_lower: voice for voice in voices} for lang, voices in AVAILABLE_VOICES.items()
+}
+_VOICES_BY_GENDER = {
+    lang: {gender: tuple(voice for voice in voices if voice.gender == gender) for gender in {v.gender for v in voices}}
+    for lang, voices in AVAILABLE_VOICES.items()
+}
+
 def get_voice_for_language(language: str, userdata: MultilingualData) -> str:
     """Get the appropriate voice for a language based on user preferences."""
-    language_key = language.lower()
-    
+    return _resolve_voice(
+        language.lower(),
+        userdata.selected_voice,
+        userdata.preferred_voice_gender,
+        userdata.preferred_voice_characteristic,
+    )
+
+@functools.lru_cache(maxsize=256)
+def _resolve_voice(
+    language_key: str,
+    selected_voice: Optional[str],
+    gender: Optional[str],
+    characteristic: Optional[str],
+) -> str:
     if language_key not in AVAILABLE_VOICES:
         return "kani"  # Default fallback
     
-    available_voices = AVAILABLE_VOICES[language_key]
-    
     # If user has a specific voice selected, use it
-    if userdata.selected_voice:
-        for voice in available_voices:
-            if voice.voice_name.lower() == userdata.selected_voice.lower():
-                return voice.voice_name
+    if selected_voice:
+        voice = _VOICES_BY_NAME[language_key].get(selected_voice.lower())
+        if voice:
+            return voice.voice_name
+    
+    available_voices = AVAILABLE_VOICES[language_key]
     
     # Filter by gender preference
-    if userdata.preferred_voice_gender:
-        gender_voices = [v for v in available_voices if v.gender == userdata.preferred_voice_gender]
-        if gender_voices:
-            available_voices = gender_voices
+    if gender:
+        available_voices = _VOICES_BY_GENDER[language_key].get(gender) or available_voices
     
     # Filter by characteristic preference
-    if userdata.preferred_voice_characteristic:
-        char_voices = []
-        for voice in available_voices:
-            if userdata.preferred_voice_characteristic.lower() in voice.description.lower():
-                char_voices.append(voice)
+    if characteristic:
+        characteristic = characteristic.lower()
+        char_voices = [v for v in available_voices if characteristic in v.description_lower]
         if char_voices:
             available_voices = char_voices
     
@@ -145,15 +230,69 @@ def get_voice_options_text(language: str) -> str:
     
     return "\n".join(voice_list)
 
+# Spitch clients (and the session LLM below) are shared across agent handoffs
+# and sessions in this process, so switching language or voice reuses an
+# existing client instead of constructing a new one
+@functools.lru_cache(maxsize=32)
+def _get_stt(language_code: str):
+    return spitch.STT(language=language_code)
+
+@functools.lru_cache(maxsize=32)
+def _get_tts(language_code: str, voice: str):
+    return spitch.TTS(language=language_code, voice=voice)
+
+@functools.lru_cache(maxsize=4)
+def _get_llm(model: str, api_key: Optional[str]):
+    # Only the session LLM needs the Google plugin; keep it off the import path
+    from livekit.plugins import google
+
+    return google.LLM(model=model, api_key=api_key)
+
+# Language names/codes -> canonical language key
+_LANG_ALIASES = MappingProxyType({
+    "english": "english",
+    "en": "english",
+    "yoruba": "yoruba",
+    "yo": "yoruba",
+    "hausa": "hausa",
+    "ha": "hausa",
+    "igbo": "igbo",
+    "ig": "igbo",
+})
+
+def _resolve_language(language: Optional[str], default: str = "english") -> str:
+    """Map a language name/code to its canonical key, falling back to `default`."""
+    return _LANG_ALIASES.get(language.lower(), default) if language else default
+
+def _resolve_language_and_voice(
+    language: Optional[str],
+    userdata: MultilingualData,
+    default: str = "english",
+) -> Tuple[str, str]:
+    """Resolve the canonical language key and the user's voice for it in one step."""
+    language_key = _resolve_language(language, default)
+    return language_key, get_voice_for_language(language_key, userdata)
+
+# Recent conversation items carried into a handoff (about six exchanges);
+# the new agent has its own instructions, so older history is just weight
+_HANDOFF_CONTEXT_ITEMS = 12
+
+def _build_agent(
+    language: Optional[str],
+    userdata: MultilingualData,
+    default: str = "english",
+    chat_ctx: Optional[ChatContext] = None,
+) -> Agent:
+    """Create the agent for a language name/code, falling back to `default`."""
+    if chat_ctx is not None:
+        chat_ctx = chat_ctx.copy().truncate(max_items=_HANDOFF_CONTEXT_ITEMS)
+    return _AGENT_BY_LANG[_resolve_language(language, default)](userdata.user_name, userdata.user_location, chat_ctx=chat_ctx, userdata=userdata)
+
 # Welcome Agent - Initial language selection
 class WelcomeAgent(Agent):
     def __init__(self) -> None:
         super().__init__(
-            instructions=f"{common_instructions} "
-            "Your goal is to welcome users and help them choose their preferred language and voice. "
-            "Ask them to choose their preferred language or start speaking in their language. "
-            "Also ask about their voice preference (masculine/feminine and characteristics like 'breezy', 'calm', 'loud', 'soft'). "
-            "Be warm and inviting. Start with a multilingual greeting."
+            instructions=_WELCOME_INSTR
         )
 
     async def on_enter(self):
@@ -181,59 +320,170 @@ class WelcomeAgent(Agent):
             voice_characteristic: Preferred voice characteristic (breezy, calm, loud, soft, etc.)
             specific_voice: Specific voice name if mentioned
         """
-        context.userdata.current_language = language
+        userdata = context.userdata
+        userdata.current_language = language
         if user_name:
-            context.userdata.user_name = user_name
+            userdata.user_name = user_name
         if user_location:
-            context.userdata.user_location = user_location
+            userdata.user_location = user_location
         if voice_gender:
-            context.userdata.preferred_voice_gender = voice_gender
+            userdata.preferred_voice_gender = voice_gender
         if voice_characteristic:
-            context.userdata.preferred_voice_characteristic = voice_characteristic
+            userdata.preferred_voice_characteristic = voice_characteristic
         if specific_voice:
-            context.userdata.selected_voice = specific_voice
-
-        # Create appropriate language-specific agent
-        if language.lower() in ["english", "en"]:
-            agent = EnglishAgent(context.userdata.user_name, context.userdata.user_location, userdata=context.userdata)
-        elif language.lower() in ["yoruba", "yo"]:
-            agent = YorubaAgent(context.userdata.user_name, context.userdata.user_location, userdata=context.userdata)
-        elif language.lower() in ["hausa", "ha"]:
-            agent = HausaAgent(context.userdata.user_name, context.userdata.user_location, userdata=context.userdata)
-        elif language.lower() in ["igbo", "ig"]:
-            agent = IgboAgent(context.userdata.user_name, context.userdata.user_location, userdata=context.userdata)
-        else:
-            # Default to English if language not recognized
-            agent = EnglishAgent(context.userdata.user_name, context.userdata.user_location, userdata=context.userdata)
-
-        # Get the selected voice for the language
-        selected_voice = get_voice_for_language(language, context.userdata)
-        voice_info = f" with {selected_voice.title()} voice"
+            userdata.selected_voice = specific_voice
+
+        # Create appropriate language-specific agent (English if not recognized)
+        language_key, voice = _resolve_language_and_voice(language, userdata)
+        agent = _build_agent(language_key, userdata)
+
+        voice_info = f" with {voice.title()} voice"
         
         return agent, f"Switching to {language} mode{voice_info}. How can I help you today?"
 
-# English Language Agent
-class EnglishAgent(Agent):
+# Everything that differs between the language agents
+@dataclass(slots=True, frozen=True)
+class LangProfile:
+    key: str
+    code: str
+    instructions: str
+    default_voice: str
+    name_template: str
+    location_template: str
+    switch_template: str
+    voice_template: str
+    goodbye: str
+    goodbye_named_template: str
+    goodbye_prefix: str
+    # Full goodbye instructions, composed once per profile
+    goodbye_instructions: str = field(init=False, repr=False, compare=False)
+    goodbye_named_instructions: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "goodbye_instructions", f"{self.goodbye_prefix}: {self.goodbye}")
+        object.__setattr__(self, "goodbye_named_instructions", f"{self.goodbye_prefix}: {self.goodbye_named_template}")
+
+_LANG_PROFILES = MappingProxyType({
+    "english": LangProfile(
+        key="english",
+        code="en",
+        instructions=_ENGLISH_BASE_INSTR,
+        default_voice="kani",
+        name_template=" The user's name is {}.",
+        location_template=" They are from {}.",
+        switch_template="Switching to {} mode.",
+        voice_template="Voice updated to {}!",
+        goodbye="Thank you for using our multilingual assistant! Have a wonderful day!",
+        goodbye_named_template="Thank you {name}! Have a wonderful day!",
+        goodbye_prefix="Say goodbye",
+    ),
+    "yoruba": LangProfile(
+        key="yoruba",
+        code="yo",
+        instructions=_YORUBA_BASE_INSTR,
+        default_voice="sade",
+        name_template=" Orukọ eniyan ni {}.",
+        location_template=" Wọn wa lati {}.",
+        switch_template="Mo ti yi pada si ipo {}.",
+        voice_template="Ohun ọrọ ti yipada si {}!",
+        goodbye="E ṣe fun lilo iranwo wa ti o ni ede pupọ! E ni ọjọ ti o dara!",
+        goodbye_named_template="E ṣe {name}! E ni ọjọ ti o dara!",
+        goodbye_prefix="Ṣe odabo",
+    ),
+    "hausa": LangProfile(
+        key="hausa",
+        code="ha",
+        instructions=_HAUSA_BASE_INSTR,
+        default_voice="hasan",
+        name_template=" Sunan mai amfani shine {}.",
+        location_template=" Suna daga {}.",
+        switch_template="Na canja zuwa yanayin {}.",
+        voice_template="Murya ta canza zuwa {}!",
+        goodbye="Na gode da yin amfani da mataimakin mu mai harsuna da yawa! Ku yi kyakkyawan rana!",
+        goodbye_named_template="Na gode {name}! Ku yi kyakkyawan rana!",
+        goodbye_prefix="Yi sallama",
+    ),
+    "igbo": LangProfile(
+        key="igbo",
+        code="ig",
+        instructions=_IGBO_BASE_INSTR,
+        default_voice="obinna",
+        name_template=" Aha onye ọrụ bụ {}.",
+        location_template=" Ha si {}.",
+        switch_template="Agbanwere m gaa ọnọdụ {}.",
+        voice_template="Olu gbanwere gaa {}!",
+        goodbye="Daalụ maka iji onyeinyeaka anyị nwere asụsụ dị iche iche! Nwee ọmarịcha ụbọchị!",
+        goodbye_named_template="Daalụ {name}! Nwee ọmarịcha ụbọchị!",
+        goodbye_prefix="Sị nke ọma",
+    ),
+})
+
+# Upper bound on the room delete issued by end_conversation
+_ROOM_DELETE_TIMEOUT = 2.0
+
+# Caps on user-supplied details that end up in the LLM context
+_MAX_NAME_CHARS = 64
+_MAX_LOCATION_CHARS = 96
+
+def _clip_user_text(text: Optional[str], limit: int) -> Optional[str]:
+    """Flatten whitespace (incl. newlines) and truncate free-form user text."""
+    if not text:
+        return text
+    return " ".join(text.split())[:limit]
+
+# Strong references to fire-and-forget tasks until they finish
+_background_tasks: set = set()
+
+async def _await_background_tasks() -> None:
+    """Shutdown hook: let in-flight background work (room deletes) finish."""
+    if _background_tasks:
+        await asyncio.gather(*_background_tasks, return_exceptions=True)
+
+async def _delete_room(job_ctx: JobContext) -> None:
+    """Delete the job's room; a hung or failed delete is logged, never raised."""
+    try:
+        await asyncio.wait_for(
+            job_ctx.api.room.delete_room(api.DeleteRoomRequest(room=job_ctx.room.name)),
+            timeout=_ROOM_DELETE_TIMEOUT,
+        )
+    except asyncio.TimeoutError:
+        logger.warning("Timed out deleting room %s", job_ctx.room.name)
+    except Exception as e:
+        logger.error("Failed to delete room %s: %s", job_ctx.room.name, e)
+
+# Language Agent - one implementation driven by a LangProfile
+class LanguageAgent(Agent):
+    profile: LangProfile
+
     def __init__(self, user_name: Optional[str] = None, user_location: Optional[str] = None, *, chat_ctx: Optional[ChatContext] = None, userdata: Optional[MultilingualData] = None) -> None:
-        name_context = f" The user's name is {user_name}." if user_name else ""
-        location_context = f" They are from {user_location}." if user_location else ""
-        
-        # Get the appropriate voice for English
-        selected_voice = "kani"  # Default
+        profile = self.profile
+        user_name = _clip_user_text(user_name, _MAX_NAME_CHARS)
+        user_location = _clip_user_text(user_location, _MAX_LOCATION_CHARS)
+        name_context = profile.name_template.format(user_name) if user_name else ""
+        location_context = profile.location_template.format(user_location) if user_location else ""
+        
+        # Get the appropriate voice for this language
+        selected_voice = profile.default_voice
         if userdata:
-            selected_voice = get_voice_for_language("english", userdata)
+            selected_voice = get_voice_for_language(profile.key, userdata)
         
         super().__init__(
-            instructions=f"{common_instructions} "
-            "You are now in English mode. Provide helpful assistance in clear, professional English. "
-            "Handle general questions, provide information, help with tasks, offer translations to other languages, "
-            "and engage in natural conversation. Use American English conventions and be friendly yet professional."
-            f"{name_context}{location_context}",
-            # Use Spitch STT and TTS for English
-            stt=spitch.STT(language="en"),
-            tts=spitch.TTS(language="en", voice=selected_voice),
-            chat_ctx=chat_ctx,
+            instructions=profile.instructions,
+            # Use Spitch STT and TTS for this language
+            stt=_get_stt(profile.code),
+            tts=_get_tts(profile.code, selected_voice),
+            chat_ctx=_with_user_context(chat_ctx, name_context + location_context),
         )
+        self._current_voice = selected_voice
+        # Cached for end_conversation; agents can also be built outside a job
+        try:
+            self._job_ctx = get_current_job_context()
+        except RuntimeError:
+            self._job_ctx = None
+
+    @property
+    def language_key(self) -> str:
+        return self.profile.key
 
     async def on_enter(self):
         self.session.generate_reply()
@@ -247,20 +497,19 @@ class EnglishAgent(Agent):
         """Switch to a different language.
         
         Args:
-            new_language: The language to switch to (Yoruba, Hausa, Igbo, or English)
+            new_language: The language to switch to (English, Yoruba, Hausa, or Igbo)
         """
+        profile = self.profile
         context.userdata.current_language = new_language
+        message = profile.switch_template.format(new_language)
+        
+        # Already speaking it: no handoff, keep this agent's STT/TTS
+        if _resolve_language(new_language, default=profile.key) == profile.key:
+            return message
         
-        if new_language.lower() in ["yoruba", "yo"]:
-            agent = YorubaAgent(context.userdata.user_name, context.userdata.user_location, chat_ctx=context.chat_ctx, userdata=context.userdata)
-        elif new_language.lower() in ["hausa", "ha"]:
-            agent = HausaAgent(context.userdata.user_name, context.userdata.user_location, chat_ctx=context.chat_ctx, userdata=context.userdata)
-        elif new_language.lower() in ["igbo", "ig"]:
-            agent = IgboAgent(context.userdata.user_name, context.userdata.user_location, chat_ctx=context.chat_ctx, userdata=context.userdata)
-        else:
-            agent = EnglishAgent(context.userdata.user_name, context.userdata.user_location, chat_ctx=context.chat_ctx, userdata=context.userdata)
+        agent = _build_agent(new_language, context.userdata, default=profile.key, chat_ctx=context.chat_ctx)
         
-        return agent, f"Switching to {new_language} mode."
+        return agent, message
 
     @function_tool
     async def configure_voice(
@@ -277,376 +526,78 @@ class EnglishAgent(Agent):
             voice_characteristic: Preferred voice characteristic (breezy, calm, loud, soft, etc.)
             specific_voice: Specific voice name if mentioned
         """
+        userdata = context.userdata
+        profile = self.profile
         if voice_gender:
-            context.userdata.preferred_voice_gender = voice_gender
+            userdata.preferred_voice_gender = voice_gender
         if voice_characteristic:
-            context.userdata.preferred_voice_characteristic = voice_characteristic
+            userdata.preferred_voice_characteristic = voice_characteristic
         if specific_voice:
-            context.userdata.selected_voice = specific_voice
+            userdata.selected_voice = specific_voice
         
         # Get the new voice for current language
-        new_voice = get_voice_for_language(context.userdata.current_language or "english", context.userdata)
+        language_key, new_voice = _resolve_language_and_voice(userdata.current_language, userdata, default=profile.key)
         
-        # Create new agent with updated voice
-        if context.userdata.current_language and context.userdata.current_language.lower() in ["english", "en"]:
-            agent = EnglishAgent(context.userdata.user_name, context.userdata.user_location, chat_ctx=context.chat_ctx, userdata=context.userdata)
-        elif context.userdata.current_language and context.userdata.current_language.lower() in ["yoruba", "yo"]:
-            agent = YorubaAgent(context.userdata.user_name, context.userdata.user_location, chat_ctx=context.chat_ctx, userdata=context.userdata)
-        elif context.userdata.current_language and context.userdata.current_language.lower() in ["hausa", "ha"]:
-            agent = HausaAgent(context.userdata.user_name, context.userdata.user_location, chat_ctx=context.chat_ctx, userdata=context.userdata)
-        elif context.userdata.current_language and context.userdata.current_language.lower() in ["igbo", "ig"]:
-            agent = IgboAgent(context.userdata.user_name, context.userdata.user_location, chat_ctx=context.chat_ctx, userdata=context.userdata)
-        else:
-            agent = EnglishAgent(context.userdata.user_name, context.userdata.user_location, chat_ctx=context.chat_ctx, userdata=context.userdata)
+        message = profile.voice_template.format(new_voice.title())
         
-        return agent, f"Voice updated to {new_voice.title()}!"
-
-    @function_tool
-    async def end_conversation(self, context: RunContext[MultilingualData]):
-        """End the conversation and say goodbye."""
-        self.session.interrupt()
+        # Nothing to change: stay on this agent
+        if language_key == profile.key and new_voice == self._current_voice:
+            return message
         
-        goodbye_msg = f"Thank you for using our multilingual assistant! Have a wonderful day!"
-        if context.userdata.user_name:
-            goodbye_msg = f"Thank you {context.userdata.user_name}! Have a wonderful day!"
+        # Hand off to the agent for the language with the new voice; its STT
+        # and TTS come from the shared client caches
+        agent = _build_agent(language_key, userdata, chat_ctx=context.chat_ctx)
         
-        await self.session.generate_reply(
-            instructions=f"Say goodbye: {goodbye_msg}", 
-            allow_interruptions=False
-        )
-        
-        # End the session
-        job_ctx = get_current_job_context()
-        lkapi = job_ctx.api
-        await lkapi.room.delete_room(api.DeleteRoomRequest(room=job_ctx.room.name))
-
-# Yoruba Language Agent
-class YorubaAgent(Agent):
-    def __init__(self, user_name: Optional[str] = None, user_location: Optional[str] = None, *, chat_ctx: Optional[ChatContext] = None, userdata: Optional[MultilingualData] = None) -> None:
-        name_context = f" Orukọ eniyan ni {user_name}." if user_name else ""
-        location_context = f" Wọn wa lati {user_location}." if user_location else ""
-        
-        # Get the appropriate voice for Yoruba
-        selected_voice = "sade"  # Default
-        if userdata:
-            selected_voice = get_voice_for_language("yoruba", userdata)
-        
-        super().__init__(
-            instructions=f"{common_instructions} "
-            "O ti wa ni ipo Yoruba bayi. Pese iranwo ni ede Yoruba ti o ye kooro. "
-            "Lo awon oro ti o tọ bi 'ẹ jọwọ' (please), 'ẹ ṣe' (thank you), 'bawo ni' (how are you). "
-            "Ran awon eniyan lowo pelu awon ibeere, fun ni alaye, ṣe atumọ si awon ede miiran, "
-            "ati ṢIS oro tabi gbogbo iru iṣe ti won ba beere. Jẹ ki ibaraenisepo rẹ jẹ atunṣe ati ki o ni itọju."
-            f"{name_context}{location_context}",
-            # Use Spitch STT and TTS for Yoruba
-            stt=spitch.STT(language="yo"),
-            tts=spitch.TTS(language="yo", voice=selected_voice),
-            chat_ctx=chat_ctx,
-        )
-
-    async def on_enter(self):
-        self.session.generate_reply()
-
-    @function_tool
-    async def switch_language(
-        self,
-        context: RunContext[MultilingualData],
-        new_language: str,
-    ):
-        """Yi ede pada si ede miiran.
-        
-        Args:
-            new_language: Ede ti a fe yi pada si (English, Hausa, Igbo, tabi Yoruba)
-        """
-        context.userdata.current_language = new_language
-        
-        if new_language.lower() in ["english", "en"]:
-            agent = EnglishAgent(context.userdata.user_name, context.userdata.user_location, chat_ctx=context.chat_ctx, userdata=context.userdata)
-        elif new_language.lower() in ["hausa", "ha"]:
-            agent = HausaAgent(context.userdata.user_name, context.userdata.user_location, chat_ctx=context.chat_ctx, userdata=context.userdata)
-        elif new_language.lower() in ["igbo", "ig"]:
-            agent = IgboAgent(context.userdata.user_name, context.userdata.user_location, chat_ctx=context.chat_ctx, userdata=context.userdata)
-        else:
-            agent = YorubaAgent(context.userdata.user_name, context.userdata.user_location, chat_ctx=context.chat_ctx, userdata=context.userdata)
-        
-        return agent, f"Mo ti yi pada si ipo {new_language}."
-
-    @function_tool
-    async def configure_voice(
-        self,
-        context: RunContext[MultilingualData],
-        voice_gender: Optional[str] = None,
-        voice_characteristic: Optional[str] = None,
-        specific_voice: Optional[str] = None,
-    ):
-        """Ṣeto awọn ifẹ ohun ọrọ fun ede lọwọlọwọ.
-        
-        Args:
-            voice_gender: Ifẹ ohun ọrọ ti a fẹ (masculine/feminine)
-            voice_characteristic: Ifẹ ohun ọrọ ti a fẹ (breezy, calm, loud, soft, etc.)
-            specific_voice: Orukọ ohun ọrọ pataki ti a sọ
-        """
-        if voice_gender:
-            context.userdata.preferred_voice_gender = voice_gender
-        if voice_characteristic:
-            context.userdata.preferred_voice_characteristic = voice_characteristic
-        if specific_voice:
-            context.userdata.selected_voice = specific_voice
-        
-        # Get the new voice for current language
-        new_voice = get_voice_for_language(context.userdata.current_language or "yoruba", context.userdata)
-        
-        # Create new agent with updated voice
-        if context.userdata.current_language and context.userdata.current_language.lower() in ["english", "en"]:
-            agent = EnglishAgent(context.userdata.user_name, context.userdata.user_location, chat_ctx=context.chat_ctx, userdata=context.userdata)
-        elif context.userdata.current_language and context.userdata.current_language.lower() in ["yoruba", "yo"]:
-            agent = YorubaAgent(context.userdata.user_name, context.userdata.user_location, chat_ctx=context.chat_ctx, userdata=context.userdata)
-        elif context.userdata.current_language and context.userdata.current_language.lower() in ["hausa", "ha"]:
-            agent = HausaAgent(context.userdata.user_name, context.userdata.user_location, chat_ctx=context.chat_ctx, userdata=context.userdata)
-        elif context.userdata.current_language and context.userdata.current_language.lower() in ["igbo", "ig"]:
-            agent = IgboAgent(context.userdata.user_name, context.userdata.user_location, chat_ctx=context.chat_ctx, userdata=context.userdata)
-        else:
-            agent = YorubaAgent(context.userdata.user_name, context.userdata.user_location, chat_ctx=context.chat_ctx, userdata=context.userdata)
-        
-        return agent, f"Ohun ọrọ ti yipada si {new_voice.title()}!"
+        return agent, message
 
     @function_tool
     async def end_conversation(self, context: RunContext[MultilingualData]):
-        """Pari ibaraenisepo ati so odabo."""
-        self.session.interrupt()
-        
-        goodbye_msg = "E ṣe fun lilo iranwo wa ti o ni ede pupọ! E ni ọjọ ti o dara!"
-        if context.userdata.user_name:
-            goodbye_msg = f"E ṣe {context.userdata.user_name}! E ni ọjọ ti o dara!"
-        
-        await self.session.generate_reply(
-            instructions=f"Ṣe odabo: {goodbye_msg}", 
-            allow_interruptions=False
-        )
-        
-        job_ctx = get_current_job_context()
-        lkapi = job_ctx.api
-        await lkapi.room.delete_room(api.DeleteRoomRequest(room=job_ctx.room.name))
-
-# Hausa Language Agent
-class HausaAgent(Agent):
-    def __init__(self, user_name: Optional[str] = None, user_location: Optional[str] = None, *, chat_ctx: Optional[ChatContext] = None, userdata: Optional[MultilingualData] = None) -> None:
-        name_context = f" Sunan mai amfani shine {user_name}." if user_name else ""
-        location_context = f" Suna daga {user_location}." if user_location else ""
-        
-        # Get the appropriate voice for Hausa
-        selected_voice = "hasan"  # Default
-        if userdata:
-            selected_voice = get_voice_for_language("hausa", userdata)
-        
-        super().__init__(
-            instructions=f"{common_instructions} "
-            "Yanzu kuna cikin yanayin Hausa. Bayar da taimako a cikin Hausa mai kyau. "
-            "Yi amfani da kalmomi masu dacewa kamar 'don Allah' (please), 'na gode' (thank you), 'sannu da zuwa' (welcome). "
-            "Taimaka wa mutane da tambayoyi, bayar da bayanai, yi fassara zuwa wasu harsuna, "
-            "da yin hira akan duk wani batu da suke so. Kasance mai son zuciya kuma mai kulawa."
-            f"{name_context}{location_context}",
-            # Use Spitch STT and TTS for Hausa
-            stt=spitch.STT(language="ha"),
-            tts=spitch.TTS(language="ha", voice=selected_voice),
-            chat_ctx=chat_ctx,
-        )
-
-    async def on_enter(self):
-        self.session.generate_reply()
-
-    @function_tool
-    async def switch_language(
-        self,
-        context: RunContext[MultilingualData],
-        new_language: str,
-    ):
-        """Canja zuwa wani harshe.
-        
-        Args:
-            new_language: Harshen da za a canja zuwa (English, Yoruba, Igbo, ko Hausa)
-        """
-        context.userdata.current_language = new_language
-        
-        if new_language.lower() in ["english", "en"]:
-            agent = EnglishAgent(context.userdata.user_name, context.userdata.user_location, chat_ctx=context.chat_ctx, userdata=context.userdata)
-        elif new_language.lower() in ["yoruba", "yo"]:
-            agent = YorubaAgent(context.userdata.user_name, context.userdata.user_location, chat_ctx=context.chat_ctx, userdata=context.userdata)
-        elif new_language.lower() in ["igbo", "ig"]:
-            agent = IgboAgent(context.userdata.user_name, context.userdata.user_location, chat_ctx=context.chat_ctx, userdata=context.userdata)
-        else:
-            agent = HausaAgent(context.userdata.user_name, context.userdata.user_location, chat_ctx=context.chat_ctx, userdata=context.userdata)
-        
-        return agent, f"Na canja zuwa yanayin {new_language}."
-
-    @function_tool
-    async def configure_voice(
-        self,
-        context: RunContext[MultilingualData],
-        voice_gender: Optional[str] = None,
-        voice_characteristic: Optional[str] = None,
-        specific_voice: Optional[str] = None,
-    ):
-        """Saita abubuwan murya don harshen yanzu.
-        
-        Args:
-            voice_gender: Muryar da ake so (masculine/feminine)
-            voice_characteristic: Halin muryar da ake so (breezy, calm, loud, soft, etc.)
-            specific_voice: Sunan murya na musamman idan aka ambata
-        """
-        if voice_gender:
-            context.userdata.preferred_voice_gender = voice_gender
-        if voice_characteristic:
-            context.userdata.preferred_voice_characteristic = voice_characteristic
-        if specific_voice:
-            context.userdata.selected_voice = specific_voice
-        
-        # Get the new voice for current language
-        new_voice = get_voice_for_language(context.userdata.current_language or "hausa", context.userdata)
-        
-        # Create new agent with updated voice
-        if context.userdata.current_language and context.userdata.current_language.lower() in ["english", "en"]:
-            agent = EnglishAgent(context.userdata.user_name, context.userdata.user_location, chat_ctx=context.chat_ctx, userdata=context.userdata)
-        elif context.userdata.current_language and context.userdata.current_language.lower() in ["yoruba", "yo"]:
-            agent = YorubaAgent(context.userdata.user_name, context.userdata.user_location, chat_ctx=context.chat_ctx, userdata=context.userdata)
-        elif context.userdata.current_language and context.userdata.current_language.lower() in ["hausa", "ha"]:
-            agent = HausaAgent(context.userdata.user_name, context.userdata.user_location, chat_ctx=context.chat_ctx, userdata=context.userdata)
-        elif context.userdata.current_language and context.userdata.current_language.lower() in ["igbo", "ig"]:
-            agent = IgboAgent(context.userdata.user_name, context.userdata.user_location, chat_ctx=context.chat_ctx, userdata=context.userdata)
-        else:
-            agent = HausaAgent(context.userdata.user_name, context.userdata.user_location, chat_ctx=context.chat_ctx, userdata=context.userdata)
-        
-        return agent, f"Murya ta canza zuwa {new_voice.title()}!"
-
-    @function_tool
-    async def end_conversation(self, context: RunContext[MultilingualData]):
-        """Ƙare tattaunawa da yin sallama."""
+        """End the conversation and say goodbye."""
         self.session.interrupt()
         
-        goodbye_msg = "Na gode da yin amfani da mataimakin mu mai harsuna da yawa! Ku yi kyakkyawan rana!"
-        if context.userdata.user_name:
-            goodbye_msg = f"Na gode {context.userdata.user_name}! Ku yi kyakkyawan rana!"
+        profile = self.profile
+        user_name = _clip_user_text(context.userdata.user_name, _MAX_NAME_CHARS)
+        instructions = profile.goodbye_named_instructions.format(name=user_name) if user_name else profile.goodbye_instructions
         
         await self.session.generate_reply(
-            instructions=f"Yi sallama: {goodbye_msg}", 
+            instructions=instructions, 
             allow_interruptions=False
         )
         
-        job_ctx = get_current_job_context()
-        lkapi = job_ctx.api
-        await lkapi.room.delete_room(api.DeleteRoomRequest(room=job_ctx.room.name))
+        # End the session in the background so the tool returns right away
+        task = asyncio.create_task(_delete_room(self._job_ctx or get_current_job_context()))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
 
-# Igbo Language Agent
-class IgboAgent(Agent):
-    def __init__(self, user_name: Optional[str] = None, user_location: Optional[str] = None, *, chat_ctx: Optional[ChatContext] = None, userdata: Optional[MultilingualData] = None) -> None:
-        name_context = f" Aha onye ọrụ bụ {user_name}." if user_name else ""
-        location_context = f" Ha si {user_location}." if user_location else ""
-        
-        # Get the appropriate voice for Igbo
-        selected_voice = "obinna"  # Default
-        if userdata:
-            selected_voice = get_voice_for_language("igbo", userdata)
-        
-        super().__init__(
-            instructions=f"{common_instructions} "
-            "Ị nọ ugbu a n'ọnọdụ Igbo. Nye enyemaka n'asụsụ Igbo dị mma. "
-            "Jiri okwu kwesịrị ekwesị dị ka 'biko' (please), 'daalụ' (thank you), 'ndewo' (hello). "
-            "Nyere ndị mmadụ aka na ajụjụ ha, nye ozi, tụgharịa asụsụ n'asụsụ ndị ọzọ, "
-            "ma kwurịta okwu gbasara ihe ọ bụla ha chọrọ. Bụrụ onye obiọma ma na-elekọta."
-            f"{name_context}{location_context}",
-            # Use Spitch STT and TTS for Igbo
-            stt=spitch.STT(language="ig"),
-            tts=spitch.TTS(language="ig", voice=selected_voice),
-            chat_ctx=chat_ctx,
-        )
+# Named agents kept as thin profile bindings for existing imports
+class EnglishAgent(LanguageAgent):
+    profile = _LANG_PROFILES["english"]
 
-    async def on_enter(self):
-        self.session.generate_reply()
+class YorubaAgent(LanguageAgent):
+    profile = _LANG_PROFILES["yoruba"]
 
-    @function_tool
-    async def switch_language(
-        self,
-        context: RunContext[MultilingualData],
-        new_language: str,
-    ):
-        """Gbanwee gaa n'asụsụ ọzọ.
-        
-        Args:
-            new_language: Asụsụ a ga-agbanwe gaa (English, Yoruba, Hausa, ma ọ bụ Igbo)
-        """
-        context.userdata.current_language = new_language
-        
-        if new_language.lower() in ["english", "en"]:
-            agent = EnglishAgent(context.userdata.user_name, context.userdata.user_location, chat_ctx=context.chat_ctx, userdata=context.userdata)
-        elif new_language.lower() in ["yoruba", "yo"]:
-            agent = YorubaAgent(context.userdata.user_name, context.userdata.user_location, chat_ctx=context.chat_ctx, userdata=context.userdata)
-        elif new_language.lower() in ["hausa", "ha"]:
-            agent = HausaAgent(context.userdata.user_name, context.userdata.user_location, chat_ctx=context.chat_ctx, userdata=context.userdata)
-        else:
-            agent = IgboAgent(context.userdata.user_name, context.userdata.user_location, chat_ctx=context.chat_ctx, userdata=context.userdata)
-        
-        return agent, f"Agbanwere m gaa ọnọdụ {new_language}."
+class HausaAgent(LanguageAgent):
+    profile = _LANG_PROFILES["hausa"]
 
-    @function_tool
-    async def configure_voice(
-        self,
-        context: RunContext[MultilingualData],
-        voice_gender: Optional[str] = None,
-        voice_characteristic: Optional[str] = None,
-        specific_voice: Optional[str] = None,
-    ):
-        """Hazie nhọrọ olu maka asụsụ ugbu a.
-        
-        Args:
-            voice_gender: Olu a chọrọ (masculine/feminine)
-            voice_characteristic: Àgwà olu a chọrọ (breezy, calm, loud, soft, etc.)
-            specific_voice: Aha olu kpọmkwem ma ọ bụrụ na ekwuru ya
-        """
-        if voice_gender:
-            context.userdata.preferred_voice_gender = voice_gender
-        if voice_characteristic:
-            context.userdata.preferred_voice_characteristic = voice_characteristic
-        if specific_voice:
-            context.userdata.selected_voice = specific_voice
-        
-        # Get the new voice for current language
-        new_voice = get_voice_for_language(context.userdata.current_language or "igbo", context.userdata)
-        
-        # Create new agent with updated voice
-        if context.userdata.current_language and context.userdata.current_language.lower() in ["english", "en"]:
-            agent = EnglishAgent(context.userdata.user_name, context.userdata.user_location, chat_ctx=context.chat_ctx, userdata=context.userdata)
-        elif context.userdata.current_language and context.userdata.current_language.lower() in ["yoruba", "yo"]:
-            agent = YorubaAgent(context.userdata.user_name, context.userdata.user_location, chat_ctx=context.chat_ctx, userdata=context.userdata)
-        elif context.userdata.current_language and context.userdata.current_language.lower() in ["hausa", "ha"]:
-            agent = HausaAgent(context.userdata.user_name, context.userdata.user_location, chat_ctx=context.chat_ctx, userdata=context.userdata)
-        elif context.userdata.current_language and context.userdata.current_language.lower() in ["igbo", "ig"]:
-            agent = IgboAgent(context.userdata.user_name, context.userdata.user_location, chat_ctx=context.chat_ctx, userdata=context.userdata)
-        else:
-            agent = IgboAgent(context.userdata.user_name, context.userdata.user_location, chat_ctx=context.chat_ctx, userdata=context.userdata)
-        
-        return agent, f"Olu gbanwere gaa {new_voice.title()}!"
+class IgboAgent(LanguageAgent):
+    profile = _LANG_PROFILES["igbo"]
 
-    @function_tool
-    async def end_conversation(self, context: RunContext[MultilingualData]):
-        """Kwụsị mkparịta ụka ma sị nke ọma."""
-        self.session.interrupt()
-        
-        goodbye_msg = "Daalụ maka iji onyeinyeaka anyị nwere asụsụ dị iche iche! Nwee ọmarịcha ụbọchị!"
-        if context.userdata.user_name:
-            goodbye_msg = f"Daalụ {context.userdata.user_name}! Nwee ọmarịcha ụbọchị!"
-        
-        await self.session.generate_reply(
-            instructions=f"Sị nke ọma: {goodbye_msg}", 
-            allow_interruptions=False
-        )
-        
-        job_ctx = get_current_job_context()
-        lkapi = job_ctx.api
-        await lkapi.room.delete_room(api.DeleteRoomRequest(room=job_ctx.room.name))
+# Canonical language key -> agent class
+_AGENT_BY_LANG = MappingProxyType({
+    "english": EnglishAgent,
+    "yoruba": YorubaAgent,
+    "hausa": HausaAgent,
+    "igbo": IgboAgent,
+})
 
-# Prewarm function - loads VAD model once
+# Prewarm function - loads VAD model and Spitch clients once
 def prewarm(proc: JobProcess):
     proc.userdata["vad"] = silero.VAD.load()
+    # Build each language's default Spitch clients up front so the first
+    # session and first handoffs find them in the factory caches
+    for profile in _LANG_PROFILES.values():
+        _get_stt(profile.code)
+        _get_tts(profile.code, profile.default_voice)
 
 # Main entrypoint
 async def entrypoint(ctx: JobContext):
@@ -655,25 +606,24 @@ async def entrypoint(ctx: JobContext):
     session = AgentSession[MultilingualData](
         vad=ctx.proc.userdata["vad"],
         # Configure default models - agents can override these
-        llm=google.LLM(model="gemini-2.0-flash-001", api_key=os.getenv("GEMINI_API_KEY")),
-        stt=spitch.STT(language="en"),  # Default to English STT
-        tts=spitch.TTS(language="en", voice="kani"),
+        llm=_get_llm("gemini-2.0-flash-001", os.getenv("GEMINI_API_KEY")),
+        stt=_get_stt("en"),  # Default to English STT
+        tts=_get_tts("en", "kani"),
         userdata=MultilingualData(),
+        # Start the LLM reply on interim transcripts so first audio is earlier
+        preemptive_generation=True,
     )
 
-    # Set up metrics collection
-    usage_collector = metrics.UsageCollector()
-
-    @session.on("metrics_collected")
-    def _on_metrics_collected(ev: MetricsCollectedEvent):
-        metrics.log_metrics(ev.metrics)
-        usage_collector.collect(ev.metrics)
+    # Set up metrics collection, logged and aggregated in batches
+    metrics_batcher = MetricsBatcher()
+    metrics_batcher.attach(session)
 
     async def log_usage():
-        summary = usage_collector.get_summary()
-        logger.info(f"Usage: {summary}")
+        summary = await metrics_batcher.close()
+        logger.info("Usage: %s", summary)
 
     ctx.add_shutdown_callback(log_usage)
+    ctx.add_shutdown_callback(_await_background_tasks)
 
     # Start the session with the WelcomeAgent
     await session.start(
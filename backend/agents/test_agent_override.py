@@ -5,6 +5,10 @@ This script demonstrates that each agent uses its own STT/TTS configuration.
 """
 
 import asyncio
+import contextlib
+import io
+import sys
+
 from multilingual_agent import (
     WelcomeAgent, 
     EnglishAgent, 
@@ -128,17 +132,22 @@ def test_agent_creation():
         print(f"❌ Error creating agents: {e}")
 
 if __name__ == "__main__":
-    print("🚀 Agent STT/TTS Override Test Suite\n")
-    print("=" * 50)
-    
-    test_agent_configurations()
-    test_voice_selection()
-    test_agent_creation()
-    
-    print("✨ Test Summary:")
-    print("• Each agent should have its own STT/TTS configuration")
-    print("• STT should be language-specific (en, yo, ha, ig)")
-    print("• TTS should use selected voice for each language")
-    print("• Voice selection should work based on user preferences")
-    print("• Agent-level configuration should override session defaults")
+    # Collect the report and write it once instead of per print()
+    buf = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(buf):
+            print("🚀 Agent STT/TTS Override Test Suite\n")
+            print("=" * 50)
+
+            test_agent_configurations()
+            test_voice_selection()
+            test_agent_creation()
 
+            print("✨ Test Summary:")
+            print("• Each agent should have its own STT/TTS configuration")
+            print("• STT should be language-specific (en, yo, ha, ig)")
+            print("• TTS should use selected voice for each language")
+            print("• Voice selection should work based on user preferences")
+            print("• Agent-level configuration should override session defaults")
+    finally:
+        sys.stdout.write(buf.getvalue())
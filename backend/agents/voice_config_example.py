@@ -6,6 +6,10 @@ This script demonstrates how the voice selection system works
 with different user preferences and voice characteristics.
 """
 
+import contextlib
+import io
+import sys
+
 from multilingual_agent import (
     MultilingualData, 
     get_voice_for_language, 
@@ -114,16 +118,22 @@ def demonstrate_user_interactions():
         print(f"   → Result: {example['result']}")
 
 if __name__ == "__main__":
-    demonstrate_voice_selection()
-    demonstrate_user_interactions()
-    
-    print("\n✨ Voice Configuration Features:")
-    print("• Users can specify voice preferences by gender (masculine/feminine)")
-    print("• Users can specify voice characteristics (breezy, calm, loud, soft, etc.)")
-    print("• Users can select specific voices by name")
-    print("• Preferences can be combined for more specific selection")
-    print("• Voice preferences persist across language switches")
-    print("• Users can change voice preferences during conversation")
-    print("• Each language has multiple authentic voices to choose from")
-    print("• Each language uses Spitch STT optimized for native language recognition")
-    print("• Each language uses Spitch TTS with authentic pronunciation")
+    # Collect the report and write it once instead of per print()
+    buf = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(buf):
+            demonstrate_voice_selection()
+            demonstrate_user_interactions()
+
+            print("\n✨ Voice Configuration Features:")
+            print("• Users can specify voice preferences by gender (masculine/feminine)")
+            print("• Users can specify voice characteristics (breezy, calm, loud, soft, etc.)")
+            print("• Users can select specific voices by name")
+            print("• Preferences can be combined for more specific selection")
+            print("• Voice preferences persist across language switches")
+            print("• Users can change voice preferences during conversation")
+            print("• Each language has multiple authentic voices to choose from")
+            print("• Each language uses Spitch STT optimized for native language recognition")
+            print("• Each language uses Spitch TTS with authentic pronunciation")
+    finally:
+        sys.stdout.write(buf.getvalue())
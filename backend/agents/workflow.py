@@ -2,13 +2,27 @@
 # Generated from: Pre-configured Multilingual Assistant Template
 
 import asyncio
+import datetime
+import functools
+import hashlib
+import inspect
+import itertools
 import json
 import logging
 import re
-from typing import Dict, Any, Optional, List, Union, Tuple
+import time
+from collections import OrderedDict, deque
+from typing import AsyncIterator, Deque, Dict, Any, Iterable, Optional, List, Union, Tuple
 from dataclasses import dataclass, field
 
 import aiohttp
+# orjson is noticeably faster for parsing extraction replies; fall back to stdlib json
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
 from livekit import agents
 from livekit.agents import (
     Agent,
@@ -25,6 +39,9 @@ from livekit.agents.llm import (
 from dotenv import load_dotenv
 load_dotenv()
 
+from app.utils.event_loop import install_uvloop
+from app.utils.text import sentence_chunks
+
 # Import plugins with fallbacks for problematic dependencies
 try:
     from livekit.plugins import openai, deepgram, cartesia, silero, groq
@@ -37,26 +54,52 @@ except ImportError as e:
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# {{variable}} / {{dotted.variable}} placeholders in prompt templates
+_TEMPLATE_VAR_RE = re.compile(r'\{\{(\w+(?:\.\w+)*)\}\}')
+_split_template = functools.lru_cache(maxsize=64)(_TEMPLATE_VAR_RE.split)
+# Built-in clock placeholders; global variables of the same name take precedence
+_CLOCK_FORMATS = {"now": "%Y-%m-%d %H:%M:%S", "date": "%Y-%m-%d", "time": "%H:%M:%S"}
+# First integer in a transition-classification reply
+_FIRST_INT_RE = re.compile(r'\d+')
+# How many recent history turns key a cached node response
+_LLM_CACHE_HISTORY_TURNS = 4
+# History kept per session; readers only ever look at the last few turns
+_MAX_HISTORY_TURNS = 100
+# History turns sent along with a node's system prompt
+_NODE_CONTEXT_TURNS = 10
+
+def _recent(history: Deque[Dict], n: int) -> Iterable[Dict]:
+    """Last n entries of a history deque (deques don't support slicing)"""
+    return itertools.islice(history, max(0, len(history) - n), None)
+
 @dataclass
 class WorkflowState:
     """Manages workflow state and extracted variables"""
     current_node: str = ""
     session_id: str = ""
-    source_language: str = ''
-    translation_text: str = ''
+    detected_language: str = ''
     initial_request: str = ''
+    current_language: str = ''
+    conversation_topic: str = ''
     assistance_type: str = ''
-    detected_language: str = ''
     cultural_context: str = ''
-    current_language: str = ''
+    source_language: str = ''
     target_language: str = ''
-    requested_language: str = ''
-    cultural_topic: str = ''
+    translation_text: str = ''
     translation_type: str = ''
-    conversation_topic: str = ''
+    cultural_topic: str = ''
     cultural_region: str = ''
-    conversation_history: List[Dict[str, str]] = field(default_factory=list)
+    requested_language: str = ''
+    conversation_history: Deque[Dict[str, Any]] = field(default_factory=lambda: deque(maxlen=_MAX_HISTORY_TURNS))
     global_variables: Dict[str, str] = field(default_factory=dict)
+    # (node, user message, extracted variables) of the last LLM extraction
+    last_extraction: Optional[Tuple[str, str, Dict[str, str]]] = None
+    # ChatMessage mirror of the recent history, kept in step by add_to_history
+    chat_messages: Deque[ChatMessage] = field(default_factory=lambda: deque(maxlen=_NODE_CONTEXT_TURNS))
+    system_message: Optional[ChatMessage] = None
+    system_prompt: str = ""
+    # Cached node replies are per session so one caller's replies are never served to another
+    llm_cache: "LLMCache" = field(default_factory=lambda: LLMCache())
 
     def get_variable(self, name: str) -> str:
         return self.global_variables.get(name, getattr(self, name, ""))
@@ -64,37 +107,68 @@ class WorkflowState:
     def set_variable(self, name: str, value: str):
         if hasattr(self, name):
             setattr(self, name, value)
-            logger.info(f"Set variable {name} = {value}")
+            logger.info("Set variable %s = %s", name, value)
         else:
             self.global_variables[name] = value
-            logger.info(f"Set global variable {name} = {value}")
+            logger.info("Set global variable %s = %s", name, value)
 
     def add_to_history(self, role: str, content: str):
         self.conversation_history.append({
             "role": role,
             "content": content,
-            "timestamp": str(asyncio.get_event_loop().time())
+            "timestamp": time.monotonic()
         })
+        self.chat_messages.append(ChatMessage(role=role, content=content))
+
+    def node_chat_messages(self, system_prompt: str) -> List[ChatMessage]:
+        """System prompt followed by the recent history; the system message is reused while the prompt is unchanged"""
+        if self.system_message is None or system_prompt != self.system_prompt:
+            self.system_message = ChatMessage(role="system", content=system_prompt)
+            self.system_prompt = system_prompt
+        return [self.system_message, *self.chat_messages]
 
     def format_prompt_template(self, template: str) -> str:
-        import datetime
-        result = template
-        now = datetime.datetime.now()
-        global_replacements = {
-            "now": now.strftime("%Y-%m-%d %H:%M:%S"),
-            "date": now.strftime("%Y-%m-%d"),
-            "time": now.strftime("%H:%M:%S"),
-        }
-        global_replacements.update(self.global_variables)
-        for var_name in re.findall(r'\{\{(\w+(?:\.\w+)*)\}\}', template):
-            value = global_replacements.get(var_name, self.get_variable(var_name))
-            result = result.replace(f"{{{{{var_name}}}}}", str(value))
-        return result
+        # Split once per distinct template: literals at even indexes, variable names at odd
+        parts = _split_template(template)
+        if len(parts) == 1:
+            return template
+        now = None
+        rendered = list(parts)
+        for i in range(1, len(parts), 2):
+            var_name = parts[i]
+            if var_name in self.global_variables:
+                value = self.global_variables[var_name]
+            elif var_name in _CLOCK_FORMATS:
+                now = now or datetime.datetime.now()
+                value = now.strftime(_CLOCK_FORMATS[var_name])
+            else:
+                value = getattr(self, var_name, "")
+            rendered[i] = str(value)
+        return "".join(rendered)
+
+def _accepts_extra_kwargs(llm_client) -> bool:
+    """Whether the client's achat takes provider-side extra_kwargs"""
+    try:
+        params = inspect.signature(llm_client.achat).parameters
+    except (AttributeError, TypeError, ValueError):
+        return False
+    return "extra_kwargs" in params or any(p.kind is inspect.Parameter.VAR_KEYWORD for p in params.values())
+
+async def _achat_constrained(owner, messages: List[ChatMessage], **extra_kwargs):
+    """achat with provider-side output constraints when the client supports them"""
+    if owner.supports_extra_kwargs:
+        return await owner.llm.achat(messages=messages, extra_kwargs=extra_kwargs)
+    return await owner.llm.achat(messages=messages)
+
+# JSON mode for extraction; a short completion for the classification reply
+_EXTRACTION_LLM_KWARGS = {"response_format": {"type": "json_object"}}
+_INDEX_LLM_KWARGS = {"max_tokens": 3}
 
 class VariableExtractor:
     """Extracts variables from user responses using LLM"""
     def __init__(self, llm_client):
         self.llm = llm_client
+        self.supports_extra_kwargs = _accepts_extra_kwargs(llm_client)
 
     async def extract_variables(self, user_message: str, extraction_plan: Dict) -> Dict[str, str]:
         if not extraction_plan or "output" not in extraction_plan:
@@ -111,35 +185,104 @@ class VariableExtractor:
         If a variable cannot be determined, use an empty string. Return only valid JSON.
         """
         try:
-            response = await self.llm.achat(messages=[ChatMessage(role="user", content=extraction_prompt)])
-            extracted = json.loads(response.message.content)
+            response = await _achat_constrained(self, [ChatMessage(role="user", content=extraction_prompt)], **_EXTRACTION_LLM_KWARGS)
+            extracted = _json_loads(response.message.content)
             valid_vars = {var["title"]: str(extracted[var["title"]]) for var in variables_to_extract if var["title"] in extracted and extracted[var["title"]]}
             return valid_vars
         except Exception as e:
-            logger.warning(f"Variable extraction failed: {e}")
+            logger.warning("Variable extraction failed: %s", e)
             return {}
 
+_CLASSIFY_TRANSITION_PROMPT = """
+        Based on the conversation and user's message, which of the following conditions is met?
+        CONDITIONS:
+        {conditions}
+        CONVERSATION:
+        {conversation}
+        USER'S MESSAGE: {user_message}
+        Respond with only the number of the first condition that is met, or 0 if none is met.
+        """
+
+def _format_conversation(conversation_history: Deque[Dict], n: int = 5) -> str:
+    return "\n".join(f"{msg['role']}: {msg['content']}" for msg in _recent(conversation_history, n))
+
 class TransitionEvaluator:
     """Evaluates AI-based transition conditions"""
     def __init__(self, llm_client):
         self.llm = llm_client
+        self.supports_extra_kwargs = _accepts_extra_kwargs(llm_client)
 
-    async def should_transition(self, condition_prompt: str, user_message: str, conversation_history: List[Dict]) -> bool:
-        context_messages = [f"{msg['role']}: {msg['content']}" for msg in conversation_history[-5:]]
-        evaluation_prompt = f"""
-        Based on the conversation and user's message, is the following condition met?
-        CONDITION: {condition_prompt}
-        CONVERSATION:
-        {chr(10).join(context_messages)}
-        USER'S MESSAGE: {user_message}
-        Respond with exactly "TRUE" or "FALSE".
-        """
+    async def classify_transition(self, conditions: List[str], user_message: str, conversation_history: Deque[Dict]) -> Optional[int]:
+        """Evaluate all of a node's conditions in one LLM call; returns the index of the first one met, or None."""
+        if not conditions:
+            return None
+        evaluation_prompt = _CLASSIFY_TRANSITION_PROMPT.format(
+            conditions="\n".join(f"{i}. {condition}" for i, condition in enumerate(conditions, 1)),
+            conversation=_format_conversation(conversation_history),
+            user_message=user_message,
+        )
         try:
-            response = await self.llm.achat(messages=[ChatMessage(role="user", content=evaluation_prompt)])
-            return response.message.content.strip().upper() == "TRUE"
+            response = await _achat_constrained(self, [ChatMessage(role="user", content=evaluation_prompt)], **_INDEX_LLM_KWARGS)
+            match = _FIRST_INT_RE.search(response.message.content)
+            index = int(match.group()) if match else 0
+            return index - 1 if 1 <= index <= len(conditions) else None
         except Exception as e:
-            logger.warning(f"Transition evaluation failed: {e}")
-            return False
+            logger.warning("Transition evaluation failed: %s", e)
+            return None
+
+async def _chat_deltas(llm_client, messages: List[ChatMessage]) -> AsyncIterator[str]:
+    """Text deltas of a streamed chat completion"""
+    async with llm_client.chat(chat_ctx=ChatContext(items=list(messages))) as stream:
+        async for chunk in stream:
+            if chunk.delta and chunk.delta.content:
+                yield chunk.delta.content
+
+class LLMCache:
+    """Bounded TTL cache of node responses keyed on (node, prompt, recent history)"""
+    def __init__(self, max_entries: int = 64, ttl: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+    @staticmethod
+    def make_key(node: str, formatted_prompt: str, conversation_history: Deque[Dict]) -> str:
+        recent = [msg["content"] for msg in _recent(conversation_history, _LLM_CACHE_HISTORY_TURNS)]
+        payload = json.dumps([node, formatted_prompt, recent], ensure_ascii=False)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _lookup(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, content = entry
+        if time.monotonic() - stored_at >= self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return content
+
+    def _store(self, key: str, content: str):
+        self._entries[key] = (time.monotonic(), content)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def astream(self, llm_client, node: str, formatted_prompt: str, conversation_history: Deque[Dict], messages: List[ChatMessage]) -> AsyncIterator[str]:
+        """Yield the reply sentence by sentence as the LLM streams it, or whole on a cache hit"""
+        # Key on the history as it is now, not when the caller starts iterating
+        return self._astream(self.make_key(node, formatted_prompt, conversation_history), llm_client, node, messages)
+
+    async def _astream(self, key: str, llm_client, node: str, messages: List[ChatMessage]) -> AsyncIterator[str]:
+        content = self._lookup(key)
+        if content is not None:
+            logger.info("LLM cache hit for %s", node)
+            yield content
+            return
+        # Failures propagate to the handler and are never cached
+        parts = []
+        async for sentence in sentence_chunks(_chat_deltas(llm_client, messages)):
+            parts.append(sentence)
+            yield sentence
+        self._store(key, "".join(parts))
 
 class ProviderConfigManager:
     """Manages dynamic AI provider configurations"""
@@ -147,25 +290,52 @@ class ProviderConfigManager:
         self.global_llm_config = global_llm_config or {}
         self.global_voice_config = global_voice_config or {}
         self.global_transcriber_config = global_transcriber_config or {}
+        # Clients wrap HTTP sessions, so build each distinct config only once
+        self._clients: Dict[str, Any] = {}
+        # Handlers rarely pass node overrides; skip the merge and key for that case
+        self._default_clients: Dict[str, Any] = {}
+
+    def _get_cached_client(self, kind: str, config: Dict, factory) -> Any:
+        key = json.dumps([kind, config], sort_keys=True, default=str)
+        client = self._clients.get(key)
+        if client is None:
+            client = self._clients[key] = factory(dict(config))
+        return client
+
+    def _get_default_client(self, kind: str, global_config: Dict, factory) -> Any:
+        client = self._default_clients.get(kind)
+        if client is None:
+            client = self._default_clients[kind] = self._get_cached_client(kind, global_config, factory)
+        return client
 
     def get_llm_client(self, node_llm_config=None):
+        if not node_llm_config:
+            return self._get_default_client("llm", self.global_llm_config, self._create_llm_client)
         config = {**self.global_llm_config, **(node_llm_config or {})}
+        return self._get_cached_client("llm", config, self._create_llm_client)
+
+    def _create_llm_client(self, config: Dict):
         provider = config.pop("provider", "openai").lower()
-        logger.info(f"Configuring LLM client for provider: {provider} with config: {config}")
+        logger.info("Configuring LLM client for provider: %s with config: %s", provider, config)
         try:
             if provider == "openai": return openai.LLM(**config)
             elif provider == "groq": return groq.LLM(**config)
             else:
-                logger.warning(f"Unsupported LLM provider: {provider}. Falling back to OpenAI.")
+                logger.warning("Unsupported LLM provider: %s. Falling back to OpenAI.", provider)
                 return openai.LLM()
         except Exception as e:
-            logger.error(f"Error creating LLM client for {provider}: {e}")
+            logger.error("Error creating LLM client for %s: %s", provider, e)
             return openai.LLM()
 
     def get_tts_client(self, node_voice_config=None):
+        if not node_voice_config:
+            return self._get_default_client("tts", self.global_voice_config, self._create_tts_client)
         config = {**self.global_voice_config, **(node_voice_config or {})}
+        return self._get_cached_client("tts", config, self._create_tts_client)
+
+    def _create_tts_client(self, config: Dict):
         provider = config.pop("provider", "deepgram").lower()
-        logger.info(f"Configuring TTS client for provider: {provider} with config: {config}")
+        logger.info("Configuring TTS client for provider: %s with config: %s", provider, config)
         try:
             if provider == "openai":
                 if "voice_name" in config: config["voice"] = config.pop("voice_name")
@@ -175,475 +345,244 @@ class ProviderConfigManager:
                 return deepgram.TTS(**config)
             elif provider == "cartesia": return cartesia.TTS(**config)
             else:
-                logger.warning(f"Unsupported TTS provider: {provider}. Falling back to Deepgram.")
+                logger.warning("Unsupported TTS provider: %s. Falling back to Deepgram.", provider)
                 return deepgram.TTS()
         except Exception as e:
-            logger.error(f"Error creating TTS client for {provider}: {e}")
+            logger.error("Error creating TTS client for %s: %s", provider, e)
             return deepgram.TTS()
 
     def get_stt_client(self, node_transcriber_config=None):
+        if not node_transcriber_config:
+            return self._get_default_client("stt", self.global_transcriber_config, self._create_stt_client)
         config = {**self.global_transcriber_config, **(node_transcriber_config or {})}
+        return self._get_cached_client("stt", config, self._create_stt_client)
+
+    def _create_stt_client(self, config: Dict):
         provider = config.pop("provider", "deepgram").lower()
-        logger.info(f"Configuring STT client for provider: {provider} with config: {config}")
+        logger.info("Configuring STT client for provider: %s with config: %s", provider, config)
         try:
             if provider == "deepgram": return deepgram.STT(**config)
             elif provider == "openai": return openai.STT(**config)
             else:
-                logger.warning(f"Unsupported STT provider: {provider}. Falling back to Deepgram.")
+                logger.warning("Unsupported STT provider: %s. Falling back to Deepgram.", provider)
                 return deepgram.STT()
         except Exception as e:
-            logger.error(f"Error creating STT client for {provider}: {e}")
+            logger.error("Error creating STT client for %s: %s", provider, e)
             return deepgram.STT()
 
-async def make_api_request(url: str, method: str = "POST", headers: Dict = None, data: Dict = None) -> Dict:
-    headers = headers or {"Content-Type": "application/json"}
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.request(method.upper(), url, headers=headers, json=data) as response:
-                return {"status_code": response.status, "data": await response.json() if response.content_type == "application/json" else await response.text()}
-    except Exception as e:
-        logger.error(f"API request failed: {e}")
-        return {"error": str(e)}
+_HTTP_SESSION: Optional[aiohttp.ClientSession] = None
 
-async def handle_welcome_hub(state: WorkflowState, user_message: str, llm_client, variable_extractor: VariableExtractor, transition_evaluator: TransitionEvaluator, provider_config: ProviderConfigManager) -> Optional[Tuple[str, Any]]:
-    """Handle welcome_hub conversation node"""
-    logger.info(f"Handling welcome_hub node")
-    state.current_node = "welcome_hub"
-    state.add_to_history("user", user_message)
-    
-    transitions = [('User chooses English or responds in English', "english_assistant"), ('User chooses Yoruba or responds in Yoruba', "yoruba_assistant"), ('User chooses Hausa or responds in Hausa', "hausa_assistant"), ('User chooses Igbo or responds in Igbo', "igbo_assistant")]
-    for edge_condition, target_node in transitions:
-        if await transition_evaluator.should_transition(edge_condition, user_message, state.conversation_history):
-            state.current_node = target_node
-            logger.info(f"Transitioning from welcome_hub to {target_node}")
-            # Return a message indicating transition, as the new node will be handled in the next turn
-            return (f"Transitioning to {target_node}", provider_config.get_tts_client())
-
-    if True:
-        extracted_vars = await variable_extractor.extract_variables(user_message, {"output": [{"type": "string", "title": "detected_language", "description": "The language chosen or detected from user input"}, {"type": "string", "title": "initial_request", "description": "Any initial request or question from the user"}]})
-        for var_name, var_value in extracted_vars.items():
-            state.set_variable(var_name, var_value)
-
-    node_llm_config = None
-    node_llm_client = provider_config.get_llm_client(node_llm_config)
-
-    node_voice_config = None
-    tts_client = provider_config.get_tts_client(node_voice_config)
-
-    global_prompt = 'You are a helpful AI assistant with dedicated language-specific nodes. Each language node has pre-configured voice settings and cultural context. You can provide assistance, translations, and information while maintaining authentic communication in Yoruba, Hausa, Igbo, and English.'
-    node_prompt = 'Welcome users in all languages and let them choose their preferred language:\n\n\'Hello! Sannu! Ndewo! E ku aaro! \n\nWelcome to your multilingual assistant! Choose your language:\n- English (Press 1 or say "English")\n- Yoruba (Press 2 or say "Yoruba/Ede Yoruba")\n- Hausa (Press 3 or say "Hausa")\n- Igbo (Press 4 or say "Igbo/Asụsụ Igbo")\n\nOr just start speaking in your preferred language and I\'ll detect it!\''
-    instruction = "\n\nIMPORTANT: Your reply must be very short and conversational."
-    combined_prompt = f"{global_prompt}\n\n--- Node Instructions ---\n{node_prompt} {instruction}"
-    formatted_prompt = state.format_prompt_template(combined_prompt)
-    
-    context_messages = [ChatMessage(role=msg["role"], content=msg["content"]) for msg in state.conversation_history[-10:]]
-    context_messages.insert(0, ChatMessage(role="system", content=formatted_prompt))
-    
-    try:
-        response = await node_llm_client.achat(messages=context_messages)
-        ai_response = response.message.content
-        state.add_to_history("assistant", ai_response)
-        logger.info(f"Generated response for welcome_hub: {ai_response[:100]}...")
-        return (ai_response, tts_client)
-    except Exception as e:
-        logger.error(f"Error in welcome_hub: {e}")
-        return ("I'm having trouble processing that right now.", tts_client)
-
-async def handle_english_assistant(state: WorkflowState, user_message: str, llm_client, variable_extractor: VariableExtractor, transition_evaluator: TransitionEvaluator, provider_config: ProviderConfigManager) -> Optional[Tuple[str, Any]]:
-    """Handle english_assistant conversation node"""
-    logger.info(f"Handling english_assistant node")
-    state.current_node = "english_assistant"
-    state.add_to_history("user", user_message)
-    
-    transitions = [('User continues conversation in English', "english_assistant"), ('User requests translation services', "translation_hub"), ('User asks about culture, traditions, or regional topics', "cultural_information_hub"), ('User indicates they want to end the conversation', "farewell_hub")]
-    for edge_condition, target_node in transitions:
-        if await transition_evaluator.should_transition(edge_condition, user_message, state.conversation_history):
-            state.current_node = target_node
-            logger.info(f"Transitioning from english_assistant to {target_node}")
-            # Return a message indicating transition, as the new node will be handled in the next turn
-            return (f"Transitioning to {target_node}", provider_config.get_tts_client())
-
-    if True:
-        extracted_vars = await variable_extractor.extract_variables(user_message, {"output": [{"type": "string", "title": "current_language", "value": "English", "description": "Current active language"}, {"type": "string", "title": "conversation_topic", "description": "Main topic of conversation"}, {"type": "string", "title": "assistance_type", "description": "Type of assistance provided (information, translation, general help, etc.)"}]})
-        for var_name, var_value in extracted_vars.items():
-            state.set_variable(var_name, var_value)
-
-    node_llm_config = None
-    node_llm_client = provider_config.get_llm_client(node_llm_config)
-
-    node_voice_config = None
-    tts_client = provider_config.get_tts_client(node_voice_config)
-
-    global_prompt = 'You are a helpful AI assistant with dedicated language-specific nodes. Each language node has pre-configured voice settings and cultural context. You can provide assistance, translations, and information while maintaining authentic communication in Yoruba, Hausa, Igbo, and English.'
-    node_prompt = 'You are now in English mode. Provide helpful assistance in clear, professional English. Handle general questions, provide information, help with tasks, offer translations to other languages, and engage in natural conversation. Use American English conventions and be friendly yet professional.'
-    instruction = "\n\nIMPORTANT: Your reply must be very short and conversational."
-    combined_prompt = f"{global_prompt}\n\n--- Node Instructions ---\n{node_prompt} {instruction}"
-    formatted_prompt = state.format_prompt_template(combined_prompt)
-    
-    context_messages = [ChatMessage(role=msg["role"], content=msg["content"]) for msg in state.conversation_history[-10:]]
-    context_messages.insert(0, ChatMessage(role="system", content=formatted_prompt))
-    
-    try:
-        response = await node_llm_client.achat(messages=context_messages)
-        ai_response = response.message.content
-        state.add_to_history("assistant", ai_response)
-        logger.info(f"Generated response for english_assistant: {ai_response[:100]}...")
-        return (ai_response, tts_client)
-    except Exception as e:
-        logger.error(f"Error in english_assistant: {e}")
-        return ("I'm having trouble processing that right now.", tts_client)
-
-async def handle_yoruba_assistant(state: WorkflowState, user_message: str, llm_client, variable_extractor: VariableExtractor, transition_evaluator: TransitionEvaluator, provider_config: ProviderConfigManager) -> Optional[Tuple[str, Any]]:
-    """Handle yoruba_assistant conversation node"""
-    logger.info(f"Handling yoruba_assistant node")
-    state.current_node = "yoruba_assistant"
-    state.add_to_history("user", user_message)
-    
-    transitions = [('User continues conversation in Yoruba', "yoruba_assistant"), ('User requests translation services', "translation_hub"), ('User asks about culture, traditions, or regional topics', "cultural_information_hub"), ('User indicates they want to end the conversation', "farewell_hub")]
-    for edge_condition, target_node in transitions:
-        if await transition_evaluator.should_transition(edge_condition, user_message, state.conversation_history):
-            state.current_node = target_node
-            logger.info(f"Transitioning from yoruba_assistant to {target_node}")
-            # Return a message indicating transition, as the new node will be handled in the next turn
-            return (f"Transitioning to {target_node}", provider_config.get_tts_client())
-
-    if True:
-        extracted_vars = await variable_extractor.extract_variables(user_message, {"output": [{"type": "string", "title": "current_language", "value": "Yoruba", "description": "Current active language"}, {"type": "string", "title": "conversation_topic", "description": "Koko oro ibaraenisepo (main conversation topic)"}, {"type": "string", "title": "cultural_context", "value": "yoruba_traditional", "description": "Cultural context for responses"}]})
-        for var_name, var_value in extracted_vars.items():
-            state.set_variable(var_name, var_value)
-
-    node_llm_config = None
-    node_llm_client = provider_config.get_llm_client(node_llm_config)
-
-    node_voice_config = None
-    tts_client = provider_config.get_tts_client(node_voice_config)
-
-    global_prompt = 'You are a helpful AI assistant with dedicated language-specific nodes. Each language node has pre-configured voice settings and cultural context. You can provide assistance, translations, and information while maintaining authentic communication in Yoruba, Hausa, Igbo, and English.'
-    node_prompt = "O ti wa ni ipo Yoruba bayi. Pese iranwo ni ede Yoruba ti o ye kooro. Lo awon oro ti o t\u1ecd bi '\u1eb9 j\u1ecdw\u1ecd' (please), '\u1eb9 \u1e63e' (thank you), 'bawo ni' (how are you). Ran awon eniyan lowo pelu awon ibeere, fun ni alaye, \u1e63e atum\u1ecd si awon ede miiran, ati \u1e62IS oro tabi gbogbo iru i\u1e63e ti won ba beere. J\u1eb9 ki ibaraenisepo r\u1eb9 j\u1eb9 atun\u1e63e ati ki o ni it\u1ecdju."
-    instruction = "\n\nIMPORTANT: Your reply must be very short and conversational."
-    combined_prompt = f"{global_prompt}\n\n--- Node Instructions ---\n{node_prompt} {instruction}"
-    formatted_prompt = state.format_prompt_template(combined_prompt)
-    
-    context_messages = [ChatMessage(role=msg["role"], content=msg["content"]) for msg in state.conversation_history[-10:]]
-    context_messages.insert(0, ChatMessage(role="system", content=formatted_prompt))
-    
-    try:
-        response = await node_llm_client.achat(messages=context_messages)
-        ai_response = response.message.content
-        state.add_to_history("assistant", ai_response)
-        logger.info(f"Generated response for yoruba_assistant: {ai_response[:100]}...")
-        return (ai_response, tts_client)
-    except Exception as e:
-        logger.error(f"Error in yoruba_assistant: {e}")
-        return ("I'm having trouble processing that right now.", tts_client)
+async def _get_http_session() -> aiohttp.ClientSession:
+    """Shared keep-alive session for make_api_request, created on first use"""
+    global _HTTP_SESSION
+    if _HTTP_SESSION is None or _HTTP_SESSION.closed:
+        _HTTP_SESSION = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=100, ttl_dns_cache=300, keepalive_timeout=30)
+        )
+    return _HTTP_SESSION
 
-async def handle_hausa_assistant(state: WorkflowState, user_message: str, llm_client, variable_extractor: VariableExtractor, transition_evaluator: TransitionEvaluator, provider_config: ProviderConfigManager) -> Optional[Tuple[str, Any]]:
-    """Handle hausa_assistant conversation node"""
-    logger.info(f"Handling hausa_assistant node")
-    state.current_node = "hausa_assistant"
-    state.add_to_history("user", user_message)
-    
-    transitions = [('User continues conversation in Hausa', "hausa_assistant"), ('User requests translation services', "translation_hub"), ('User asks about culture, traditions, or regional topics', "cultural_information_hub"), ('User indicates they want to end the conversation', "farewell_hub")]
-    for edge_condition, target_node in transitions:
-        if await transition_evaluator.should_transition(edge_condition, user_message, state.conversation_history):
-            state.current_node = target_node
-            logger.info(f"Transitioning from hausa_assistant to {target_node}")
-            # Return a message indicating transition, as the new node will be handled in the next turn
-            return (f"Transitioning to {target_node}", provider_config.get_tts_client())
-
-    if True:
-        extracted_vars = await variable_extractor.extract_variables(user_message, {"output": [{"type": "string", "title": "current_language", "value": "Hausa", "description": "Current active language"}, {"type": "string", "title": "conversation_topic", "description": "Babban batun hira (main conversation topic)"}, {"type": "string", "title": "cultural_context", "value": "hausa_traditional", "description": "Cultural context for responses"}]})
-        for var_name, var_value in extracted_vars.items():
-            state.set_variable(var_name, var_value)
-
-    node_llm_config = None
-    node_llm_client = provider_config.get_llm_client(node_llm_config)
-
-    node_voice_config = None
-    tts_client = provider_config.get_tts_client(node_voice_config)
-
-    global_prompt = 'You are a helpful AI assistant with dedicated language-specific nodes. Each language node has pre-configured voice settings and cultural context. You can provide assistance, translations, and information while maintaining authentic communication in Yoruba, Hausa, Igbo, and English.'
-    node_prompt = "Yanzu kuna cikin yanayin Hausa. Bayar da taimako a cikin Hausa mai kyau. Yi amfani da kalmomi masu dacewa kamar 'don Allah' (please), 'na gode' (thank you), 'sannu da zuwa' (welcome). Taimaka wa mutane da tambayoyi, bayar da bayanai, yi fassara zuwa wasu harsuna, da yin hira akan duk wani batu da suke so. Kasance mai son zuciya kuma mai kulawa."
-    instruction = "\n\nIMPORTANT: Your reply must be very short and conversational."
-    combined_prompt = f"{global_prompt}\n\n--- Node Instructions ---\n{node_prompt} {instruction}"
-    formatted_prompt = state.format_prompt_template(combined_prompt)
-    
-    context_messages = [ChatMessage(role=msg["role"], content=msg["content"]) for msg in state.conversation_history[-10:]]
-    context_messages.insert(0, ChatMessage(role="system", content=formatted_prompt))
-    
-    try:
-        response = await node_llm_client.achat(messages=context_messages)
-        ai_response = response.message.content
-        state.add_to_history("assistant", ai_response)
-        logger.info(f"Generated response for hausa_assistant: {ai_response[:100]}...")
-        return (ai_response, tts_client)
-    except Exception as e:
-        logger.error(f"Error in hausa_assistant: {e}")
-        return ("I'm having trouble processing that right now.", tts_client)
+async def _close_http_session():
+    global _HTTP_SESSION
+    if _HTTP_SESSION is not None and not _HTTP_SESSION.closed:
+        await _HTTP_SESSION.close()
+    _HTTP_SESSION = None
 
-async def handle_igbo_assistant(state: WorkflowState, user_message: str, llm_client, variable_extractor: VariableExtractor, transition_evaluator: TransitionEvaluator, provider_config: ProviderConfigManager) -> Optional[Tuple[str, Any]]:
-    """Handle igbo_assistant conversation node"""
-    logger.info(f"Handling igbo_assistant node")
-    state.current_node = "igbo_assistant"
-    state.add_to_history("user", user_message)
-    
-    transitions = [('User continues conversation in Igbo', "igbo_assistant"), ('User requests translation services', "translation_hub"), ('User asks about culture, traditions, or regional topics', "cultural_information_hub"), ('User indicates they want to end the conversation', "farewell_hub")]
-    for edge_condition, target_node in transitions:
-        if await transition_evaluator.should_transition(edge_condition, user_message, state.conversation_history):
-            state.current_node = target_node
-            logger.info(f"Transitioning from igbo_assistant to {target_node}")
-            # Return a message indicating transition, as the new node will be handled in the next turn
-            return (f"Transitioning to {target_node}", provider_config.get_tts_client())
-
-    if True:
-        extracted_vars = await variable_extractor.extract_variables(user_message, {"output": [{"type": "string", "title": "current_language", "value": "Igbo", "description": "Current active language"}, {"type": "string", "title": "conversation_topic", "description": "Isi okwu mkpar\u1ecbta \u1ee5ka (main conversation topic)"}, {"type": "string", "title": "cultural_context", "value": "igbo_traditional", "description": "Cultural context for responses"}]})
-        for var_name, var_value in extracted_vars.items():
-            state.set_variable(var_name, var_value)
-
-    node_llm_config = None
-    node_llm_client = provider_config.get_llm_client(node_llm_config)
-
-    node_voice_config = None
-    tts_client = provider_config.get_tts_client(node_voice_config)
-
-    global_prompt = 'You are a helpful AI assistant with dedicated language-specific nodes. Each language node has pre-configured voice settings and cultural context. You can provide assistance, translations, and information while maintaining authentic communication in Yoruba, Hausa, Igbo, and English.'
-    node_prompt = "Ị n\u1ecd ugbu a n'\u1ecdn\u1ecd\u1ee5 Igbo. Nye enyemaka n'as\u1ee5s\u1ee5 Igbo d\u1ecb mma. Jiri okwu kwes\u1ecbr\u1ecb ekwes\u1ecb d\u1ecb ka 'biko' (please), 'daal\u1ee5' (thank you), 'ndewo' (hello). Nyere nd\u1ecb mmad\u1ee5 aka na aj\u1ee5j\u1ee5 ha, nye ozi, t\u1ee5ghar\u1ecba as\u1ee5s\u1ee5 n'as\u1ee5s\u1ee5 nd\u1ecb \u1ecdz\u1ecd, ma kwur\u1ecbta okwu gbasara ihe \u1ecd b\u1ee5la ha ch\u1ecdr\u1ecd. B\u1ee5r\u1ee5 onye obi\u1ecma ma na-elek\u1ecdta."
-    instruction = "\n\nIMPORTANT: Your reply must be very short and conversational."
-    combined_prompt = f"{global_prompt}\n\n--- Node Instructions ---\n{node_prompt} {instruction}"
-    formatted_prompt = state.format_prompt_template(combined_prompt)
-    
-    context_messages = [ChatMessage(role=msg["role"], content=msg["content"]) for msg in state.conversation_history[-10:]]
-    context_messages.insert(0, ChatMessage(role="system", content=formatted_prompt))
-    
-    try:
-        response = await node_llm_client.achat(messages=context_messages)
-        ai_response = response.message.content
-        state.add_to_history("assistant", ai_response)
-        logger.info(f"Generated response for igbo_assistant: {ai_response[:100]}...")
-        return (ai_response, tts_client)
-    except Exception as e:
-        logger.error(f"Error in igbo_assistant: {e}")
-        return ("I'm having trouble processing that right now.", tts_client)
+# Jobs in this process using the shared session; it is closed only when
+# the last one shuts down, never under a job that is still running
+_HTTP_SESSION_USERS = 0
 
-async def handle_translation_hub(state: WorkflowState, user_message: str, llm_client, variable_extractor: VariableExtractor, transition_evaluator: TransitionEvaluator, provider_config: ProviderConfigManager) -> Optional[Tuple[str, Any]]:
-    """Handle translation_hub conversation node"""
-    logger.info(f"Handling translation_hub node")
-    state.current_node = "translation_hub"
-    state.add_to_history("user", user_message)
-    
-    transitions = [('Translation completed, user continues in English context', "english_assistant"), ('Translation completed, user continues in Yoruba context', "yoruba_assistant"), ('Translation completed, user continues in Hausa context', "hausa_assistant"), ('Translation completed, user continues in Igbo context', "igbo_assistant")]
-    for edge_condition, target_node in transitions:
-        if await transition_evaluator.should_transition(edge_condition, user_message, state.conversation_history):
-            state.current_node = target_node
-            logger.info(f"Transitioning from translation_hub to {target_node}")
-            # Return a message indicating transition, as the new node will be handled in the next turn
-            return (f"Transitioning to {target_node}", provider_config.get_tts_client())
-
-    if True:
-        extracted_vars = await variable_extractor.extract_variables(user_message, {"output": [{"type": "string", "title": "source_language", "description": "Language translating from"}, {"type": "string", "title": "target_language", "description": "Language translating to"}, {"type": "string", "title": "translation_text", "description": "Text being translated"}, {"type": "string", "title": "translation_type", "description": "Type of translation (word, phrase, sentence, cultural expression)"}]})
-        for var_name, var_value in extracted_vars.items():
-            state.set_variable(var_name, var_value)
-
-    node_llm_config = None
-    node_llm_client = provider_config.get_llm_client(node_llm_config)
-
-    node_voice_config = None
-    tts_client = provider_config.get_tts_client(node_voice_config)
-
-    global_prompt = 'You are a helpful AI assistant with dedicated language-specific nodes. Each language node has pre-configured voice settings and cultural context. You can provide assistance, translations, and information while maintaining authentic communication in Yoruba, Hausa, Igbo, and English.'
-    node_prompt = "Translation Hub - Handle translation requests between any of the supported languages. Provide accurate translations with cultural context. Current language context: {{current_language}}. \n\nFor translations:\n- Explain cultural nuances when needed\n- Provide alternative expressions if direct translation isn't ideal\n- Offer pronunciation help\n- Give context about when to use certain phrases\n\nRespond in the user's current language setting."
-    instruction = "\n\nIMPORTANT: Your reply must be very short and conversational."
-    combined_prompt = f"{global_prompt}\n\n--- Node Instructions ---\n{node_prompt} {instruction}"
-    formatted_prompt = state.format_prompt_template(combined_prompt)
-    
-    context_messages = [ChatMessage(role=msg["role"], content=msg["content"]) for msg in state.conversation_history[-10:]]
-    context_messages.insert(0, ChatMessage(role="system", content=formatted_prompt))
-    
-    try:
-        response = await node_llm_client.achat(messages=context_messages)
-        ai_response = response.message.content
-        state.add_to_history("assistant", ai_response)
-        logger.info(f"Generated response for translation_hub: {ai_response[:100]}...")
-        return (ai_response, tts_client)
-    except Exception as e:
-        logger.error(f"Error in translation_hub: {e}")
-        return ("I'm having trouble processing that right now.", tts_client)
+def _retain_http_session(ctx: JobContext):
+    global _HTTP_SESSION_USERS
+    _HTTP_SESSION_USERS += 1
+    ctx.add_shutdown_callback(_release_http_session)
 
-async def handle_cultural_information_hub(state: WorkflowState, user_message: str, llm_client, variable_extractor: VariableExtractor, transition_evaluator: TransitionEvaluator, provider_config: ProviderConfigManager) -> Optional[Tuple[str, Any]]:
-    """Handle cultural_information_hub conversation node"""
-    logger.info(f"Handling cultural_information_hub node")
-    state.current_node = "cultural_information_hub"
-    state.add_to_history("user", user_message)
-    
-    transitions = [('Cultural information provided, user continues in English context', "english_assistant"), ('Cultural information provided, user continues in Yoruba context', "yoruba_assistant"), ('Cultural information provided, user continues in Hausa context', "hausa_assistant"), ('Cultural information provided, user continues in Igbo context', "igbo_assistant")]
-    for edge_condition, target_node in transitions:
-        if await transition_evaluator.should_transition(edge_condition, user_message, state.conversation_history):
-            state.current_node = target_node
-            logger.info(f"Transitioning from cultural_information_hub to {target_node}")
-            # Return a message indicating transition, as the new node will be handled in the next turn
-            return (f"Transitioning to {target_node}", provider_config.get_tts_client())
-
-    if True:
-        extracted_vars = await variable_extractor.extract_variables(user_message, {"output": [{"type": "string", "title": "cultural_topic", "description": "Specific cultural topic being discussed"}, {"type": "string", "title": "cultural_region", "description": "Specific region or ethnic group focus"}]})
-        for var_name, var_value in extracted_vars.items():
-            state.set_variable(var_name, var_value)
-
-    node_llm_config = None
-    node_llm_client = provider_config.get_llm_client(node_llm_config)
-
-    node_voice_config = None
-    tts_client = provider_config.get_tts_client(node_voice_config)
-
-    global_prompt = 'You are a helpful AI assistant with dedicated language-specific nodes. Each language node has pre-configured voice settings and cultural context. You can provide assistance, translations, and information while maintaining authentic communication in Yoruba, Hausa, Igbo, and English.'
-    node_prompt = "Cultural Information Hub - Provide culturally relevant information based on current language context: {{current_language}} with cultural context: {{cultural_context}}.\n\nShare authentic information about:\n- Festivals and celebrations\n- Traditional foods and recipes\n- Music and dance\n- History and customs\n- Proverbs and sayings\n- Regional variations\n\nRespond in the user's current language with appropriate cultural sensitivity."
-    instruction = "\n\nIMPORTANT: Your reply must be very short and conversational."
-    combined_prompt = f"{global_prompt}\n\n--- Node Instructions ---\n{node_prompt} {instruction}"
-    formatted_prompt = state.format_prompt_template(combined_prompt)
-    
-    context_messages = [ChatMessage(role=msg["role"], content=msg["content"]) for msg in state.conversation_history[-10:]]
-    context_messages.insert(0, ChatMessage(role="system", content=formatted_prompt))
-    
-    try:
-        response = await node_llm_client.achat(messages=context_messages)
-        ai_response = response.message.content
-        state.add_to_history("assistant", ai_response)
-        logger.info(f"Generated response for cultural_information_hub: {ai_response[:100]}...")
-        return (ai_response, tts_client)
-    except Exception as e:
-        logger.error(f"Error in cultural_information_hub: {e}")
-        return ("I'm having trouble processing that right now.", tts_client)
+async def _release_http_session():
+    global _HTTP_SESSION_USERS
+    _HTTP_SESSION_USERS -= 1
+    if _HTTP_SESSION_USERS == 0:
+        await _close_http_session()
 
-async def handle_language_switch_hub(state: WorkflowState, user_message: str, llm_client, variable_extractor: VariableExtractor, transition_evaluator: TransitionEvaluator, provider_config: ProviderConfigManager) -> Optional[Tuple[str, Any]]:
-    """Handle language_switch_hub conversation node"""
-    logger.info(f"Handling language_switch_hub node")
-    state.current_node = "language_switch_hub"
-    state.add_to_history("user", user_message)
-    
-    transitions = [('User requests switch to English', "english_assistant"), ('User requests switch to Yoruba', "yoruba_assistant"), ('User requests switch to Hausa', "hausa_assistant"), ('User requests switch to Igbo', "igbo_assistant")]
-    for edge_condition, target_node in transitions:
-        if await transition_evaluator.should_transition(edge_condition, user_message, state.conversation_history):
-            state.current_node = target_node
-            logger.info(f"Transitioning from language_switch_hub to {target_node}")
-            # Return a message indicating transition, as the new node will be handled in the next turn
-            return (f"Transitioning to {target_node}", provider_config.get_tts_client())
-
-    if True:
-        extracted_vars = await variable_extractor.extract_variables(user_message, {"output": [{"type": "string", "title": "requested_language", "description": "The new language user wants to switch to"}]})
-        for var_name, var_value in extracted_vars.items():
-            state.set_variable(var_name, var_value)
-
-    node_llm_config = None
-    node_llm_client = provider_config.get_llm_client(node_llm_config)
-
-    node_voice_config = None
-    tts_client = provider_config.get_tts_client(node_voice_config)
-
-    global_prompt = 'You are a helpful AI assistant with dedicated language-specific nodes. Each language node has pre-configured voice settings and cultural context. You can provide assistance, translations, and information while maintaining authentic communication in Yoruba, Hausa, Igbo, and English.'
-    node_prompt = "Language Switch Hub - Handle requests to change language. Current language: {{current_language}}.\n\nConfirm the switch and route to appropriate language node:\n- English: 'Switching to English. How can I help you?'\n- Yoruba: 'Mo ti yi pada si ede Yoruba. Bawo ni mo se le ran yin lowo?'\n- Hausa: 'Na canja zuwa Hausa. Yaya zan iya taimaka maku?'\n- Igbo: 'Agbanwere m gaa Igbo. Kedu ka m ga-esi nyere g\u1ecb aka?'"
-    instruction = "\n\nIMPORTANT: Your reply must be very short and conversational."
-    combined_prompt = f"{global_prompt}\n\n--- Node Instructions ---\n{node_prompt} {instruction}"
-    formatted_prompt = state.format_prompt_template(combined_prompt)
-    
-    context_messages = [ChatMessage(role=msg["role"], content=msg["content"]) for msg in state.conversation_history[-10:]]
-    context_messages.insert(0, ChatMessage(role="system", content=formatted_prompt))
-    
+async def make_api_request(url: str, method: str = "POST", headers: Dict = None, data: Dict = None) -> Dict:
+    headers = headers or {"Content-Type": "application/json"}
     try:
-        response = await node_llm_client.achat(messages=context_messages)
-        ai_response = response.message.content
-        state.add_to_history("assistant", ai_response)
-        logger.info(f"Generated response for language_switch_hub: {ai_response[:100]}...")
-        return (ai_response, tts_client)
+        session = await _get_http_session()
+        async with session.request(method.upper(), url, headers=headers, json=data) as response:
+            return {"status_code": response.status, "data": await response.json() if response.content_type == "application/json" else await response.text()}
     except Exception as e:
-        logger.error(f"Error in language_switch_hub: {e}")
-        return ("I'm having trouble processing that right now.", tts_client)
+        logger.error("API request failed: %s", e)
+        return {"error": str(e)}
 
-async def handle_help_limitations(state: WorkflowState, user_message: str, llm_client, variable_extractor: VariableExtractor, transition_evaluator: TransitionEvaluator, provider_config: ProviderConfigManager) -> Optional[Tuple[str, Any]]:
-    """Handle help_limitations conversation node"""
-    logger.info(f"Handling help_limitations node")
-    state.current_node = "help_limitations"
+_GLOBAL_PROMPT = 'You are a helpful AI assistant with dedicated language-specific nodes. Each language node has pre-configured voice settings and cultural context. You can provide assistance, translations, and information while maintaining authentic communication in Yoruba, Hausa, Igbo, and English.'
+_REPLY_INSTRUCTION = "\n\nIMPORTANT: Your reply must be very short and conversational."
+
+@dataclass(frozen=True)
+class NodeConfig:
+    """Per-node constants, built once at import instead of on every turn"""
+    transitions: Tuple[Tuple[str, str], ...]
+    extraction_plan: Optional[Dict]
+    node_prompt: str
+    llm_config: Optional[Dict] = None
+    voice_config: Optional[Dict] = None
+    conditions: Tuple[str, ...] = field(init=False)
+    combined_prompt: str = field(init=False)
+    # Plan entries with a fixed "value" need no LLM; only the rest are extracted
+    static_variables: Tuple[Tuple[str, str], ...] = field(init=False)
+    dynamic_plan: Optional[Dict] = field(init=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "conditions", tuple(condition for condition, _ in self.transitions))
+        plan = (self.extraction_plan or {}).get("output") or []
+        object.__setattr__(self, "static_variables", tuple((var["title"], var["value"]) for var in plan if "value" in var))
+        dynamic = [var for var in plan if "value" not in var]
+        object.__setattr__(self, "dynamic_plan", {"output": dynamic} if dynamic else None)
+        object.__setattr__(self, "combined_prompt", f"{_GLOBAL_PROMPT}\n\n--- Node Instructions ---\n{self.node_prompt} {_REPLY_INSTRUCTION}")
+
+_NODE_CONFIG: Dict[str, NodeConfig] = {
+    'welcome_hub': NodeConfig(
+        transitions=(('User chooses English or responds in English', 'english_assistant'), ('User chooses Yoruba or responds in Yoruba', 'yoruba_assistant'), ('User chooses Hausa or responds in Hausa', 'hausa_assistant'), ('User chooses Igbo or responds in Igbo', 'igbo_assistant'),),
+        extraction_plan={'output': [{'type': 'string', 'title': 'detected_language', 'description': 'The language chosen or detected from user input'}, {'type': 'string', 'title': 'initial_request', 'description': 'Any initial request or question from the user'}]},
+        node_prompt='Welcome users in all languages and let them choose their preferred language:\n\n\'Hello! Sannu! Ndewo! E ku aaro! \n\nWelcome to your multilingual assistant! Choose your language:\n- English (Press 1 or say "English")\n- Yoruba (Press 2 or say "Yoruba/Ede Yoruba")\n- Hausa (Press 3 or say "Hausa")\n- Igbo (Press 4 or say "Igbo/Asụsụ Igbo")\n\nOr just start speaking in your preferred language and I\'ll detect it!\'',
+        llm_config=None,
+        voice_config=None,
+    ),
+    'english_assistant': NodeConfig(
+        transitions=(('User continues conversation in English', 'english_assistant'), ('User requests translation services', 'translation_hub'), ('User asks about culture, traditions, or regional topics', 'cultural_information_hub'), ('User indicates they want to end the conversation', 'farewell_hub'),),
+        extraction_plan={'output': [{'type': 'string', 'title': 'current_language', 'value': 'English', 'description': 'Current active language'}, {'type': 'string', 'title': 'conversation_topic', 'description': 'Main topic of conversation'}, {'type': 'string', 'title': 'assistance_type', 'description': 'Type of assistance provided (information, translation, general help, etc.)'}]},
+        node_prompt='You are now in English mode. Provide helpful assistance in clear, professional English. Handle general questions, provide information, help with tasks, offer translations to other languages, and engage in natural conversation. Use American English conventions and be friendly yet professional.',
+        llm_config=None,
+        voice_config=None,
+    ),
+    'yoruba_assistant': NodeConfig(
+        transitions=(('User continues conversation in Yoruba', 'yoruba_assistant'), ('User requests translation services', 'translation_hub'), ('User asks about culture, traditions, or regional topics', 'cultural_information_hub'), ('User indicates they want to end the conversation', 'farewell_hub'),),
+        extraction_plan={'output': [{'type': 'string', 'title': 'current_language', 'value': 'Yoruba', 'description': 'Current active language'}, {'type': 'string', 'title': 'conversation_topic', 'description': 'Koko oro ibaraenisepo (main conversation topic)'}, {'type': 'string', 'title': 'cultural_context', 'value': 'yoruba_traditional', 'description': 'Cultural context for responses'}]},
+        node_prompt="O ti wa ni ipo Yoruba bayi. Pese iranwo ni ede Yoruba ti o ye kooro. Lo awon oro ti o tọ bi 'ẹ jọwọ' (please), 'ẹ ṣe' (thank you), 'bawo ni' (how are you). Ran awon eniyan lowo pelu awon ibeere, fun ni alaye, ṣe atumọ si awon ede miiran, ati ṢIS oro tabi gbogbo iru iṣe ti won ba beere. Jẹ ki ibaraenisepo rẹ jẹ atunṣe ati ki o ni itọju.",
+        llm_config=None,
+        voice_config=None,
+    ),
+    'hausa_assistant': NodeConfig(
+        transitions=(('User continues conversation in Hausa', 'hausa_assistant'), ('User requests translation services', 'translation_hub'), ('User asks about culture, traditions, or regional topics', 'cultural_information_hub'), ('User indicates they want to end the conversation', 'farewell_hub'),),
+        extraction_plan={'output': [{'type': 'string', 'title': 'current_language', 'value': 'Hausa', 'description': 'Current active language'}, {'type': 'string', 'title': 'conversation_topic', 'description': 'Babban batun hira (main conversation topic)'}, {'type': 'string', 'title': 'cultural_context', 'value': 'hausa_traditional', 'description': 'Cultural context for responses'}]},
+        node_prompt="Yanzu kuna cikin yanayin Hausa. Bayar da taimako a cikin Hausa mai kyau. Yi amfani da kalmomi masu dacewa kamar 'don Allah' (please), 'na gode' (thank you), 'sannu da zuwa' (welcome). Taimaka wa mutane da tambayoyi, bayar da bayanai, yi fassara zuwa wasu harsuna, da yin hira akan duk wani batu da suke so. Kasance mai son zuciya kuma mai kulawa.",
+        llm_config=None,
+        voice_config=None,
+    ),
+    'igbo_assistant': NodeConfig(
+        transitions=(('User continues conversation in Igbo', 'igbo_assistant'), ('User requests translation services', 'translation_hub'), ('User asks about culture, traditions, or regional topics', 'cultural_information_hub'), ('User indicates they want to end the conversation', 'farewell_hub'),),
+        extraction_plan={'output': [{'type': 'string', 'title': 'current_language', 'value': 'Igbo', 'description': 'Current active language'}, {'type': 'string', 'title': 'conversation_topic', 'description': 'Isi okwu mkparịta ụka (main conversation topic)'}, {'type': 'string', 'title': 'cultural_context', 'value': 'igbo_traditional', 'description': 'Cultural context for responses'}]},
+        node_prompt="Ị nọ ugbu a n'ọnọụ Igbo. Nye enyemaka n'asụsụ Igbo dị mma. Jiri okwu kwesịrị ekwesị dị ka 'biko' (please), 'daalụ' (thank you), 'ndewo' (hello). Nyere ndị mmadụ aka na ajụjụ ha, nye ozi, tụgharịa asụsụ n'asụsụ ndị ọzọ, ma kwurịta okwu gbasara ihe ọ bụla ha chọrọ. Bụrụ onye obiọma ma na-elekọta.",
+        llm_config=None,
+        voice_config=None,
+    ),
+    'translation_hub': NodeConfig(
+        transitions=(('Translation completed, user continues in English context', 'english_assistant'), ('Translation completed, user continues in Yoruba context', 'yoruba_assistant'), ('Translation completed, user continues in Hausa context', 'hausa_assistant'), ('Translation completed, user continues in Igbo context', 'igbo_assistant'),),
+        extraction_plan={'output': [{'type': 'string', 'title': 'source_language', 'description': 'Language translating from'}, {'type': 'string', 'title': 'target_language', 'description': 'Language translating to'}, {'type': 'string', 'title': 'translation_text', 'description': 'Text being translated'}, {'type': 'string', 'title': 'translation_type', 'description': 'Type of translation (word, phrase, sentence, cultural expression)'}]},
+        node_prompt="Translation Hub - Handle translation requests between any of the supported languages. Provide accurate translations with cultural context. Current language context: {{current_language}}. \n\nFor translations:\n- Explain cultural nuances when needed\n- Provide alternative expressions if direct translation isn't ideal\n- Offer pronunciation help\n- Give context about when to use certain phrases\n\nRespond in the user's current language setting.",
+        llm_config=None,
+        voice_config=None,
+    ),
+    'cultural_information_hub': NodeConfig(
+        transitions=(('Cultural information provided, user continues in English context', 'english_assistant'), ('Cultural information provided, user continues in Yoruba context', 'yoruba_assistant'), ('Cultural information provided, user continues in Hausa context', 'hausa_assistant'), ('Cultural information provided, user continues in Igbo context', 'igbo_assistant'),),
+        extraction_plan={'output': [{'type': 'string', 'title': 'cultural_topic', 'description': 'Specific cultural topic being discussed'}, {'type': 'string', 'title': 'cultural_region', 'description': 'Specific region or ethnic group focus'}]},
+        node_prompt="Cultural Information Hub - Provide culturally relevant information based on current language context: {{current_language}} with cultural context: {{cultural_context}}.\n\nShare authentic information about:\n- Festivals and celebrations\n- Traditional foods and recipes\n- Music and dance\n- History and customs\n- Proverbs and sayings\n- Regional variations\n\nRespond in the user's current language with appropriate cultural sensitivity.",
+        llm_config=None,
+        voice_config=None,
+    ),
+    'language_switch_hub': NodeConfig(
+        transitions=(('User requests switch to English', 'english_assistant'), ('User requests switch to Yoruba', 'yoruba_assistant'), ('User requests switch to Hausa', 'hausa_assistant'), ('User requests switch to Igbo', 'igbo_assistant'),),
+        extraction_plan={'output': [{'type': 'string', 'title': 'requested_language', 'description': 'The new language user wants to switch to'}]},
+        node_prompt="Language Switch Hub - Handle requests to change language. Current language: {{current_language}}.\n\nConfirm the switch and route to appropriate language node:\n- English: 'Switching to English. How can I help you?'\n- Yoruba: 'Mo ti yi pada si ede Yoruba. Bawo ni mo se le ran yin lowo?'\n- Hausa: 'Na canja zuwa Hausa. Yaya zan iya taimaka maku?'\n- Igbo: 'Agbanwere m gaa Igbo. Kedu ka m ga-esi nyere gị aka?'",
+        llm_config=None,
+        voice_config=None,
+    ),
+    'help_limitations': NodeConfig(
+        transitions=(('Limitations explained, user continues in English context', 'english_assistant'), ('Limitations explained, user continues in Yoruba context', 'yoruba_assistant'), ('Limitations explained, user continues in Hausa context', 'hausa_assistant'), ('Limitations explained, user continues in Igbo context', 'igbo_assistant'),),
+        extraction_plan=None,
+        node_prompt="Handle limitations based on current language ({{current_language}}):\n\nEnglish: 'I understand what you're looking for, but that's outside my current capabilities. However, I can help you with general questions, translations between Yoruba, Hausa, Igbo and English, cultural information, or other assistance.'\n\nYoruba: 'Mo ye ohun ti o n wa, ṣugbọn eyi ko si laarin awọn agbara mi lọwọ. Sibẹsibẹ, mo le ran ọ lowo pelu awọn ibeere gbogbogbo, atumọ laarin Yoruba, Hausa, Igbo ati English, alaye asa, tabi iranwo miiran.'\n\nHausa: 'Na gane abin da kuke nema, amma wannan bai shiga cikin iyawata ba a yanzu. Duk da haka, zan iya taimaka maku da tambayoyi na gabaɗaya, fassara tsakanin Yoruba, Hausa, Igbo da Turanci, bayanan al'adu, ko wasu taimako.'\n\nIgbo: 'Aghọtara m ihe ịna-achọ, mana nke ahụ abụghị ihe m nwere ike ime ugbu a. Otú ọ dị, enwere m ike inyere gị aka na ajụjụ izugbe, ntụgharị n'etiti Yoruba, Hausa, Igbo na Bekee, ozi omenala, ma ọ bụ enyemaka ndị ọzọ.'",
+        llm_config=None,
+        voice_config=None,
+    ),
+    'farewell_hub': NodeConfig(
+        transitions=(),
+        extraction_plan=None,
+        node_prompt="Provide warm farewell based on current language ({{current_language}}):\n\nEnglish: 'Thank you for using our multilingual assistant! I hope I was able to help you today. Have a wonderful day!'\n\nYoruba: 'E ṣe fun lilo iranwo wa ti o ni ede pupọ! Mo nireti pe mo le ran yin lowo loni. E ni ọjọ ti o dara!'\n\nHausa: 'Na gode da yin amfani da mataimakin mu mai harsuna da yawa! Ina fatan na iya taimaka maku a yau. Ku yi kyakkyawan rana!'\n\nIgbo: 'Daalụ maka iji onyeinyeaka anyị nwere asụsụ dị iche iche! Echere m na m nwere ike inyere gị aka taa. Nwee ọmarịcha ụbọchị!'",
+        llm_config=None,
+        voice_config=None,
+    ),
+}
+
+async def handle_node(node_id: str, state: WorkflowState, user_message: str, llm_client, variable_extractor: VariableExtractor, transition_evaluator: TransitionEvaluator, provider_config: ProviderConfigManager) -> Optional[Tuple[Union[str, AsyncIterator[str]], Any]]:
+    """Handle a conversation node, driven by its entry in _NODE_CONFIG"""
+    logger.info("Handling %s node", node_id)
+    cfg = _NODE_CONFIG[node_id]
+    state.current_node = node_id
     state.add_to_history("user", user_message)
-    
-    transitions = [('Limitations explained, user continues in English context', "english_assistant"), ('Limitations explained, user continues in Yoruba context', "yoruba_assistant"), ('Limitations explained, user continues in Hausa context', "hausa_assistant"), ('Limitations explained, user continues in Igbo context', "igbo_assistant")]
-    for edge_condition, target_node in transitions:
-        if await transition_evaluator.should_transition(edge_condition, user_message, state.conversation_history):
-            state.current_node = target_node
-            logger.info(f"Transitioning from help_limitations to {target_node}")
-            # Return a message indicating transition, as the new node will be handled in the next turn
-            return (f"Transitioning to {target_node}", provider_config.get_tts_client())
-
-    if False:
-        extracted_vars = await variable_extractor.extract_variables(user_message, None)
-        for var_name, var_value in extracted_vars.items():
-            state.set_variable(var_name, var_value)
-
-    node_llm_config = None
-    node_llm_client = provider_config.get_llm_client(node_llm_config)
-
-    node_voice_config = None
-    tts_client = provider_config.get_tts_client(node_voice_config)
-
-    global_prompt = 'You are a helpful AI assistant with dedicated language-specific nodes. Each language node has pre-configured voice settings and cultural context. You can provide assistance, translations, and information while maintaining authentic communication in Yoruba, Hausa, Igbo, and English.'
-    node_prompt = "Handle limitations based on current language ({{current_language}}):\n\nEnglish: 'I understand what you're looking for, but that's outside my current capabilities. However, I can help you with general questions, translations between Yoruba, Hausa, Igbo and English, cultural information, or other assistance.'\n\nYoruba: 'Mo ye ohun ti o n wa, \u1e63ugb\u1ecdn eyi ko si laarin aw\u1ecdn agbara mi l\u1ecdw\u1ecd. Sib\u1eb9sib\u1eb9, mo le ran \u1ecd lowo pelu aw\u1ecdn ibeere gbogbogbo, atum\u1ecd laarin Yoruba, Hausa, Igbo ati English, alaye asa, tabi iranwo miiran.'\n\nHausa: 'Na gane abin da kuke nema, amma wannan bai shiga cikin iyawata ba a yanzu. Duk da haka, zan iya taimaka maku da tambayoyi na gaba\u0257aya, fassara tsakanin Yoruba, Hausa, Igbo da Turanci, bayanan al'adu, ko wasu taimako.'\n\nIgbo: 'Agh\u1ecdtara m ihe \u1ecbna-ach\u1ecd, mana nke ah\u1ee5 ab\u1ee5gh\u1ecb ihe m nwere ike ime ugbu a. Ot\u00fa \u1ecd d\u1ecb, enwere m ike inyere g\u1ecb aka na aj\u1ee5j\u1ee5 izugbe, nt\u1ee5ghar\u1ecb n'etiti Yoruba, Hausa, Igbo na Bekee, ozi omenala, ma \u1ecd b\u1ee5 enyemaka nd\u1ecb \u1ecdz\u1ecd.'"
-    instruction = "\n\nIMPORTANT: Your reply must be very short and conversational."
-    combined_prompt = f"{global_prompt}\n\n--- Node Instructions ---\n{node_prompt} {instruction}"
-    formatted_prompt = state.format_prompt_template(combined_prompt)
-    
-    context_messages = [ChatMessage(role=msg["role"], content=msg["content"]) for msg in state.conversation_history[-10:]]
-    context_messages.insert(0, ChatMessage(role="system", content=formatted_prompt))
-    
-    try:
-        response = await node_llm_client.achat(messages=context_messages)
-        ai_response = response.message.content
-        state.add_to_history("assistant", ai_response)
-        logger.info(f"Generated response for help_limitations: {ai_response[:100]}...")
-        return (ai_response, tts_client)
-    except Exception as e:
-        logger.error(f"Error in help_limitations: {e}")
-        return ("I'm having trouble processing that right now.", tts_client)
 
-async def handle_farewell_hub(state: WorkflowState, user_message: str, llm_client, variable_extractor: VariableExtractor, transition_evaluator: TransitionEvaluator, provider_config: ProviderConfigManager) -> Optional[Tuple[str, Any]]:
-    """Handle farewell_hub conversation node"""
-    logger.info(f"Handling farewell_hub node")
-    state.current_node = "farewell_hub"
-    state.add_to_history("user", user_message)
-    
-    transitions = []
-    for edge_condition, target_node in transitions:
-        if await transition_evaluator.should_transition(edge_condition, user_message, state.conversation_history):
-            state.current_node = target_node
-            logger.info(f"Transitioning from farewell_hub to {target_node}")
-            # Return a message indicating transition, as the new node will be handled in the next turn
-            return (f"Transitioning to {target_node}", provider_config.get_tts_client())
-
-    if False:
-        extracted_vars = await variable_extractor.extract_variables(user_message, None)
-        for var_name, var_value in extracted_vars.items():
-            state.set_variable(var_name, var_value)
-
-    node_llm_config = None
-    node_llm_client = provider_config.get_llm_client(node_llm_config)
-
-    node_voice_config = None
-    tts_client = provider_config.get_tts_client(node_voice_config)
-
-    global_prompt = 'You are a helpful AI assistant with dedicated language-specific nodes. Each language node has pre-configured voice settings and cultural context. You can provide assistance, translations, and information while maintaining authentic communication in Yoruba, Hausa, Igbo, and English.'
-    node_prompt = "Provide warm farewell based on current language ({{current_language}}):\n\nEnglish: 'Thank you for using our multilingual assistant! I hope I was able to help you today. Have a wonderful day!'\n\nYoruba: 'E \u1e63e fun lilo iranwo wa ti o ni ede pup\u1ecd! Mo nireti pe mo le ran yin lowo loni. E ni \u1ecdj\u1ecd ti o dara!'\n\nHausa: 'Na gode da yin amfani da mataimakin mu mai harsuna da yawa! Ina fatan na iya taimaka maku a yau. Ku yi kyakkyawan rana!'\n\nIgbo: 'Daal\u1ee5 maka iji onyeinyeaka any\u1ecb nwere as\u1ee5s\u1ee5 d\u1ecb iche iche! Echere m na m nwere ike inyere g\u1ecb aka taa. Nwee \u1ecdmar\u1ecbcha \u1ee5b\u1ecdch\u1ecb!'"
-    instruction = "\n\nIMPORTANT: Your reply must be very short and conversational."
-    combined_prompt = f"{global_prompt}\n\n--- Node Instructions ---\n{node_prompt} {instruction}"
-    formatted_prompt = state.format_prompt_template(combined_prompt)
-    
-    context_messages = [ChatMessage(role=msg["role"], content=msg["content"]) for msg in state.conversation_history[-10:]]
-    context_messages.insert(0, ChatMessage(role="system", content=formatted_prompt))
-    
-    try:
-        response = await node_llm_client.achat(messages=context_messages)
-        ai_response = response.message.content
+    # Extraction only matters if we stay on this node, but it is independent of
+    # the transition check, so run both LLM calls concurrently
+    extract_task = None
+    reuse_extraction = state.last_extraction is not None and state.last_extraction[:2] == (node_id, user_message)
+    if cfg.dynamic_plan and not reuse_extraction:
+        extract_task = asyncio.create_task(variable_extractor.extract_variables(user_message, cfg.dynamic_plan))
+    match = await transition_evaluator.classify_transition(cfg.conditions, user_message, state.conversation_history)
+    if match is not None:
+        if extract_task is not None:
+            extract_task.cancel()
+        target_node = cfg.transitions[match][1]
+        state.current_node = target_node
+        logger.info("Transitioning from %s to %s", node_id, target_node)
+        # Return a message indicating transition, as the new node will be handled in the next turn
+        return (f"Transitioning to {target_node}", provider_config.get_tts_client())
+
+    for var_name, var_value in cfg.static_variables:
+        state.set_variable(var_name, var_value)
+    if extract_task is not None:
+        extracted_vars = await extract_task
+        state.last_extraction = (node_id, user_message, extracted_vars)
+    elif reuse_extraction:
+        # Same message on the same node as last turn; its extraction still holds
+        extracted_vars = state.last_extraction[2]
+    else:
+        extracted_vars = {}
+    for var_name, var_value in extracted_vars.items():
+        state.set_variable(var_name, var_value)
+
+    node_llm_client = provider_config.get_llm_client(cfg.llm_config)
+    tts_client = provider_config.get_tts_client(cfg.voice_config)
+
+    formatted_prompt = state.format_prompt_template(cfg.combined_prompt)
+    context_messages = state.node_chat_messages(formatted_prompt)
+    reply_stream = state.llm_cache.astream(node_llm_client, state.current_node, formatted_prompt, state.conversation_history, context_messages)
+
+    async def stream_reply() -> AsyncIterator[str]:
+        # session.say() speaks each sentence as it arrives; history is written once the reply is complete
+        parts = []
+        try:
+            async for sentence in reply_stream:
+                parts.append(sentence)
+                yield sentence
+        except Exception as e:
+            logger.error("Error in %s: %s", node_id, e)
+            if not parts:
+                yield "I'm having trouble processing that right now."
+            return
+        ai_response = "".join(parts).strip()
         state.add_to_history("assistant", ai_response)
-        logger.info(f"Generated response for farewell_hub: {ai_response[:100]}...")
-        return (ai_response, tts_client)
-    except Exception as e:
-        logger.error(f"Error in farewell_hub: {e}")
-        return ("I'm having trouble processing that right now.", tts_client)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Generated response for %s: %s...", node_id, ai_response[:100])
+
+    return (stream_reply(), tts_client)
+
+# Per-node entry points, kept so the handle_<node> lookup in entrypoint still resolves
+handle_welcome_hub = functools.partial(handle_node, 'welcome_hub')
+handle_english_assistant = functools.partial(handle_node, 'english_assistant')
+handle_yoruba_assistant = functools.partial(handle_node, 'yoruba_assistant')
+handle_hausa_assistant = functools.partial(handle_node, 'hausa_assistant')
+handle_igbo_assistant = functools.partial(handle_node, 'igbo_assistant')
+handle_translation_hub = functools.partial(handle_node, 'translation_hub')
+handle_cultural_information_hub = functools.partial(handle_node, 'cultural_information_hub')
+handle_language_switch_hub = functools.partial(handle_node, 'language_switch_hub')
+handle_help_limitations = functools.partial(handle_node, 'help_limitations')
+handle_farewell_hub = functools.partial(handle_node, 'farewell_hub')
 
 class PreConfiguredMultilingualAssistantTemplateAgent(Agent):
     def __init__(self, **kwargs):
@@ -658,7 +597,7 @@ class PreConfiguredMultilingualAssistantTemplateAgent(Agent):
 
     async def start(self, session: AgentSession):
         self.state.session_id = session.id
-        logger.info(f"Starting PreConfiguredMultilingualAssistantTemplateAgent with session {self.state.session_id}")
+        logger.info("Starting PreConfiguredMultilingualAssistantTemplateAgent with session %s", self.state.session_id)
         initial_message = await self.get_initial_message()
         if initial_message:
             await session.say(initial_message)
@@ -671,55 +610,55 @@ class PreConfiguredMultilingualAssistantTemplateAgent(Agent):
         if not self.room:
             logger.error("No room available for session recreation")
             return None
-            
+
         # Get node-specific configurations
         node_obj = next((n for n in workflow_nodes if n['name'] == node_name), None)
         if not node_obj:
-            logger.error(f"Node {node_name} not found in workflow_nodes")
+            logger.error("Node %s not found in workflow_nodes", node_name)
             return None
-            
+
         # Get node-specific configs (these can be customized per node)
         node_llm_config = node_obj.get('llm_config', {})
         node_voice_config = node_obj.get('voice_config', {})
         node_transcriber_config = node_obj.get('transcriber_config', {})
-        
+
         # Create clients with node-specific configs
         stt_client = self.provider_config.get_stt_client(node_transcriber_config)
         tts_client = self.provider_config.get_tts_client(node_voice_config)
         node_llm_client = self.provider_config.get_llm_client(node_llm_config)
         vad_client = silero.VAD.load()
-        
+
         # Create new session with node-specific clients
         new_session = AgentSession(
             stt=stt_client,
             llm=node_llm_client,  # Use node-specific LLM
             tts=tts_client,       # Use node-specific TTS
             vad=vad_client,
-            # agent=self,
         )
-        
+
         # Set up event handlers for the new session
         @new_session.on("user_speech_committed")
         async def on_user_speech(ev):
             user_message = ev.user_transcript
-            logger.info(f"User said: {user_message}")
+            logger.info("User said: %s", user_message)
             response_text, _ = await self.process_workflow_message(user_message, node_llm_client)
             if response_text:
                 await new_session.say(response_text)
-                logger.info(f"Agent responded: {response_text[:100]}...")
-        
+                if isinstance(response_text, str) and logger.isEnabledFor(logging.INFO):
+                    logger.info("Agent responded: %s...", response_text[:100])
+
         # Close old session if it exists
         if self.current_session:
             try:
                 await self.current_session.close()
             except Exception as e:
-                logger.warning(f"Error closing old session: {e}")
-        
+                logger.warning("Error closing old session: %s", e)
+
         # Start new session
         await new_session.start(self.room)
         self.current_session = new_session
-        
-        logger.info(f"Recreated session for node {node_name} with custom TTS/STT/LLM")
+
+        logger.info("Recreated session for node %s with custom TTS/STT/LLM", node_name)
         return new_session
 
     async def initialize_components(self, llm_client, global_llm_config=None, global_voice_config=None, global_transcriber_config=None, global_variables=None):
@@ -734,15 +673,15 @@ class PreConfiguredMultilingualAssistantTemplateAgent(Agent):
             self.state.global_variables.update(global_variables)
         logger.info("Agent components initialized")
 
-    async def process_workflow_message(self, user_message: str, llm_client) -> Tuple[Optional[str], Any]:
+    async def process_workflow_message(self, user_message: str, llm_client) -> Tuple[Optional[Union[str, AsyncIterator[str]]], Any]:
         if not self.state.current_node:
-            self.state.current_node = "welcome_hub"
-        
+            self.state.current_node = 'welcome_hub'
+
         current_node_name = self.state.current_node
         handler = self.handler_map.get(current_node_name)
-        
+
         if not handler:
-            logger.error(f"No handler for node: {current_node_name}")
+            logger.error("No handler for node: %s", current_node_name)
             return ("I have a technical issue.", None)
 
         node_obj = next((n for n in workflow_nodes if n['name'] == current_node_name), None)
@@ -754,143 +693,43 @@ class PreConfiguredMultilingualAssistantTemplateAgent(Agent):
                 response, tts_client = await handler(
                     self.state, user_message, llm_client, self.variable_extractor, self.transition_evaluator, self.provider_config
                 )
-                
+
                 # Check if a transition occurred and recreate session if needed
                 if self.state.current_node != current_node_name:
-                    logger.info(f"Node transition detected: {current_node_name} -> {self.state.current_node}")
+                    logger.info("Node transition detected: %s -> %s", current_node_name, self.state.current_node)
                     # Recreate session with new node's TTS/STT/LLM configuration
                     await self.recreate_session_with_node_config(self.state.current_node, llm_client)
-                
+
                 return response, tts_client
             elif node_obj['type'] == 'tool':
                 tool_response = await handler(self.state)
                 return tool_response, self.provider_config.get_tts_client() # Use default TTS for tool responses
         except Exception as e:
-            logger.error(f"Error processing message: {e}", exc_info=True)
+            logger.error("Error processing message: %s", e, exc_info=True)
             return ("I encountered an error.", None)
         return ("No response generated.", None)
 
     async def get_initial_message(self) -> str:
         start_node_data = next((n for n in workflow_nodes if n.get('is_start')), None)
-        if start_node_data and start_node_data.get('message_plan', {}).get('firstMessage'):
+        if start_node_data and (start_node_data.get('message_plan') or {}).get('firstMessage'):
             msg = start_node_data['message_plan']['firstMessage']
             self.state.add_to_history("assistant", msg)
             return msg
         return "Hello! How can I help you today?"
 
-workflow_nodes = [
-    {
-        'name': 'welcome_hub', 
-        'type': 'conversation', 
-        'prompt': 'Welcome users in all languages and let them choose their preferred language:\n\n\'Hello! Sannu! Ndewo! E ku aaro! \n\nWelcome to your multilingual assistant! Choose your language:\n- English (Press 1 or say "English")\n- Yoruba (Press 2 or say "Yoruba/Ede Yoruba")\n- Hausa (Press 3 or say "Hausa")\n- Igbo (Press 4 or say "Igbo/Asụsụ Igbo")\n\nOr just start speaking in your preferred language and I\'ll detect it!\'', 
-        'message_plan': {'firstMessage': "Hello! Sannu! Ndewo! E ku aaro! Choose your language or start speaking, and I'll assist you!"}, 
-        'is_start': True, 
-        'voice_config': {'provider': 'deepgram', 'model': 'aura-2-luna-en'}, 
-        'llm_config': {'provider': 'openai', 'model': 'gpt-4o'},
-        'transcriber_config': {'provider': 'deepgram', 'model': 'nova-2'}
-    },
-    {
-        'name': 'english_assistant', 
-        'type': 'conversation', 
-        'prompt': 'You are now in English mode. Provide helpful assistance in clear, professional English. Handle general questions, provide information, help with tasks, offer translations to other languages, and engage in natural conversation. Use American English conventions and be friendly yet professional.', 
-        'message_plan': None, 
-        'is_start': False, 
-        'voice_config': {'provider': 'deepgram', 'model': 'aura-2-luna-en'}, 
-        'llm_config': {'provider': 'openai', 'model': 'gpt-4o'},
-        'transcriber_config': {'provider': 'deepgram', 'model': 'nova-2'}
-    },
-    {
-        'name': 'yoruba_assistant', 
-        'type': 'conversation', 
-        'prompt': "O ti wa ni ipo Yoruba bayi. Pese iranwo ni ede Yoruba ti o ye kooro. Lo awon oro ti o t\u1ecd bi '\u1eb9 j\u1ecdw\u1ecd' (please), '\u1eb9 \u1e63e' (thank you), 'bawo ni' (how are you). Ran awon eniyan lowo pelu awon ibeere, fun ni alaye, \u1e63e atum\u1ecd si awon ede miiran, ati \u1e62IS oro tabi gbogbo iru i\u1e63e ti won ba beere. J\u1eb9 ki ibaraenisepo r\u1eb9 j\u1eb9 atun\u1e63e ati ki o ni it\u1ecdju.", 
-        'message_plan': None, 
-        'is_start': False, 
-        'voice_config': {'provider': 'deepgram', 'model': 'aura-2-stella-en'},  # Different voice for Yoruba
-        'llm_config': {'provider': 'openai', 'model': 'gpt-4o'},
-        'transcriber_config': {'provider': 'deepgram', 'model': 'nova-2'}
-    },
-    {
-        'name': 'hausa_assistant', 
-        'type': 'conversation', 
-        'prompt': "Yanzu kuna cikin yanayin Hausa. Bayar da taimako a cikin Hausa mai kyau. Yi amfani da kalmomi masu dacewa kamar 'don Allah' (please), 'na gode' (thank you), 'sannu da zuwa' (welcome). Taimaka wa mutane da tambayoyi, bayar da bayanai, yi fassara zuwa wasu harsuna, da yin hira akan duk wani batu da suke so. Kasance mai son zuciya kuma mai kulawa.", 
-        'message_plan': None, 
-        'is_start': False, 
-        'voice_config': {'provider': 'deepgram', 'model': 'aura-2-orion-en'},  # Different voice for Hausa
-        'llm_config': {'provider': 'openai', 'model': 'gpt-4o'},
-        'transcriber_config': {'provider': 'deepgram', 'model': 'nova-2'}
-    },
-    {
-        'name': 'igbo_assistant', 
-        'type': 'conversation', 
-        'prompt': "Ị n\u1ecd ugbu a n'\u1ecdn\u1ecd\u1ee5 Igbo. Nye enyemaka n'as\u1ee5s\u1ee5 Igbo d\u1ecb mma. Jiri okwu kwes\u1ecbr\u1ecb ekwes\u1ecb d\u1ecb ka 'biko' (please), 'daal\u1ee5' (thank you), 'ndewo' (hello). Nyere nd\u1ecb mmad\u1ee5 aka na aj\u1ee5j\u1ee5 ha, nye ozi, t\u1ee5ghar\u1ecba as\u1ee5s\u1ee5 n'as\u1ee5s\u1ee5 nd\u1ecb \u1ecdz\u1ecd, ma kwur\u1ecbta okwu gbasara ihe \u1ecd b\u1ee5la ha ch\u1ecdr\u1ecd. B\u1ee5r\u1ee5 onye obi\u1ecma ma na-elek\u1ecdta.", 
-        'message_plan': None, 
-        'is_start': False, 
-        'voice_config': {'provider': 'deepgram', 'model': 'aura-2-arcas-en'},  # Different voice for Igbo
-        'llm_config': {'provider': 'openai', 'model': 'gpt-4o'},
-        'transcriber_config': {'provider': 'deepgram', 'model': 'nova-2'}
-    },
-    {
-        'name': 'translation_hub', 
-        'type': 'conversation', 
-        'prompt': "Translation Hub - Handle translation requests between any of the supported languages. Provide accurate translations with cultural context. Current language context: {{current_language}}. \n\nFor translations:\n- Explain cultural nuances when needed\n- Provide alternative expressions if direct translation isn't ideal\n- Offer pronunciation help\n- Give context about when to use certain phrases\n\nRespond in the user's current language setting.", 
-        'message_plan': None, 
-        'is_start': False, 
-        'voice_config': {'provider': 'deepgram', 'model': 'aura-2-luna-en'}, 
-        'llm_config': {'provider': 'openai', 'model': 'gpt-4o'},
-        'transcriber_config': {'provider': 'deepgram', 'model': 'nova-2'}
-    },
-    {
-        'name': 'cultural_information_hub', 
-        'type': 'conversation', 
-        'prompt': "Cultural Information Hub - Provide culturally relevant information based on current language context: {{current_language}} with cultural context: {{cultural_context}}.\n\nShare authentic information about:\n- Festivals and celebrations\n- Traditional foods and recipes\n- Music and dance\n- History and customs\n- Proverbs and sayings\n- Regional variations\n\nRespond in the user's current language with appropriate cultural sensitivity.", 
-        'message_plan': None, 
-        'is_start': False, 
-        'voice_config': {'provider': 'deepgram', 'model': 'aura-2-luna-en'}, 
-        'llm_config': {'provider': 'openai', 'model': 'gpt-4o'},
-        'transcriber_config': {'provider': 'deepgram', 'model': 'nova-2'}
-    },
-    {
-        'name': 'language_switch_hub', 
-        'type': 'conversation', 
-        'prompt': "Language Switch Hub - Handle requests to change language. Current language: {{current_language}}.\n\nConfirm the switch and route to appropriate language node:\n- English: 'Switching to English. How can I help you?'\n- Yoruba: 'Mo ti yi pada si ede Yoruba. Bawo ni mo se le ran yin lowo?'\n- Hausa: 'Na canja zuwa Hausa. Yaya zan iya taimaka maku?'\n- Igbo: 'Agbanwere m gaa Igbo. Kedu ka m ga-esi nyere g\u1ecb aka?'", 
-        'message_plan': None, 
-        'is_start': False, 
-        'voice_config': {'provider': 'deepgram', 'model': 'aura-2-luna-en'}, 
-        'llm_config': {'provider': 'openai', 'model': 'gpt-4o'},
-        'transcriber_config': {'provider': 'deepgram', 'model': 'nova-2'}
-    },
-    {
-        'name': 'help_limitations', 
-        'type': 'conversation', 
-        'prompt': "Handle limitations based on current language ({{current_language}}):\n\nEnglish: 'I understand what you're looking for, but that's outside my current capabilities. However, I can help you with general questions, translations between Yoruba, Hausa, Igbo and English, cultural information, or other assistance.'\n\nYoruba: 'Mo ye ohun ti o n wa, \u1e63ugb\u1ecdn eyi ko si laarin aw\u1ecdn agbara mi l\u1ecdw\u1ecd. Sib\u1eb9sib\u1eb9, mo le ran \u1ecd lowo pelu aw\u1ecdn ibeere gbogbogbo, atum\u1ecd laarin Yoruba, Hausa, Igbo ati English, alaye asa, tabi iranwo miiran.'\n\nHausa: 'Na gane abin da kuke nema, amma wannan bai shiga cikin iyawata ba a yanzu. Duk da haka, zan iya taimaka maku da tambayoyi na gaba\u0257aya, fassara tsakanin Yoruba, Hausa, Igbo da Turanci, bayanan al'adu, ko wasu taimako.'\n\nIgbo: 'Agh\u1ecdtara m ihe \u1ecbna-ach\u1ecd, mana nke ah\u1ee5 ab\u1ee5gh\u1ecb ihe m nwere ike ime ugbu a. Ot\u00fa \u1ecd d\u1ecb, enwere m ike inyere g\u1ecb aka na aj\u1ee5j\u1ee5 izugbe, nt\u1ee5ghar\u1ecb n'etiti Yoruba, Hausa, Igbo na Bekee, ozi omenala, ma \u1ecd b\u1ee5 enyemaka nd\u1ecb \u1ecdz\u1ecd.'", 
-        'message_plan': None, 
-        'is_start': False, 
-        'voice_config': {'provider': 'deepgram', 'model': 'aura-2-luna-en'}, 
-        'llm_config': {'provider': 'openai', 'model': 'gpt-4o'},
-        'transcriber_config': {'provider': 'deepgram', 'model': 'nova-2'}
-    },
-    {
-        'name': 'farewell_hub', 
-        'type': 'conversation', 
-        'prompt': "Provide warm farewell based on current language ({{current_language}}):\n\nEnglish: 'Thank you for using our multilingual assistant! I hope I was able to help you today. Have a wonderful day!'\n\nYoruba: 'E \u1e63e fun lilo iranwo wa ti o ni ede pup\u1ecd! Mo nireti pe mo le ran yin lowo loni. E ni \u1ecdj\u1ecd ti o dara!'\n\nHausa: 'Na gode da yin amfani da mataimakin mu mai harsuna da yawa! Ina fatan na iya taimaka maku a yau. Ku yi kyakkyawan rana!'\n\nIgbo: 'Daal\u1ee5 maka iji onyeinyeaka any\u1ecb nwere as\u1ee5s\u1ee5 d\u1ecb iche iche! Echere m na m nwere ike inyere g\u1ecb aka taa. Nwee \u1ecdmar\u1ecbcha \u1ee5b\u1ecdch\u1ecb!'", 
-        'message_plan': None, 
-        'is_start': False, 
-        'voice_config': {'provider': 'deepgram', 'model': 'aura-2-luna-en'}, 
-        'llm_config': {'provider': 'openai', 'model': 'gpt-4o'},
-        'transcriber_config': {'provider': 'deepgram', 'model': 'nova-2'}
-    }
-]
+workflow_nodes = [{'name': 'welcome_hub', 'type': 'conversation', 'prompt': 'Welcome users in all languages and let them choose their preferred language:\n\n\'Hello! Sannu! Ndewo! E ku aaro! \n\nWelcome to your multilingual assistant! Choose your language:\n- English (Press 1 or say "English")\n- Yoruba (Press 2 or say "Yoruba/Ede Yoruba")\n- Hausa (Press 3 or say "Hausa")\n- Igbo (Press 4 or say "Igbo/Asụsụ Igbo")\n\nOr just start speaking in your preferred language and I\'ll detect it!\'', 'message_plan': {'firstMessage': "Hello! Sannu! Ndewo! E ku aaro! Choose your language or start speaking, and I'll assist you!"}, 'is_start': True, 'voice_config': {'provider': 'deepgram', 'model': 'aura-2-luna-en'}, 'llm_config': {'provider': 'openai', 'model': 'gpt-4o'}, 'transcriber_config': {'provider': 'deepgram', 'model': 'nova-2'}}, {'name': 'english_assistant', 'type': 'conversation', 'prompt': 'You are now in English mode. Provide helpful assistance in clear, professional English. Handle general questions, provide information, help with tasks, offer translations to other languages, and engage in natural conversation. Use American English conventions and be friendly yet professional.', 'message_plan': None, 'is_start': False, 'voice_config': {'provider': 'deepgram', 'model': 'aura-2-luna-en'}, 'llm_config': {'provider': 'openai', 'model': 'gpt-4o'}, 'transcriber_config': {'provider': 'deepgram', 'model': 'nova-2'}}, {'name': 'yoruba_assistant', 'type': 'conversation', 'prompt': "O ti wa ni ipo Yoruba bayi. Pese iranwo ni ede Yoruba ti o ye kooro. Lo awon oro ti o tọ bi 'ẹ jọwọ' (please), 'ẹ ṣe' (thank you), 'bawo ni' (how are you). Ran awon eniyan lowo pelu awon ibeere, fun ni alaye, ṣe atumọ si awon ede miiran, ati ṢIS oro tabi gbogbo iru iṣe ti won ba beere. Jẹ ki ibaraenisepo rẹ jẹ atunṣe ati ki o ni itọju.", 'message_plan': None, 'is_start': False, 'voice_config': {'provider': 'deepgram', 'model': 'aura-2-stella-en'}, 'llm_config': {'provider': 'openai', 'model': 'gpt-4o'}, 'transcriber_config': {'provider': 'deepgram', 'model': 'nova-2'}}, {'name': 'hausa_assistant', 'type': 'conversation', 'prompt': "Yanzu kuna cikin yanayin Hausa. Bayar da taimako a cikin Hausa mai kyau. Yi amfani da kalmomi masu dacewa kamar 'don Allah' (please), 'na gode' (thank you), 'sannu da zuwa' (welcome). Taimaka wa mutane da tambayoyi, bayar da bayanai, yi fassara zuwa wasu harsuna, da yin hira akan duk wani batu da suke so. Kasance mai son zuciya kuma mai kulawa.", 'message_plan': None, 'is_start': False, 'voice_config': {'provider': 'deepgram', 'model': 'aura-2-orion-en'}, 'llm_config': {'provider': 'openai', 'model': 'gpt-4o'}, 'transcriber_config': {'provider': 'deepgram', 'model': 'nova-2'}}, {'name': 'igbo_assistant', 'type': 'conversation', 'prompt': "Ị nọ ugbu a n'ọnọụ Igbo. Nye enyemaka n'asụsụ Igbo dị mma. Jiri okwu kwesịrị ekwesị dị ka 'biko' (please), 'daalụ' (thank you), 'ndewo' (hello). Nyere ndị mmadụ aka na ajụjụ ha, nye ozi, tụgharịa asụsụ n'asụsụ ndị ọzọ, ma kwurịta okwu gbasara ihe ọ bụla ha chọrọ. Bụrụ onye obiọma ma na-elekọta.", 'message_plan': None, 'is_start': False, 'voice_config': {'provider': 'deepgram', 'model': 'aura-2-arcas-en'}, 'llm_config': {'provider': 'openai', 'model': 'gpt-4o'}, 'transcriber_config': {'provider': 'deepgram', 'model': 'nova-2'}}, {'name': 'translation_hub', 'type': 'conversation', 'prompt': "Translation Hub - Handle translation requests between any of the supported languages. Provide accurate translations with cultural context. Current language context: {{current_language}}. \n\nFor translations:\n- Explain cultural nuances when needed\n- Provide alternative expressions if direct translation isn't ideal\n- Offer pronunciation help\n- Give context about when to use certain phrases\n\nRespond in the user's current language setting.", 'message_plan': None, 'is_start': False, 'voice_config': {'provider': 'deepgram', 'model': 'aura-2-luna-en'}, 'llm_config': {'provider': 'openai', 'model': 'gpt-4o'}, 'transcriber_config': {'provider': 'deepgram', 'model': 'nova-2'}}, {'name': 'cultural_information_hub', 'type': 'conversation', 'prompt': "Cultural Information Hub - Provide culturally relevant information based on current language context: {{current_language}} with cultural context: {{cultural_context}}.\n\nShare authentic information about:\n- Festivals and celebrations\n- Traditional foods and recipes\n- Music and dance\n- History and customs\n- Proverbs and sayings\n- Regional variations\n\nRespond in the user's current language with appropriate cultural sensitivity.", 'message_plan': None, 'is_start': False, 'voice_config': {'provider': 'deepgram', 'model': 'aura-2-luna-en'}, 'llm_config': {'provider': 'openai', 'model': 'gpt-4o'}, 'transcriber_config': {'provider': 'deepgram', 'model': 'nova-2'}}, {'name': 'language_switch_hub', 'type': 'conversation', 'prompt': "Language Switch Hub - Handle requests to change language. Current language: {{current_language}}.\n\nConfirm the switch and route to appropriate language node:\n- English: 'Switching to English. How can I help you?'\n- Yoruba: 'Mo ti yi pada si ede Yoruba. Bawo ni mo se le ran yin lowo?'\n- Hausa: 'Na canja zuwa Hausa. Yaya zan iya taimaka maku?'\n- Igbo: 'Agbanwere m gaa Igbo. Kedu ka m ga-esi nyere gị aka?'", 'message_plan': None, 'is_start': False, 'voice_config': {'provider': 'deepgram', 'model': 'aura-2-luna-en'}, 'llm_config': {'provider': 'openai', 'model': 'gpt-4o'}, 'transcriber_config': {'provider': 'deepgram', 'model': 'nova-2'}}, {'name': 'help_limitations', 'type': 'conversation', 'prompt': "Handle limitations based on current language ({{current_language}}):\n\nEnglish: 'I understand what you're looking for, but that's outside my current capabilities. However, I can help you with general questions, translations between Yoruba, Hausa, Igbo and English, cultural information, or other assistance.'\n\nYoruba: 'Mo ye ohun ti o n wa, ṣugbọn eyi ko si laarin awọn agbara mi lọwọ. Sibẹsibẹ, mo le ran ọ lowo pelu awọn ibeere gbogbogbo, atumọ laarin Yoruba, Hausa, Igbo ati English, alaye asa, tabi iranwo miiran.'\n\nHausa: 'Na gane abin da kuke nema, amma wannan bai shiga cikin iyawata ba a yanzu. Duk da haka, zan iya taimaka maku da tambayoyi na gabaɗaya, fassara tsakanin Yoruba, Hausa, Igbo da Turanci, bayanan al'adu, ko wasu taimako.'\n\nIgbo: 'Aghọtara m ihe ịna-achọ, mana nke ahụ abụghị ihe m nwere ike ime ugbu a. Otú ọ dị, enwere m ike inyere gị aka na ajụjụ izugbe, ntụgharị n'etiti Yoruba, Hausa, Igbo na Bekee, ozi omenala, ma ọ bụ enyemaka ndị ọzọ.'", 'message_plan': None, 'is_start': False, 'voice_config': {'provider': 'deepgram', 'model': 'aura-2-luna-en'}, 'llm_config': {'provider': 'openai', 'model': 'gpt-4o'}, 'transcriber_config': {'provider': 'deepgram', 'model': 'nova-2'}}, {'name': 'farewell_hub', 'type': 'conversation', 'prompt': "Provide warm farewell based on current language ({{current_language}}):\n\nEnglish: 'Thank you for using our multilingual assistant! I hope I was able to help you today. Have a wonderful day!'\n\nYoruba: 'E ṣe fun lilo iranwo wa ti o ni ede pupọ! Mo nireti pe mo le ran yin lowo loni. E ni ọjọ ti o dara!'\n\nHausa: 'Na gode da yin amfani da mataimakin mu mai harsuna da yawa! Ina fatan na iya taimaka maku a yau. Ku yi kyakkyawan rana!'\n\nIgbo: 'Daalụ maka iji onyeinyeaka anyị nwere asụsụ dị iche iche! Echere m na m nwere ike inyere gị aka taa. Nwee ọmarịcha ụbọchị!'", 'message_plan': None, 'is_start': False, 'voice_config': {'provider': 'deepgram', 'model': 'aura-2-luna-en'}, 'llm_config': {'provider': 'openai', 'model': 'gpt-4o'}, 'transcriber_config': {'provider': 'deepgram', 'model': 'nova-2'}}]
 
 async def entrypoint(ctx: JobContext):
-    logger.info(f"Starting Pre-configured Multilingual Assistant Template agent")
-    
+    logger.info("Starting %s agent", 'Pre-configured Multilingual Assistant Template')
+    _retain_http_session(ctx)
+
     # Initialize LLM with a default/fallback
     llm_client = openai.LLM(model="gpt-4o")
 
     # Initialize agent and its components
     agent = PreConfiguredMultilingualAssistantTemplateAgent()
     agent.room = ctx.room  # Store room reference for session recreation
-    
+
     global_llm_config = {}
     global_voice_config = {}
     global_transcriber_config = {}
@@ -903,7 +742,7 @@ async def entrypoint(ctx: JobContext):
         global_transcriber_config=global_transcriber_config,
         global_variables=global_variables
     )
-    
+
     # Dynamically create a map of node names to handler functions
     handler_map = {}
     for node in workflow_nodes:
@@ -928,14 +767,16 @@ async def entrypoint(ctx: JobContext):
     @session.on("user_speech_committed")
     async def on_user_speech(ev):
         user_message = ev.user_transcript
-        logger.info(f"User said: {user_message}")
+        logger.info("User said: %s", user_message)
         response_text, _ = await agent.process_workflow_message(user_message, llm_client)
         if response_text:
             await session.say(response_text)
-            logger.info(f"Agent responded: {response_text[:100]}...")
+            if isinstance(response_text, str) and logger.isEnabledFor(logging.INFO):
+                logger.info("Agent responded: %s...", response_text[:100])
 
     await session.start(ctx.room)
     agent.current_session = session  # Store reference to current session
 
 if __name__ == "__main__":
-    cli.run_app(WorkerOptions(entrypoint_fnc=entrypoint))
\ No newline at end of file
+    install_uvloop()
+    cli.run_app(WorkerOptions(entrypoint_fnc=entrypoint))
@@ -183,7 +183,8 @@ class PythonCodeGenerator:
     """Generates Python LiveKit agent code from workflow"""
 
     def __init__(self):
-        self.variable_registry = set()
+        # Insertion-ordered so the same workflow always compiles to the same code
+        self.variable_registry: Dict[str, None] = {}
         self.node_functions = []
         self.transition_functions = []
 
@@ -193,6 +194,7 @@ class PythonCodeGenerator:
         imports = self._generate_imports()
         state_class = self._generate_state_class()
         utilities = self._generate_utilities()
+        node_config = self._generate_node_config(workflow)
         node_handlers = self._generate_node_handlers(workflow)
         main_agent = self._generate_main_agent(workflow)
         entry_point = self._generate_entry_point(workflow)
@@ -206,6 +208,8 @@ class PythonCodeGenerator:
 
 {utilities}
 
+{node_config}
+
 {node_handlers}
 
 {main_agent}
@@ -219,22 +223,36 @@ class PythonCodeGenerator:
             if node.variable_extraction_plan:
                 outputs = node.variable_extraction_plan.get("output", [])
                 for output in outputs:
-                    self.variable_registry.add(output.get("title", ""))
+                    self.variable_registry[output.get("title", "")] = None
             if node.prompt:
                 template_vars = re.findall(r'\{\{(\w+)\}\}', node.prompt)
-                self.variable_registry.update(template_vars)
+                self.variable_registry.update(dict.fromkeys(template_vars))
 
     def _generate_imports(self) -> str:
         """Generate import statements"""
-        return textwrap.dedent("""
+        return textwrap.dedent(r'''
         import asyncio
+        import datetime
+        import functools
+        import hashlib
+        import inspect
+        import itertools
         import json
         import logging
         import re
-        from typing import Dict, Any, Optional, List, Union, Tuple
+        import time
+        from collections import OrderedDict, deque
+        from typing import AsyncIterator, Deque, Dict, Any, Iterable, Optional, List, Union, Tuple
         from dataclasses import dataclass, field
 
         import aiohttp
+        # orjson is noticeably faster for parsing extraction replies; fall back to stdlib json
+        try:
+            import orjson
+            _json_loads = orjson.loads
+        except ImportError:
+            _json_loads = json.loads
+
         from livekit import agents
         from livekit.agents import (
             Agent,
@@ -251,6 +269,9 @@ class PythonCodeGenerator:
         from dotenv import load_dotenv
         load_dotenv()
 
+        from app.utils.event_loop import install_uvloop
+        from app.utils.text import sentence_chunks
+
         # Import plugins with fallbacks for problematic dependencies
         try:
             from livekit.plugins import openai, deepgram, cartesia, silero, groq
@@ -262,20 +283,46 @@ class PythonCodeGenerator:
         # Configure logging
         logging.basicConfig(level=logging.INFO)
         logger = logging.getLogger(__name__)
-        """).strip()
+
+        # {{variable}} / {{dotted.variable}} placeholders in prompt templates
+        _TEMPLATE_VAR_RE = re.compile(r'\{\{(\w+(?:\.\w+)*)\}\}')
+        _split_template = functools.lru_cache(maxsize=64)(_TEMPLATE_VAR_RE.split)
+        # Built-in clock placeholders; global variables of the same name take precedence
+        _CLOCK_FORMATS = {"now": "%Y-%m-%d %H:%M:%S", "date": "%Y-%m-%d", "time": "%H:%M:%S"}
+        # First integer in a transition-classification reply
+        _FIRST_INT_RE = re.compile(r'\d+')
+        # How many recent history turns key a cached node response
+        _LLM_CACHE_HISTORY_TURNS = 4
+        # History kept per session; readers only ever look at the last few turns
+        _MAX_HISTORY_TURNS = 100
+        # History turns sent along with a node's system prompt
+        _NODE_CONTEXT_TURNS = 10
+
+        def _recent(history: Deque[Dict], n: int) -> Iterable[Dict]:
+            """Last n entries of a history deque (deques don't support slicing)"""
+            return itertools.islice(history, max(0, len(history) - n), None)
+        ''').strip()
 
     def _generate_state_class(self) -> str:
         """Generate state management class"""
-        variables = "\n            ".join([f"{var}: str = ''" for var in self.variable_registry if var])
-        return textwrap.dedent(f"""
+        variables = "\n    ".join([f"{var}: str = ''" for var in self.variable_registry if var])
+        return textwrap.dedent(r'''
         @dataclass
         class WorkflowState:
-            \"\"\"Manages workflow state and extracted variables\"\"\"
+            """Manages workflow state and extracted variables"""
             current_node: str = ""
             session_id: str = ""
-            {variables}
-            conversation_history: List[Dict[str, str]] = field(default_factory=list)
+            __VARIABLES__
+            conversation_history: Deque[Dict[str, Any]] = field(default_factory=lambda: deque(maxlen=_MAX_HISTORY_TURNS))
             global_variables: Dict[str, str] = field(default_factory=dict)
+            # (node, user message, extracted variables) of the last LLM extraction
+            last_extraction: Optional[Tuple[str, str, Dict[str, str]]] = None
+            # ChatMessage mirror of the recent history, kept in step by add_to_history
+            chat_messages: Deque[ChatMessage] = field(default_factory=lambda: deque(maxlen=_NODE_CONTEXT_TURNS))
+            system_message: Optional[ChatMessage] = None
+            system_prompt: str = ""
+            # Cached node replies are per session so one caller's replies are never served to another
+            llm_cache: "LLMCache" = field(default_factory=lambda: LLMCache())
 
             def get_variable(self, name: str) -> str:
                 return self.global_variables.get(name, getattr(self, name, ""))
@@ -283,41 +330,72 @@ class PythonCodeGenerator:
             def set_variable(self, name: str, value: str):
                 if hasattr(self, name):
                     setattr(self, name, value)
-                    logger.info(f"Set variable {{name}} = {{value}}")
+                    logger.info("Set variable %s = %s", name, value)
                 else:
                     self.global_variables[name] = value
-                    logger.info(f"Set global variable {{name}} = {{value}}")
+                    logger.info("Set global variable %s = %s", name, value)
 
             def add_to_history(self, role: str, content: str):
-                self.conversation_history.append({{
+                self.conversation_history.append({
                     "role": role,
                     "content": content,
-                    "timestamp": str(asyncio.get_event_loop().time())
-                }})
+                    "timestamp": time.monotonic()
+                })
+                self.chat_messages.append(ChatMessage(role=role, content=content))
+
+            def node_chat_messages(self, system_prompt: str) -> List[ChatMessage]:
+                """System prompt followed by the recent history; the system message is reused while the prompt is unchanged"""
+                if self.system_message is None or system_prompt != self.system_prompt:
+                    self.system_message = ChatMessage(role="system", content=system_prompt)
+                    self.system_prompt = system_prompt
+                return [self.system_message, *self.chat_messages]
 
             def format_prompt_template(self, template: str) -> str:
-                import datetime
-                result = template
-                now = datetime.datetime.now()
-                global_replacements = {{
-                    "now": now.strftime("%Y-%m-%d %H:%M:%S"),
-                    "date": now.strftime("%Y-%m-%d"),
-                    "time": now.strftime("%H:%M:%S"),
-                }}
-                global_replacements.update(self.global_variables)
-                for var_name in re.findall(r'\\{{\\{{(\\w+(?:\\.\\w+)*)\\}}\\}}', template):
-                    value = global_replacements.get(var_name, self.get_variable(var_name))
-                    result = result.replace(f"{{{{{{var_name}}}}}}", str(value))
-                return result
-        """).strip()
+                # Split once per distinct template: literals at even indexes, variable names at odd
+                parts = _split_template(template)
+                if len(parts) == 1:
+                    return template
+                now = None
+                rendered = list(parts)
+                for i in range(1, len(parts), 2):
+                    var_name = parts[i]
+                    if var_name in self.global_variables:
+                        value = self.global_variables[var_name]
+                    elif var_name in _CLOCK_FORMATS:
+                        now = now or datetime.datetime.now()
+                        value = now.strftime(_CLOCK_FORMATS[var_name])
+                    else:
+                        value = getattr(self, var_name, "")
+                    rendered[i] = str(value)
+                return "".join(rendered)
+        ''').strip().replace("__VARIABLES__", variables)
 
     def _generate_utilities(self) -> str:
         """Generate utility functions"""
-        return textwrap.dedent("""
+        return textwrap.dedent(r'''
+        def _accepts_extra_kwargs(llm_client) -> bool:
+            """Whether the client's achat takes provider-side extra_kwargs"""
+            try:
+                params = inspect.signature(llm_client.achat).parameters
+            except (AttributeError, TypeError, ValueError):
+                return False
+            return "extra_kwargs" in params or any(p.kind is inspect.Parameter.VAR_KEYWORD for p in params.values())
+
+        async def _achat_constrained(owner, messages: List[ChatMessage], **extra_kwargs):
+            """achat with provider-side output constraints when the client supports them"""
+            if owner.supports_extra_kwargs:
+                return await owner.llm.achat(messages=messages, extra_kwargs=extra_kwargs)
+            return await owner.llm.achat(messages=messages)
+
+        # JSON mode for extraction; a short completion for the classification reply
+        _EXTRACTION_LLM_KWARGS = {"response_format": {"type": "json_object"}}
+        _INDEX_LLM_KWARGS = {"max_tokens": 3}
+
         class VariableExtractor:
-            \"\"\"Extracts variables from user responses using LLM\"\"\"
+            """Extracts variables from user responses using LLM"""
             def __init__(self, llm_client):
                 self.llm = llm_client
+                self.supports_extra_kwargs = _accepts_extra_kwargs(llm_client)
 
             async def extract_variables(self, user_message: str, extraction_plan: Dict) -> Dict[str, str]:
                 if not extraction_plan or "output" not in extraction_plan:
@@ -326,69 +404,165 @@ class PythonCodeGenerator:
                 if not variables_to_extract:
                     return {}
                 var_descriptions = [f"- {var['title']}: {var['description']}" for var in variables_to_extract]
-                extraction_prompt = f\"\"\"
+                extraction_prompt = f"""
                 Extract the following variables from the user's message: "{user_message}"
                 Variables to extract:
                 {chr(10).join(var_descriptions)}
                 Return a JSON object with variable names as keys and extracted values as strings.
                 If a variable cannot be determined, use an empty string. Return only valid JSON.
-                \"\"\"
+                """
                 try:
-                    response = await self.llm.achat(messages=[ChatMessage(role="user", content=extraction_prompt)])
-                    extracted = json.loads(response.message.content)
-                    valid_vars = {{var["title"]: str(extracted[var["title"]]) for var in variables_to_extract if var["title"] in extracted and extracted[var["title"]]}}
+                    response = await _achat_constrained(self, [ChatMessage(role="user", content=extraction_prompt)], **_EXTRACTION_LLM_KWARGS)
+                    extracted = _json_loads(response.message.content)
+                    valid_vars = {var["title"]: str(extracted[var["title"]]) for var in variables_to_extract if var["title"] in extracted and extracted[var["title"]]}
                     return valid_vars
                 except Exception as e:
-                    logger.warning(f"Variable extraction failed: {e}")
+                    logger.warning("Variable extraction failed: %s", e)
                     return {}
 
+        _CLASSIFY_TRANSITION_PROMPT = """
+                Based on the conversation and user's message, which of the following conditions is met?
+                CONDITIONS:
+                {conditions}
+                CONVERSATION:
+                {conversation}
+                USER'S MESSAGE: {user_message}
+                Respond with only the number of the first condition that is met, or 0 if none is met.
+                """
+
+        def _format_conversation(conversation_history: Deque[Dict], n: int = 5) -> str:
+            return "\n".join(f"{msg['role']}: {msg['content']}" for msg in _recent(conversation_history, n))
+
         class TransitionEvaluator:
-            \"\"\"Evaluates AI-based transition conditions\"\"\"
+            """Evaluates AI-based transition conditions"""
             def __init__(self, llm_client):
                 self.llm = llm_client
-
-            async def should_transition(self, condition_prompt: str, user_message: str, conversation_history: List[Dict]) -> bool:
-                context_messages = [f"{msg['role']}: {msg['content']}" for msg in conversation_history[-5:]]
-                evaluation_prompt = f\"\"\"
-                Based on the conversation and user's message, is the following condition met?
-                CONDITION: {condition_prompt}
-                CONVERSATION:
-                {chr(10).join(context_messages)}
-                USER'S MESSAGE: {user_message}
-                Respond with exactly "TRUE" or "FALSE".
-                \"\"\"
+                self.supports_extra_kwargs = _accepts_extra_kwargs(llm_client)
+
+            async def classify_transition(self, conditions: List[str], user_message: str, conversation_history: Deque[Dict]) -> Optional[int]:
+                """Evaluate all of a node's conditions in one LLM call; returns the index of the first one met, or None."""
+                if not conditions:
+                    return None
+                evaluation_prompt = _CLASSIFY_TRANSITION_PROMPT.format(
+                    conditions="\n".join(f"{i}. {condition}" for i, condition in enumerate(conditions, 1)),
+                    conversation=_format_conversation(conversation_history),
+                    user_message=user_message,
+                )
                 try:
-                    response = await self.llm.achat(messages=[ChatMessage(role="user", content=evaluation_prompt)])
-                    return response.message.content.strip().upper() == "TRUE"
+                    response = await _achat_constrained(self, [ChatMessage(role="user", content=evaluation_prompt)], **_INDEX_LLM_KWARGS)
+                    match = _FIRST_INT_RE.search(response.message.content)
+                    index = int(match.group()) if match else 0
+                    return index - 1 if 1 <= index <= len(conditions) else None
                 except Exception as e:
-                    logger.warning(f"Transition evaluation failed: {e}")
-                    return False
+                    logger.warning("Transition evaluation failed: %s", e)
+                    return None
+
+        async def _chat_deltas(llm_client, messages: List[ChatMessage]) -> AsyncIterator[str]:
+            """Text deltas of a streamed chat completion"""
+            async with llm_client.chat(chat_ctx=ChatContext(items=list(messages))) as stream:
+                async for chunk in stream:
+                    if chunk.delta and chunk.delta.content:
+                        yield chunk.delta.content
+
+        class LLMCache:
+            """Bounded TTL cache of node responses keyed on (node, prompt, recent history)"""
+            def __init__(self, max_entries: int = 64, ttl: float = 3600.0):
+                self.max_entries = max_entries
+                self.ttl = ttl
+                self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+            @staticmethod
+            def make_key(node: str, formatted_prompt: str, conversation_history: Deque[Dict]) -> str:
+                recent = [msg["content"] for msg in _recent(conversation_history, _LLM_CACHE_HISTORY_TURNS)]
+                payload = json.dumps([node, formatted_prompt, recent], ensure_ascii=False)
+                return hashlib.sha256(payload.encode()).hexdigest()
+
+            def _lookup(self, key: str) -> Optional[str]:
+                entry = self._entries.get(key)
+                if entry is None:
+                    return None
+                stored_at, content = entry
+                if time.monotonic() - stored_at >= self.ttl:
+                    del self._entries[key]
+                    return None
+                self._entries.move_to_end(key)
+                return content
+
+            def _store(self, key: str, content: str):
+                self._entries[key] = (time.monotonic(), content)
+                if len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+            def astream(self, llm_client, node: str, formatted_prompt: str, conversation_history: Deque[Dict], messages: List[ChatMessage]) -> AsyncIterator[str]:
+                """Yield the reply sentence by sentence as the LLM streams it, or whole on a cache hit"""
+                # Key on the history as it is now, not when the caller starts iterating
+                return self._astream(self.make_key(node, formatted_prompt, conversation_history), llm_client, node, messages)
+
+            async def _astream(self, key: str, llm_client, node: str, messages: List[ChatMessage]) -> AsyncIterator[str]:
+                content = self._lookup(key)
+                if content is not None:
+                    logger.info("LLM cache hit for %s", node)
+                    yield content
+                    return
+                # Failures propagate to the handler and are never cached
+                parts = []
+                async for sentence in sentence_chunks(_chat_deltas(llm_client, messages)):
+                    parts.append(sentence)
+                    yield sentence
+                self._store(key, "".join(parts))
 
         class ProviderConfigManager:
-            \"\"\"Manages dynamic AI provider configurations\"\"\"
+            """Manages dynamic AI provider configurations"""
             def __init__(self, global_llm_config=None, global_voice_config=None, global_transcriber_config=None):
                 self.global_llm_config = global_llm_config or {}
                 self.global_voice_config = global_voice_config or {}
                 self.global_transcriber_config = global_transcriber_config or {}
+                # Clients wrap HTTP sessions, so build each distinct config only once
+                self._clients: Dict[str, Any] = {}
+                # Handlers rarely pass node overrides; skip the merge and key for that case
+                self._default_clients: Dict[str, Any] = {}
+
+            def _get_cached_client(self, kind: str, config: Dict, factory) -> Any:
+                key = json.dumps([kind, config], sort_keys=True, default=str)
+                client = self._clients.get(key)
+                if client is None:
+                    client = self._clients[key] = factory(dict(config))
+                return client
+
+            def _get_default_client(self, kind: str, global_config: Dict, factory) -> Any:
+                client = self._default_clients.get(kind)
+                if client is None:
+                    client = self._default_clients[kind] = self._get_cached_client(kind, global_config, factory)
+                return client
 
             def get_llm_client(self, node_llm_config=None):
+                if not node_llm_config:
+                    return self._get_default_client("llm", self.global_llm_config, self._create_llm_client)
                 config = {**self.global_llm_config, **(node_llm_config or {})}
+                return self._get_cached_client("llm", config, self._create_llm_client)
+
+            def _create_llm_client(self, config: Dict):
                 provider = config.pop("provider", "openai").lower()
-                logger.info(f"Configuring LLM client for provider: {provider} with config: {config}")
+                logger.info("Configuring LLM client for provider: %s with config: %s", provider, config)
                 try:
                     if provider == "openai": return openai.LLM(**config)
                     elif provider == "groq": return groq.LLM(**config)
                     else:
-                        logger.warning(f"Unsupported LLM provider: {provider}. Falling back to OpenAI.")
+                        logger.warning("Unsupported LLM provider: %s. Falling back to OpenAI.", provider)
                         return openai.LLM()
                 except Exception as e:
-                    logger.error(f"Error creating LLM client for {provider}: {e}")
+                    logger.error("Error creating LLM client for %s: %s", provider, e)
                     return openai.LLM()
 
             def get_tts_client(self, node_voice_config=None):
+                if not node_voice_config:
+                    return self._get_default_client("tts", self.global_voice_config, self._create_tts_client)
                 config = {**self.global_voice_config, **(node_voice_config or {})}
+                return self._get_cached_client("tts", config, self._create_tts_client)
+
+            def _create_tts_client(self, config: Dict):
                 provider = config.pop("provider", "deepgram").lower()
-                logger.info(f"Configuring TTS client for provider: {provider} with config: {config}")
+                logger.info("Configuring TTS client for provider: %s with config: %s", provider, config)
                 try:
                     if provider == "openai":
                         if "voice_name" in config: config["voice"] = config.pop("voice_name")
@@ -398,97 +572,197 @@ class PythonCodeGenerator:
                         return deepgram.TTS(**config)
                     elif provider == "cartesia": return cartesia.TTS(**config)
                     else:
-                        logger.warning(f"Unsupported TTS provider: {provider}. Falling back to Deepgram.")
+                        logger.warning("Unsupported TTS provider: %s. Falling back to Deepgram.", provider)
                         return deepgram.TTS()
                 except Exception as e:
-                    logger.error(f"Error creating TTS client for {provider}: {e}")
+                    logger.error("Error creating TTS client for %s: %s", provider, e)
                     return deepgram.TTS()
 
             def get_stt_client(self, node_transcriber_config=None):
+                if not node_transcriber_config:
+                    return self._get_default_client("stt", self.global_transcriber_config, self._create_stt_client)
                 config = {**self.global_transcriber_config, **(node_transcriber_config or {})}
+                return self._get_cached_client("stt", config, self._create_stt_client)
+
+            def _create_stt_client(self, config: Dict):
                 provider = config.pop("provider", "deepgram").lower()
-                logger.info(f"Configuring STT client for provider: {provider} with config: {config}")
+                logger.info("Configuring STT client for provider: %s with config: %s", provider, config)
                 try:
                     if provider == "deepgram": return deepgram.STT(**config)
                     elif provider == "openai": return openai.STT(**config)
                     else:
-                        logger.warning(f"Unsupported STT provider: {provider}. Falling back to Deepgram.")
+                        logger.warning("Unsupported STT provider: %s. Falling back to Deepgram.", provider)
                         return deepgram.STT()
                 except Exception as e:
-                    logger.error(f"Error creating STT client for {provider}: {e}")
+                    logger.error("Error creating STT client for %s: %s", provider, e)
                     return deepgram.STT()
 
+        _HTTP_SESSION: Optional[aiohttp.ClientSession] = None
+
+        async def _get_http_session() -> aiohttp.ClientSession:
+            """Shared keep-alive session for make_api_request, created on first use"""
+            global _HTTP_SESSION
+            if _HTTP_SESSION is None or _HTTP_SESSION.closed:
+                _HTTP_SESSION = aiohttp.ClientSession(
+                    connector=aiohttp.TCPConnector(limit=100, ttl_dns_cache=300, keepalive_timeout=30)
+                )
+            return _HTTP_SESSION
+
+        async def _close_http_session():
+            global _HTTP_SESSION
+            if _HTTP_SESSION is not None and not _HTTP_SESSION.closed:
+                await _HTTP_SESSION.close()
+            _HTTP_SESSION = None
+
+        # Jobs in this process using the shared session; it is closed only when
+        # the last one shuts down, never under a job that is still running
+        _HTTP_SESSION_USERS = 0
+
+        def _retain_http_session(ctx: JobContext):
+            global _HTTP_SESSION_USERS
+            _HTTP_SESSION_USERS += 1
+            ctx.add_shutdown_callback(_release_http_session)
+
+        async def _release_http_session():
+            global _HTTP_SESSION_USERS
+            _HTTP_SESSION_USERS -= 1
+            if _HTTP_SESSION_USERS == 0:
+                await _close_http_session()
+
         async def make_api_request(url: str, method: str = "POST", headers: Dict = None, data: Dict = None) -> Dict:
             headers = headers or {"Content-Type": "application/json"}
             try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.request(method.upper(), url, headers=headers, json=data) as response:
-                        return {"status_code": response.status, "data": await response.json() if response.content_type == "application/json" else await response.text()}
+                session = await _get_http_session()
+                async with session.request(method.upper(), url, headers=headers, json=data) as response:
+                    return {"status_code": response.status, "data": await response.json() if response.content_type == "application/json" else await response.text()}
             except Exception as e:
-                logger.error(f"API request failed: {e}")
+                logger.error("API request failed: %s", e)
                 return {"error": str(e)}
-        """).strip()
+        ''').strip()
+
+    def _generate_node_config(self, workflow: WorkflowDefinition) -> str:
+        """Generate the per-node constants table that handle_node reads"""
+        encoder = PythonJSONEncoder()
+        entries = []
+        for node in workflow.nodes:
+            if node.type != "conversation":
+                continue
+            outgoing_edges = [e for e in workflow.edges if e.from_node == node.name]
+            transitions = "".join(f'({repr(edge.condition.get("prompt", ""))}, {repr(edge.to_node)}), ' for edge in outgoing_edges)
+            entries.append(
+                f"    {repr(node.name)}: NodeConfig(\n"
+                f"        transitions=({transitions.rstrip()}),\n"
+                f"        extraction_plan={encoder.encode(node.variable_extraction_plan)},\n"
+                f"        node_prompt={repr(node.prompt or '')},\n"
+                f"        llm_config={encoder.encode(node.llm_config)},\n"
+                f"        voice_config={encoder.encode(node.voice_config)},\n"
+                f"    ),"
+            )
+        header = textwrap.dedent(r'''
+        _GLOBAL_PROMPT = __GLOBAL_PROMPT__
+        _REPLY_INSTRUCTION = "\n\nIMPORTANT: Your reply must be very short and conversational."
+
+        @dataclass(frozen=True)
+        class NodeConfig:
+            """Per-node constants, built once at import instead of on every turn"""
+            transitions: Tuple[Tuple[str, str], ...]
+            extraction_plan: Optional[Dict]
+            node_prompt: str
+            llm_config: Optional[Dict] = None
+            voice_config: Optional[Dict] = None
+            conditions: Tuple[str, ...] = field(init=False)
+            combined_prompt: str = field(init=False)
+            # Plan entries with a fixed "value" need no LLM; only the rest are extracted
+            static_variables: Tuple[Tuple[str, str], ...] = field(init=False)
+            dynamic_plan: Optional[Dict] = field(init=False)
+
+            def __post_init__(self):
+                object.__setattr__(self, "conditions", tuple(condition for condition, _ in self.transitions))
+                plan = (self.extraction_plan or {}).get("output") or []
+                object.__setattr__(self, "static_variables", tuple((var["title"], var["value"]) for var in plan if "value" in var))
+                dynamic = [var for var in plan if "value" not in var]
+                object.__setattr__(self, "dynamic_plan", {"output": dynamic} if dynamic else None)
+                object.__setattr__(self, "combined_prompt", f"{_GLOBAL_PROMPT}\n\n--- Node Instructions ---\n{self.node_prompt} {_REPLY_INSTRUCTION}")
+        ''').strip().replace("__GLOBAL_PROMPT__", repr(workflow.global_prompt or ""))
+        return header + "\n\n_NODE_CONFIG: Dict[str, NodeConfig] = {\n" + "\n".join(entries) + "\n}"
 
     def _generate_node_handlers(self, workflow: WorkflowDefinition) -> str:
-        handlers = []
+        handlers = [self._generate_conversation_handler()]
+        aliases = []
         for node in workflow.nodes:
             if node.type == "conversation":
-                handlers.append(self._generate_conversation_handler(node, workflow))
+                aliases.append(f"handle_{self._sanitize_name(node.name)} = functools.partial(handle_node, {repr(node.name)})")
             elif node.type == "tool":
                 handlers.append(self._generate_tool_handler(node, workflow))
+        if aliases:
+            handlers.insert(1, "# Per-node entry points, kept so the handle_<node> lookup in entrypoint still resolves\n" + "\n".join(aliases))
         return "\n\n".join(handlers)
 
-    def _generate_conversation_handler(self, node: WorkflowNode, workflow: WorkflowDefinition) -> str:
-        func_name = self._sanitize_name(node.name)
-        outgoing_edges = [e for e in workflow.edges if e.from_node == node.name]
-        transition_list = [f'({repr(edge.condition.get("prompt", ""))}, "{edge.to_node}")' for edge in outgoing_edges]
-        transitions_str = f"[{', '.join(transition_list)}]" if transition_list else "[]"
-        
-        return textwrap.dedent(f"""
-        async def handle_{func_name}(state: WorkflowState, user_message: str, llm_client, variable_extractor: VariableExtractor, transition_evaluator: TransitionEvaluator, provider_config: ProviderConfigManager) -> Optional[Tuple[str, Any]]:
-            \"\"\"Handle {node.name} conversation node\"\"\"
-            logger.info(f"Handling {node.name} node")
-            state.current_node = "{node.name}"
+    def _generate_conversation_handler(self) -> str:
+        """Generate the single handler shared by every conversation node"""
+        return textwrap.dedent(r'''
+        async def handle_node(node_id: str, state: WorkflowState, user_message: str, llm_client, variable_extractor: VariableExtractor, transition_evaluator: TransitionEvaluator, provider_config: ProviderConfigManager) -> Optional[Tuple[Union[str, AsyncIterator[str]], Any]]:
+            """Handle a conversation node, driven by its entry in _NODE_CONFIG"""
+            logger.info("Handling %s node", node_id)
+            cfg = _NODE_CONFIG[node_id]
+            state.current_node = node_id
             state.add_to_history("user", user_message)
-            
-            transitions = {transitions_str}
-            for edge_condition, target_node in transitions:
-                if await transition_evaluator.should_transition(edge_condition, user_message, state.conversation_history):
-                    state.current_node = target_node
-                    logger.info(f"Transitioning from {node.name} to {{target_node}}")
-                    # Return a message indicating transition, as the new node will be handled in the next turn
-                    return (f"Transitioning to {{target_node}}", provider_config.get_tts_client())
-
-            if {bool(node.variable_extraction_plan)}:
-                extracted_vars = await variable_extractor.extract_variables(user_message, {json.dumps(node.variable_extraction_plan)})
-                for var_name, var_value in extracted_vars.items():
-                    state.set_variable(var_name, var_value)
-
-            node_llm_config = {PythonJSONEncoder().encode(node.llm_config)}
-            node_llm_client = provider_config.get_llm_client(node_llm_config)
-
-            node_voice_config = {PythonJSONEncoder().encode(node.voice_config)}
-            tts_client = provider_config.get_tts_client(node_voice_config)
-
-            global_prompt = {repr(workflow.global_prompt or "")}
-            node_prompt = {repr(node.prompt or "")}
-            instruction = "\\n\\nIMPORTANT: Your reply must be very short and conversational."
-            combined_prompt = f"{{global_prompt}}\\n\\n--- Node Instructions ---\\n{{node_prompt}} {{instruction}}"
-            formatted_prompt = state.format_prompt_template(combined_prompt)
-            
-            context_messages = [ChatMessage(role=msg["role"], content=msg["content"]) for msg in state.conversation_history[-10:]]
-            context_messages.insert(0, ChatMessage(role="system", content=formatted_prompt))
-            
-            try:
-                response = await node_llm_client.achat(messages=context_messages)
-                ai_response = response.message.content
+
+            # Extraction only matters if we stay on this node, but it is independent of
+            # the transition check, so run both LLM calls concurrently
+            extract_task = None
+            reuse_extraction = state.last_extraction is not None and state.last_extraction[:2] == (node_id, user_message)
+            if cfg.dynamic_plan and not reuse_extraction:
+                extract_task = asyncio.create_task(variable_extractor.extract_variables(user_message, cfg.dynamic_plan))
+            match = await transition_evaluator.classify_transition(cfg.conditions, user_message, state.conversation_history)
+            if match is not None:
+                if extract_task is not None:
+                    extract_task.cancel()
+                target_node = cfg.transitions[match][1]
+                state.current_node = target_node
+                logger.info("Transitioning from %s to %s", node_id, target_node)
+                # Return a message indicating transition, as the new node will be handled in the next turn
+                return (f"Transitioning to {target_node}", provider_config.get_tts_client())
+
+            for var_name, var_value in cfg.static_variables:
+                state.set_variable(var_name, var_value)
+            if extract_task is not None:
+                extracted_vars = await extract_task
+                state.last_extraction = (node_id, user_message, extracted_vars)
+            elif reuse_extraction:
+                # Same message on the same node as last turn; its extraction still holds
+                extracted_vars = state.last_extraction[2]
+            else:
+                extracted_vars = {}
+            for var_name, var_value in extracted_vars.items():
+                state.set_variable(var_name, var_value)
+
+            node_llm_client = provider_config.get_llm_client(cfg.llm_config)
+            tts_client = provider_config.get_tts_client(cfg.voice_config)
+
+            formatted_prompt = state.format_prompt_template(cfg.combined_prompt)
+            context_messages = state.node_chat_messages(formatted_prompt)
+            reply_stream = state.llm_cache.astream(node_llm_client, state.current_node, formatted_prompt, state.conversation_history, context_messages)
+
+            async def stream_reply() -> AsyncIterator[str]:
+                # session.say() speaks each sentence as it arrives; history is written once the reply is complete
+                parts = []
+                try:
+                    async for sentence in reply_stream:
+                        parts.append(sentence)
+                        yield sentence
+                except Exception as e:
+                    logger.error("Error in %s: %s", node_id, e)
+                    if not parts:
+                        yield "I'm having trouble processing that right now."
+                    return
+                ai_response = "".join(parts).strip()
                 state.add_to_history("assistant", ai_response)
-                logger.info(f"Generated response for {node.name}: {{ai_response[:100]}}...")
-                return (ai_response, tts_client)
-            except Exception as e:
-                logger.error(f"Error in {node.name}: {{e}}")
-                return ("I'm having trouble processing that right now.", tts_client)
-        """).strip()
+                if logger.isEnabledFor(logging.INFO):
+                    logger.info("Generated response for %s: %s...", node_id, ai_response[:100])
+
+            return (stream_reply(), tts_client)
+        ''').strip()
 
     def _generate_tool_handler(self, node: WorkflowNode, workflow: WorkflowDefinition) -> str:
         # Simplified for brevity; the original logic for different tools can be retained here.
@@ -496,7 +770,7 @@ class PythonCodeGenerator:
         return textwrap.dedent(f"""
         async def handle_{func_name}(state: WorkflowState) -> str:
             \"\"\"Handle {node.name} tool node\"\"\"
-            logger.info(f"Executing tool node: {node.name}")
+            logger.info("Executing tool node: %s", {repr(node.name)})
             # Add specific tool logic here (apiRequest, endCall, etc.)
             return "Tool execution completed."
         """).strip()
@@ -504,33 +778,85 @@ class PythonCodeGenerator:
     def _generate_main_agent(self, workflow: WorkflowDefinition) -> str:
         start_node = next((n for n in workflow.nodes if n.is_start), workflow.nodes[0])
         agent_class = self._sanitize_class_name(workflow.name)
-        
-        # Create a dictionary of function references for handlers
-        handler_map = {}
-        for node in workflow.nodes:
-            handler_map[node.name] = f"handle_{self._sanitize_name(node.name)}"
 
-        return textwrap.dedent(f"""
-        class {agent_class}(Agent):
+        return textwrap.dedent(r'''
+        class __AGENT_CLASS__(Agent):
             def __init__(self, **kwargs):
                 super().__init__(**kwargs)
                 self.state = WorkflowState()
                 self.variable_extractor = None
                 self.transition_evaluator = None
                 self.provider_config = None
-                self.handler_map = {{}}
+                self.handler_map = {}
+                self.current_session = None
+                self.room = None
 
             async def start(self, session: AgentSession):
                 self.state.session_id = session.id
-                logger.info(f"Starting {agent_class} with session {{self.state.session_id}}")
+                logger.info("Starting __AGENT_CLASS__ with session %s", self.state.session_id)
                 initial_message = await self.get_initial_message()
                 if initial_message:
-                    tts = self.provider_config.get_tts_client()
-                    await session.say(initial_message, tts=tts)
+                    await session.say(initial_message)
 
             def set_handlers(self, handlers: Dict[str, callable]):
                 self.handler_map = handlers
 
+            async def recreate_session_with_node_config(self, node_name: str, llm_client):
+                """Recreate the session with node-specific TTS/STT/LLM configuration"""
+                if not self.room:
+                    logger.error("No room available for session recreation")
+                    return None
+
+                # Get node-specific configurations
+                node_obj = next((n for n in workflow_nodes if n['name'] == node_name), None)
+                if not node_obj:
+                    logger.error("Node %s not found in workflow_nodes", node_name)
+                    return None
+
+                # Get node-specific configs (these can be customized per node)
+                node_llm_config = node_obj.get('llm_config', {})
+                node_voice_config = node_obj.get('voice_config', {})
+                node_transcriber_config = node_obj.get('transcriber_config', {})
+
+                # Create clients with node-specific configs
+                stt_client = self.provider_config.get_stt_client(node_transcriber_config)
+                tts_client = self.provider_config.get_tts_client(node_voice_config)
+                node_llm_client = self.provider_config.get_llm_client(node_llm_config)
+                vad_client = silero.VAD.load()
+
+                # Create new session with node-specific clients
+                new_session = AgentSession(
+                    stt=stt_client,
+                    llm=node_llm_client,  # Use node-specific LLM
+                    tts=tts_client,       # Use node-specific TTS
+                    vad=vad_client,
+                )
+
+                # Set up event handlers for the new session
+                @new_session.on("user_speech_committed")
+                async def on_user_speech(ev):
+                    user_message = ev.user_transcript
+                    logger.info("User said: %s", user_message)
+                    response_text, _ = await self.process_workflow_message(user_message, node_llm_client)
+                    if response_text:
+                        await new_session.say(response_text)
+                        if isinstance(response_text, str) and logger.isEnabledFor(logging.INFO):
+                            logger.info("Agent responded: %s...", response_text[:100])
+
+                # Close old session if it exists
+                if self.current_session:
+                    try:
+                        await self.current_session.close()
+                    except Exception as e:
+                        logger.warning("Error closing old session: %s", e)
+
+                # Start new session
+                await new_session.start(self.room)
+                self.current_session = new_session
+
+                logger.info("Recreated session for node %s with custom TTS/STT/LLM", node_name)
+                return new_session
+
             async def initialize_components(self, llm_client, global_llm_config=None, global_voice_config=None, global_transcriber_config=None, global_variables=None):
                 self.variable_extractor = VariableExtractor(llm_client)
                 self.transition_evaluator = TransitionEvaluator(llm_client)
@@ -543,114 +869,138 @@ class PythonCodeGenerator:
                     self.state.global_variables.update(global_variables)
                 logger.info("Agent components initialized")
 
-            async def process_workflow_message(self, user_message: str, llm_client) -> Tuple[Optional[str], Any]:
+            async def process_workflow_message(self, user_message: str, llm_client) -> Tuple[Optional[Union[str, AsyncIterator[str]]], Any]:
                 if not self.state.current_node:
-                    self.state.current_node = "{start_node.name}"
-                
+                    self.state.current_node = __START_NODE__
+
                 current_node_name = self.state.current_node
                 handler = self.handler_map.get(current_node_name)
-                
+
                 if not handler:
-                    logger.error(f"No handler for node: {{current_node_name}}")
+                    logger.error("No handler for node: %s", current_node_name)
                     return ("I have a technical issue.", None)
 
                 node_obj = next((n for n in workflow_nodes if n['name'] == current_node_name), None)
                 if not node_obj:
-                    return (f"Configuration for node {{current_node_name}} not found.", None)
+                    return (f"Configuration for node {current_node_name} not found.", None)
 
                 try:
                     if node_obj['type'] == 'conversation':
                         response, tts_client = await handler(
                             self.state, user_message, llm_client, self.variable_extractor, self.transition_evaluator, self.provider_config
                         )
-                        # If a transition occurred, the new node will be processed on the next user input
+
+                        # Check if a transition occurred and recreate session if needed
+                        if self.state.current_node != current_node_name:
+                            logger.info("Node transition detected: %s -> %s", current_node_name, self.state.current_node)
+                            # Recreate session with new node's TTS/STT/LLM configuration
+                            await self.recreate_session_with_node_config(self.state.current_node, llm_client)
+
                         return response, tts_client
                     elif node_obj['type'] == 'tool':
                         tool_response = await handler(self.state)
                         return tool_response, self.provider_config.get_tts_client() # Use default TTS for tool responses
                 except Exception as e:
-                    logger.error(f"Error processing message: {{e}}", exc_info=True)
+                    logger.error("Error processing message: %s", e, exc_info=True)
                     return ("I encountered an error.", None)
                 return ("No response generated.", None)
 
             async def get_initial_message(self) -> str:
                 start_node_data = next((n for n in workflow_nodes if n.get('is_start')), None)
-                if start_node_data and start_node_data.get('message_plan', {}).get('firstMessage'):
+                if start_node_data and (start_node_data.get('message_plan') or {}).get('firstMessage'):
                     msg = start_node_data['message_plan']['firstMessage']
                     self.state.add_to_history("assistant", msg)
                     return msg
                 return "Hello! How can I help you today?"
-        """).strip()
+        ''').strip().replace("__AGENT_CLASS__", agent_class).replace("__START_NODE__", repr(start_node.name))
 
     def _generate_entry_point(self, workflow: WorkflowDefinition) -> str:
         agent_class = self._sanitize_class_name(workflow.name)
-        
+        encoder = PythonJSONEncoder()
+
+        # metadata.sessionConfig configures only the session recreated on entering
+        # a node; the node's own configs also drive its reply handler
+        session_configs = {n.name: (n.metadata or {}).get("sessionConfig") or {} for n in workflow.nodes}
         node_data_for_agent = [{
             "name": n.name, "type": n.type, "prompt": n.prompt,
             "message_plan": n.message_plan, "is_start": n.is_start,
-            "voice_config": n.voice_config, "llm_config": n.llm_config
+            "voice_config": session_configs[n.name].get("voiceConfig", n.voice_config),
+            "llm_config": session_configs[n.name].get("llmConfig", n.llm_config),
+            "transcriber_config": session_configs[n.name].get("transcriberConfig", n.transcriber_config)
         } for n in workflow.nodes]
 
-        return f"""
-workflow_nodes = {PythonJSONEncoder().encode(node_data_for_agent)}
+        return textwrap.dedent(r'''
+        workflow_nodes = __WORKFLOW_NODES__
 
-async def entrypoint(ctx: JobContext):
-    logger.info(f"Starting {workflow.name} agent")
-    
-    # Initialize LLM with a default/fallback
-    llm_client = openai.LLM(model="gpt-4o")
+        async def entrypoint(ctx: JobContext):
+            logger.info("Starting %s agent", __WORKFLOW_NAME__)
+            _retain_http_session(ctx)
 
-    # Initialize agent and its components
-    agent = {agent_class}()
-    
-    global_llm_config = {PythonJSONEncoder().encode(workflow.global_llm_config) or '{{}}'}
-    global_voice_config = {PythonJSONEncoder().encode(workflow.global_voice_config) or '{{}}'}
-    global_transcriber_config = {PythonJSONEncoder().encode(workflow.global_transcriber_config) or '{{}}'}
-    global_variables = {PythonJSONEncoder().encode(workflow.global_variables) or '{{}}'}
-
-    await agent.initialize_components(
-        llm_client,
-        global_llm_config=global_llm_config,
-        global_voice_config=global_voice_config,
-        global_transcriber_config=global_transcriber_config,
-        global_variables=global_variables
-    )
-    
-    # Dynamically create a map of node names to handler functions
-    handler_map = {{}}
-    for node in workflow_nodes:
-        func_name = "handle_" + re.sub(r'[^a-zA-Z0-9_]', '_', node['name']).lower()
-        if func_name in globals():
-            handler_map[node['name']] = globals()[func_name]
-    agent.set_handlers(handler_map)
-
-    # Configure session with global provider settings from the workflow
-    stt_client = agent.provider_config.get_stt_client()
-    tts_client = agent.provider_config.get_tts_client()
-    vad_client = silero.VAD.load()
-
-    session = AgentSession(
-        stt=stt_client,
-        llm=llm_client,  # Main LLM for core agent logic, can be overridden in nodes
-        tts=tts_client,  # Default TTS, will be overridden by node-specific configs
-        vad=vad_client,
-        agent=agent,
-    )
-
-    @session.on("user_speech_committed")
-    async def on_user_speech(ev):
-        user_message = ev.user_transcript
-        logger.info(f"User said: {{user_message}}")
-        response_text, tts_override = await agent.process_workflow_message(user_message, llm_client)
-        if response_text:
-            await session.say(response_text, tts=tts_override)
-            logger.info(f"Agent responded: {{response_text[:100]}}...")
-
-    await session.start(ctx.room)
+            # Initialize LLM with a default/fallback
+            llm_client = openai.LLM(model="gpt-4o")
 
-if __name__ == "__main__":
-    cli.run_app(WorkerOptions(entrypoint_fnc=entrypoint))
-"""
+            # Initialize agent and its components
+            agent = __AGENT_CLASS__()
+            agent.room = ctx.room  # Store room reference for session recreation
+
+            global_llm_config = __GLOBAL_LLM_CONFIG__
+            global_voice_config = __GLOBAL_VOICE_CONFIG__
+            global_transcriber_config = __GLOBAL_TRANSCRIBER_CONFIG__
+            global_variables = __GLOBAL_VARIABLES__
+
+            await agent.initialize_components(
+                llm_client,
+                global_llm_config=global_llm_config,
+                global_voice_config=global_voice_config,
+                global_transcriber_config=global_transcriber_config,
+                global_variables=global_variables
+            )
+
+            # Dynamically create a map of node names to handler functions
+            handler_map = {}
+            for node in workflow_nodes:
+                func_name = "handle_" + re.sub(r'[^a-zA-Z0-9_]', '_', node['name']).lower()
+                if func_name in globals():
+                    handler_map[node['name']] = globals()[func_name]
+            agent.set_handlers(handler_map)
+
+            # Configure initial session with global provider settings
+            stt_client = agent.provider_config.get_stt_client()
+            tts_client = agent.provider_config.get_tts_client()
+            vad_client = silero.VAD.load()
+
+            session = AgentSession(
+                stt=stt_client,
+                llm=llm_client,  # Main LLM for core agent logic, can be overridden in nodes
+                tts=tts_client,  # Default TTS, will be overridden by node-specific configs
+                vad=vad_client,
+                agent=agent,
+            )
+
+            @session.on("user_speech_committed")
+            async def on_user_speech(ev):
+                user_message = ev.user_transcript
+                logger.info("User said: %s", user_message)
+                response_text, _ = await agent.process_workflow_message(user_message, llm_client)
+                if response_text:
+                    await session.say(response_text)
+                    if isinstance(response_text, str) and logger.isEnabledFor(logging.INFO):
+                        logger.info("Agent responded: %s...", response_text[:100])
+
+            await session.start(ctx.room)
+            agent.current_session = session  # Store reference to current session
+
+        if __name__ == "__main__":
+            install_uvloop()
+            cli.run_app(WorkerOptions(entrypoint_fnc=entrypoint))
+        ''').strip() \
+            .replace("__WORKFLOW_NODES__", encoder.encode(node_data_for_agent)) \
+            .replace("__WORKFLOW_NAME__", repr(workflow.name)) \
+            .replace("__AGENT_CLASS__", agent_class) \
+            .replace("__GLOBAL_LLM_CONFIG__", encoder.encode(workflow.global_llm_config or {})) \
+            .replace("__GLOBAL_VOICE_CONFIG__", encoder.encode(workflow.global_voice_config or {})) \
+            .replace("__GLOBAL_TRANSCRIBER_CONFIG__", encoder.encode(workflow.global_transcriber_config or {})) \
+            .replace("__GLOBAL_VARIABLES__", encoder.encode(workflow.global_variables or {}))
 
     def _sanitize_name(self, name: str) -> str:
         sanitized = re.sub(r'[^a-zA-Z0-9_]', '_', name)
@@ -0,0 +1,19 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def install_uvloop() -> bool:
+    """Switches asyncio to uvloop's event loop policy when uvloop is installed.
+
+    Must run before the worker CLI creates its loop. Returns whether uvloop
+    is now in use.
+    """
+    try:
+        import uvloop
+    except ImportError:
+        return False
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    logger.info("Using uvloop event loop")
+    return True
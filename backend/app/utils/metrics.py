@@ -0,0 +1,49 @@
+import asyncio
+import contextlib
+from typing import Any, List, Optional
+
+from livekit.agents import AgentSession, metrics
+from livekit.agents.voice import MetricsCollectedEvent
+
+
+class MetricsBatcher:
+    """Logs and aggregates session metrics in batches off the speech event path.
+
+    The metrics_collected handler only appends to the pending batch; a
+    background task flushes it on a fixed interval, and close() flushes
+    whatever is left when the job shuts down.
+    """
+
+    def __init__(self, interval: float = 5.0):
+        self.interval = interval
+        self.usage_collector = metrics.UsageCollector()
+        self._pending: List[Any] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def attach(self, session: AgentSession):
+        session.on("metrics_collected", self._on_metrics_collected)
+        self._task = asyncio.create_task(self._run())
+
+    def _on_metrics_collected(self, ev: MetricsCollectedEvent):
+        self._pending.append(ev.metrics)
+
+    def flush(self):
+        batch, self._pending = self._pending, []
+        for collected in batch:
+            metrics.log_metrics(collected)
+            self.usage_collector.collect(collected)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            self.flush()
+
+    async def close(self) -> Any:
+        """Stops the flush task, flushes the last batch and returns the usage summary."""
+        if self._task is not None:
+            task, self._task = self._task, None
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        self.flush()
+        return self.usage_collector.get_summary()
@@ -0,0 +1,20 @@
+import re
+from typing import AsyncIterator
+
+# A sentence ends at terminal punctuation followed by whitespace or the end
+# of the buffer; long unpunctuated runs are flushed after this many tokens
+SENTENCE_END = re.compile(r"[.?!](\s|$)")
+MAX_SENTENCE_TOKENS = 80
+
+
+async def sentence_chunks(tokens: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Regroups a stream of LLM tokens into sentences for the TTS."""
+    sentence_buf, token_count = "", 0
+    async for token in tokens:
+        sentence_buf += token
+        token_count += 1
+        if token_count >= MAX_SENTENCE_TOKENS or SENTENCE_END.search(sentence_buf):
+            yield sentence_buf
+            sentence_buf, token_count = "", 0
+    if sentence_buf:
+        yield sentence_buf
@@ -0,0 +1,41 @@
+import pytest
+
+from agents import deepgram_voice_config as voices
+
+
+def scan(field, query, language):
+    """The original linear scan the indexed lookups must agree with."""
+    catalog = voices.ALL_ENGLISH_VOICES if language.lower() == "english" else voices.ALL_SPANISH_VOICES
+    return [voice for voice in catalog if query.lower() in getattr(voice, field).lower()]
+
+
+def queries(field):
+    catalog = (*voices.ALL_ENGLISH_VOICES, *voices.ALL_SPANISH_VOICES)
+    words = {part for voice in catalog for part in getattr(voice, field).split(", ")}
+    return sorted(words) + [
+        getattr(catalog[0], field),
+        "Calm, Comfortable",
+        "confident, ",
+        "CASUAL",
+        "warm",
+        "can",
+        "ess",
+        "nonexistent",
+    ]
+
+
+@pytest.mark.parametrize("language", ["english", "spanish", "Spanish"])
+def test_characteristic_lookup_matches_scan(language):
+    for query in queries("characteristics"):
+        assert voices.get_voices_by_characteristic(query, language) == scan("characteristics", query, language), query
+
+
+@pytest.mark.parametrize("language", ["english", "spanish"])
+def test_accent_lookup_matches_scan(language):
+    for query in queries("accent") + ["american", "latin", "an"]:
+        assert voices.get_voices_by_accent(query, language) == scan("accent", query, language), query
+
+
+def test_multi_word_characteristic_is_found():
+    matched = voices.get_voices_by_characteristic("Approachable, Natural", "spanish")
+    assert matched and all("approachable, natural" in voice.characteristics.lower() for voice in matched)
@@ -0,0 +1,56 @@
+import asyncio
+from collections import deque
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("livekit.agents")
+
+from agents import workflow
+
+
+class FakeLLM:
+    """Answers every achat call with a fixed reply and records the prompts"""
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.prompts = []
+
+    async def achat(self, messages, extra_kwargs=None):
+        self.prompts.append(messages[0].content)
+        return SimpleNamespace(message=SimpleNamespace(content=self.reply))
+
+
+def classify(reply, conditions=("wants English", "wants Yoruba", "wants to leave")):
+    llm = FakeLLM(reply)
+    evaluator = workflow.TransitionEvaluator(llm)
+    result = asyncio.run(evaluator.classify_transition(list(conditions), "hello", deque()))
+    return result, llm
+
+
+@pytest.mark.parametrize(
+    "reply, expected",
+    [
+        ("1", 0),
+        ("3", 2),
+        (" 2\n", 1),
+        ("Condition 2 is met.", 1),
+        ("0", None),
+        ("4", None),
+        ("none of them", None),
+    ],
+)
+def test_classify_transition_parses_condition_index(reply, expected):
+    assert classify(reply)[0] == expected
+
+
+def test_classify_transition_takes_first_match_in_order():
+    result, llm = classify("2, 3")
+    assert result == 1
+    assert "1. wants English\n2. wants Yoruba\n3. wants to leave" in llm.prompts[0]
+
+
+def test_classify_transition_skips_llm_without_conditions():
+    result, llm = classify("1", conditions=())
+    assert result is None
+    assert llm.prompts == []